@@ -1,25 +1,187 @@
 # admin.py
+from datetime import date, datetime, timedelta
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.formats import date_format
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import StationMeteo, ObservationMeteo
+from .models import StationMeteo, ObservationMeteo, DailySummary
+from .services import WeatherDataService
+
+# Écart maximal entre heure locale et heure UTC (fuseaux UTC-12 à UTC+14)
+MAX_UTC_OFFSET = timedelta(hours=14)
+
+
+def estimated_table_rows(model, using='default'):
+    """
+    Nombre de lignes d'une table d'après les statistiques de la base, sans la parcourir.
+    
+    Returns:
+        estimation, ou None si la base n'en fournit pas (SQLite) ou pas encore
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginateur pour les grandes tables: évite le SELECT COUNT(*) sur toute la table.
+    
+    Sans filtre, le nombre de lignes vient des statistiques de la base (MySQL:
+    information_schema.TABLES); avec filtres, le comptage est borné à
+    `filtered_count_limit` lignes.
+    """
+    exact_count_threshold = 10000
+    filtered_count_limit = 100000
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset[:self.filtered_count_limit].count()
+        
+        estimate = estimated_table_rows(queryset.model, queryset.db)
+        if estimate is None or estimate < self.exact_count_threshold:
+            return queryset.count()
+        return estimate
+
+
+class ObservationDayFilter(admin.SimpleListFilter):
+    """
+    Navigation par année, mois puis jour (remplace date_hierarchy).
+    
+    Les dates proposées viennent des résumés journaliers (une ligne par station et
+    par jour) au lieu d'un SELECT DISTINCT sur toute la table des observations.
+    """
+    title = 'date'
+    parameter_name = 'jour'
+    
+    def parse(self):
+        """Période sélectionnée: (début, fin, niveau) ou None"""
+        value = self.value()
+        if not value:
+            return None
+        
+        try:
+            if len(value) == 4:
+                start = date(int(value), 1, 1)
+                return start, start.replace(year=start.year + 1), 'year'
+            if len(value) == 7:
+                start = datetime.strptime(value, '%Y-%m').date()
+                return start, (start + timedelta(days=31)).replace(day=1), 'month'
+            start = datetime.strptime(value, '%Y-%m-%d').date()
+            return start, start + timedelta(days=1), 'day'
+        except (ValueError, OverflowError):
+            # OverflowError: période au-delà de l'an 9999
+            raise IncorrectLookupParameters(f"Date invalide: {value}")
+    
+    def lookups(self, request, model_admin):
+        summaries = DailySummary.objects.all()
+        station_pk = request.GET.get('station__id__exact')
+        if station_pk and station_pk.isdigit():
+            summaries = summaries.filter(station_id=station_pk)
+        
+        period = self.parse()
+        choices = []
+        if period is None:
+            children = summaries.dates('date', 'year')
+        else:
+            start, end, level = period
+            choices.append((str(start.year), str(start.year)))
+            if level != 'year':
+                choices.append((start.strftime('%Y-%m'), date_format(start, 'YEAR_MONTH_FORMAT')))
+            if level == 'day':
+                choices.append((start.isoformat(), date_format(start, 'SHORT_DATE_FORMAT')))
+                children = []
+            else:
+                children = summaries.filter(
+                    date__gte=start,
+                    date__lt=end
+                ).dates('date', 'month' if level == 'year' else 'day')
+        
+        for child in children:
+            if period is None:
+                choices.append((str(child.year), str(child.year)))
+            elif period[2] == 'year':
+                choices.append((child.strftime('%Y-%m'), date_format(child, 'YEAR_MONTH_FORMAT')))
+            else:
+                choices.append((child.isoformat(), date_format(child, 'SHORT_DATE_FORMAT')))
+        return choices
+    
+    def queryset(self, request, queryset):
+        period = self.parse()
+        if period is None:
+            return queryset
+        
+        start, end, _ = period
+        start = WeatherDataService.local_day_bounds(start)[0]
+        end = WeatherDataService.local_day_bounds(end)[0]
+        # La borne sur obs_time_utc (index) limite le parcours à la période
+        # à quelques heures près; celle sur obs_time_local est exacte
+        return queryset.filter(
+            obs_time_utc__gte=start - MAX_UTC_OFFSET,
+            obs_time_utc__lt=end + MAX_UTC_OFFSET,
+            obs_time_local__gte=start,
+            obs_time_local__lt=end
+        )
+
+
+class QCStatusFilter(admin.SimpleListFilter):
+    """Filtre sur le statut QC à choix fixes (pas de SELECT DISTINCT sur la table)"""
+    title = 'statut QC'
+    parameter_name = 'qc'
+    
+    def lookups(self, request, model_admin):
+        return [
+            ('-1', 'Non vérifié'),
+            ('1', 'Validé'),
+            ('0', 'Erreur'),
+        ]
+    
+    def queryset(self, request, queryset):
+        if self.value() in ('-1', '1'):
+            return queryset.filter(qc_status=int(self.value()))
+        if self.value() == '0':
+            return queryset.exclude(qc_status__in=[-1, 1])
+        return queryset
 
 
 @admin.register(StationMeteo)
 class StationMeteoAdmin(admin.ModelAdmin):
-    list_display = ['station_id', 'nom', 'latitude', 'longitude', 'timezone', 'observations_count', 'derniere_observation']
+    list_display = ['station_id', 'nom', 'latitude', 'longitude', 'timezone', 'actif', 'observations_count', 'derniere_observation']
     search_fields = ['station_id', 'nom']
-    list_filter = ['timezone']
+    list_filter = ['timezone', 'actif']
+    list_select_related = ['last_obs']
     
     def observations_count(self, obj):
-        return obj.observations.count()
+        return obj.observation_count
     observations_count.short_description = 'Nb Observations'
+    observations_count.admin_order_field = 'observation_count'
     
     def derniere_observation(self, obj):
-        derniere = obj.observations.first()
-        if derniere:
-            return derniere.obs_time_local
+        if obj.last_obs:
+            return obj.last_obs.obs_time_local
         return '-'
     derniere_observation.short_description = 'Dernière Obs'
+    derniere_observation.admin_order_field = 'last_obs_utc'
 
 
 @admin.register(ObservationMeteo)
@@ -28,9 +190,12 @@ class ObservationMeteoAdmin(admin.ModelAdmin):
         'station', 'obs_time_local', 'temp_avg_display', 
         'humidity_avg', 'windspeed_avg', 'precip_total', 'qc_status_display'
     ]
-    list_filter = ['station', 'obs_time_local', 'qc_status']
-    search_fields = ['station__station_id']
-    date_hierarchy = 'obs_time_local'
+    list_filter = ['station', ObservationDayFilter, QCStatusFilter]
+    list_select_related = ['station']
+    # Recherche exacte: utilise l'index unique de station_id
+    search_fields = ['=station__station_id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ['created_at', 'updated_at', 'epoch']
     
     fieldsets = (
@@ -1,6 +1,31 @@
 # weather/apps.py
 from django.apps import AppConfig
 import os
+import sys
+
+
+# Serveurs qui chargent l'application (sys.argv[0], ou paquet lancé par python -m)
+SERVER_PROGRAMS = ('gunicorn', 'uwsgi', 'uvicorn', 'daphne')
+
+
+def is_server_process():
+    """
+    Indique si le processus sert l'application: gunicorn, uwsgi, uvicorn, daphne
+    ou runserver. Tout autre programme (commande de gestion, worker Celery, tests,
+    scripts, shell) n'est pas un serveur.
+    """
+    program = sys.argv[0] if sys.argv else ''
+    name = os.path.basename(program)
+    if name == '__main__.py':
+        # python -m <paquet>
+        name = os.path.basename(os.path.dirname(program))
+    if name in SERVER_PROGRAMS:
+        return True
+    
+    if name in ('manage.py', 'django-admin', 'django') and len(sys.argv) >= 2 and sys.argv[1] == 'runserver':
+        # Rechargement automatique: seul le processus enfant (RUN_MAIN=true) sert les requêtes
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+    return False
 
 
 class WeatherConfig(AppConfig):
@@ -9,28 +34,39 @@ class WeatherConfig(AppConfig):
     
     def ready(self):
         """
-        Démarre automatiquement le thread de surveillance au démarrage de Django
+        Démarre l'élection du leader de la surveillance au démarrage du serveur,
+        si WEATHER_MONITOR_AUTOSTART est activé (sinon la collecte passe par Celery beat).
+        
+        Chaque processus serveur (worker gunicorn/uwsgi...) participe à
+        l'élection; seul le détenteur du bail fait tourner le thread de
+        surveillance (voir leader.py).
         """
-        # Éviter le double chargement en mode debug
-        if os.environ.get('RUN_MAIN') == 'true' or os.environ.get('RUN_MAIN') is None:
-            from .services import start_weather_monitoring
-            
-            # Configuration de la surveillance (VALEURS EN DUR)
-            API_URL = 'https://api.weather.com/v2/pws/observations/all/1day'
-            API_KEY = 'df904ffa7aad495d904ffa7aadb95d3b'
-            
-            INTERVAL = 900  # 15 minutes
-            STATION_ID = 'IBUJUM3'
-            
-            # Démarrer la surveillance automatique
-            try:
-                start_weather_monitoring(
-                    api_url=API_URL,
-                    api_key=API_KEY,
-                    interval_seconds=INTERVAL,
-                    station_id=STATION_ID
-                )
-                print(f"✓ Surveillance météo démarrée: {STATION_ID} (intervalle: {INTERVAL}s)")
-                print(f"✓ API URL: {API_URL}")
-            except Exception as e:
-                print(f"✗ Erreur démarrage surveillance météo: {e}")
\ No newline at end of file
+        # Invalidation du cache des stations, vérifications (check --deploy)
+        from . import checks, signals  # noqa: F401
+        
+        from django.conf import settings
+        
+        # RUN_MAIN défini à une autre valeur que 'true': surveillance désactivée
+        if os.environ.get('RUN_MAIN') not in (None, 'true'):
+            return
+        if not settings.WEATHER_MONITOR_AUTOSTART or not is_server_process():
+            return
+        
+        from .leader import INSTANCE_ID, start_monitor_election
+        
+        # Configuration de la surveillance (voir WEATHER_* dans settings.py)
+        API_URL = settings.WEATHER_API_URL
+        API_KEY = settings.WEATHER_API_KEY
+        
+        INTERVAL = settings.WEATHER_FETCH_INTERVAL
+        
+        try:
+            start_monitor_election(
+                api_url=API_URL,
+                api_key=API_KEY,
+                interval_seconds=INTERVAL
+            )
+            print(f"✓ Élection de la surveillance météo démarrée (instance {INSTANCE_ID}, intervalle: {INTERVAL}s)")
+            print(f"✓ API URL: {API_URL}")
+        except Exception as e:
+            print(f"✗ Erreur démarrage surveillance météo: {e}")
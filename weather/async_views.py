@@ -0,0 +1,260 @@
+# async_views.py
+"""
+Variantes asynchrones des endpoints de lecture, servies sous ASGI
+(WEATHER_ASYNC_VIEWS, voir urls.py et asgi.py).
+
+Paramètres et réponses sont ceux de views.py; seules les lectures changent:
+ORM asynchrone (aget, afirst, async for) et corps en flux produits par des
+itérateurs asynchrones. Sous ASGI, Django charge en mémoire un flux synchrone
+avant de l'envoyer: les générateurs de views.py (réponse journalière, exports)
+sont consommés morceau par morceau par aiter_in_thread().
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils.log import log_response
+import logging
+import tempfile
+
+from . import views
+from .cache import aget_daily_response, station_cache
+from .export import iter_chunks, write_npz
+from .leader import monitor_status
+from .models import StationMeteo, DailySummary
+from .resample import resample
+from .serializers import project_schema
+from .services import WeatherDataService
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs d'un export npz envoyé depuis son fichier temporaire
+NPZ_BLOCK_SIZE = 256 * 1024
+
+_DONE = object()
+
+
+def require_get(view):
+    """require_http_methods(["GET"]) pour une vue asynchrone (non pris en charge par Django 4.2)"""
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method != 'GET':
+            response = HttpResponseNotAllowed(['GET'])
+            log_response(
+                "Method Not Allowed (%s): %s",
+                request.method,
+                request.path,
+                response=response,
+                request=request
+            )
+            return response
+        return await view(request, *args, **kwargs)
+    
+    return inner
+
+
+async def aiter_in_thread(iterator):
+    """
+    Itère un itérateur synchrone (lectures ORM) morceau par morceau dans le
+    thread de la requête, sans bloquer la boucle d'événements.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(iterator, _DONE)
+            if chunk is _DONE:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def station_not_found(station_id):
+    return JsonResponse({
+        'status': 'error',
+        'message': f'Station {station_id} non trouvée'
+    }, status=404)
+
+
+@require_get
+async def get_daily_observations(request, station_id):
+    """
+    Récupère les observations journalières d'une station
+    GET /api/weather/daily/<station_id>/?date=YYYY-MM-DD
+    
+    Voir views.get_daily_observations.
+    """
+    try:
+        target_date = views.parse_daily_date(request)
+        
+        try:
+            station = await station_cache.aget_station(station_id)
+        except StationMeteo.DoesNotExist:
+            return station_not_found(station_id)
+        
+        entry, version = await aget_daily_response(station.pk, target_date)
+        if entry is not None:
+            response = HttpResponse(entry['body'], content_type='application/json')
+            etag, last_modified = entry['etag'], entry['last_modified']
+        else:
+            summary = await DailySummary.objects.filter(station=station, date=target_date).afirst()
+            if summary is None:
+                summary = DailySummary(station=station, date=target_date)
+            etag, last_modified = views.daily_validators(station, summary)
+            response = StreamingHttpResponse(
+                aiter_in_thread(views.stream_daily_response(station, summary, version, etag, last_modified)),
+                content_type='application/json'
+            )
+        
+        return views.finish_daily_response(request, response, target_date, etag, last_modified)
+    
+    except Exception as e:
+        logger.error(f"Erreur: {str(e)}")
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+@require_get
+async def list_observations(request, station_id):
+    """
+    Observations d'une station sur une plage de temps, paginées par curseur
+    GET /api/observations/<station_id>/?start=&end=&limit=&fields=
+    
+    Voir views.list_observations.
+    """
+    try:
+        station = await station_cache.aget_station(station_id)
+    except StationMeteo.DoesNotExist:
+        return station_not_found(station_id)
+    
+    try:
+        query = views.parse_observations_query(request, station)
+        schema = project_schema(query['fields'])
+    except (KeyError, signing.BadSignature, ValueError) as e:
+        return views.invalid_observations_query(e)
+    
+    rows = [row async for row in views.observations_page_queryset(station, query, schema[1])]
+    return views.observations_page_response(station, query, schema, rows)
+
+
+@require_get
+async def resample_observations(request, station_id):
+    """
+    Série rééchantillonnée d'une station, en colonnes
+    GET /api/resample/<station_id>/?start=&end=&bucket=1h&fields=temp_avg,humidity_avg&agg=avg,max
+    
+    Voir views.resample_observations.
+    """
+    try:
+        station = await station_cache.aget_station(station_id)
+    except StationMeteo.DoesNotExist:
+        return station_not_found(station_id)
+    
+    try:
+        query = views.parse_resample_query(request, station)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Paramètres invalides: {str(e)}'
+        }, status=400)
+    
+    data = await sync_to_async(resample)(
+        station, query['start'], query['end'], query['bucket'], query['fields'], query['aggregates']
+    )
+    return views.resample_response(station, query, data)
+
+
+@require_get
+async def compare_stations(request):
+    """
+    Comparaison de stations sur les derniers jours, en matrice
+    GET /api/compare/?stations=A,B,C&days=7&metrics=temp,humidity,precip,wind
+    
+    Voir views.compare_stations.
+    """
+    try:
+        days, metrics, station_ids = views.parse_compare_query(request)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Paramètres invalides: {str(e)}'
+        }, status=400)
+    
+    if station_ids:
+        stations = await station_cache.aget_many(station_ids)
+        missing = [station_id for station_id in station_ids if station_id not in stations]
+        stations = [stations[station_id] for station_id in station_ids if station_id in stations]
+    else:
+        stations = [station async for station in StationMeteo.objects.filter(actif=True).order_by('station_id')]
+        missing = []
+    
+    columns, results = await sync_to_async(WeatherDataService.compare_stations)(stations, days, metrics)
+    return views.compare_response(days, stations, columns, results, missing)
+
+
+@require_get
+async def export_observations(request):
+    """
+    Export en masse des observations
+    GET /api/export/?stations=A,B&start=&end=&format=csv|arrow|npz
+    
+    Voir views.export_observations.
+    """
+    try:
+        export_format, start, end, station_ids = views.parse_export_query(request)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Paramètres invalides: {str(e)}'
+        }, status=400)
+    
+    stations = [station async for station in views.export_stations(station_ids)]
+    chunks = iter_chunks(stations, start, end)
+    
+    if export_format == 'npz':
+        output = await sync_to_async(build_npz)(chunks)
+        return views.export_stream_response(export_format, aiter_in_thread(iter_file(output)))
+    
+    return views.export_stream_response(export_format, aiter_in_thread(views.iter_export(export_format, chunks)))
+
+
+def build_npz(chunks):
+    """Assemble l'export npz dans un fichier temporaire, relu depuis le début"""
+    output = tempfile.TemporaryFile()
+    write_npz(chunks, output)
+    output.seek(0)
+    return output
+
+
+def iter_file(output):
+    """Blocs d'un fichier, fermé à la fin de la lecture ou si le client se déconnecte"""
+    with output:
+        yield from iter(lambda: output.read(NPZ_BLOCK_SIZE), b'')
+
+
+@require_get
+async def list_stations(request):
+    """
+    Liste toutes les stations météo
+    GET /api/weather/stations/
+    
+    Voir views.list_stations.
+    """
+    data = [views.station_payload(station) async for station in views.stations_queryset()]
+    return JsonResponse(data, safe=False)
+
+
+@require_get
+async def monitoring_status(request):
+    """
+    État de la surveillance
+    GET /api/monitoring/status/
+    
+    Voir views.monitoring_status.
+    """
+    return JsonResponse(await sync_to_async(monitor_status)())
@@ -0,0 +1,225 @@
+# backfill.py
+"""
+Rattrapage de l'historique des stations (commande backfill_weather).
+
+La plage demandée est découpée en tâches (station, jour local) enregistrées dans
+BackfillJob. Les jours sont récupérés en parallèle sur l'endpoint d'historique
+(WEATHER_HISTORY_API_URL) sous une limite de débit globale, puis enregistrés par
+lots via WeatherDataService.save_observations_bulk. Une tâche n'est marquée
+terminée qu'une fois ses observations validées en base: une exécution
+interrompue reprend aux jours restants.
+
+La durée est fixée par la limite de débit, pas par l'enregistrement: une requête
+par station et par jour, soit pour un an de 20 stations 7 300 requêtes, environ
+4 heures au débit par défaut (0,5 requête/s, le quota PWS de 30/minute, nouvelles
+tentatives comprises). Un débit plus élevé n'est utile qu'avec un quota plus
+large; au-delà, les réponses 429 ralentissent le chargement au lieu de l'accélérer.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .client import PWSClient, RateLimiter
+from .ingest import existing_keys, validate_observations
+from .models import BackfillJob
+from .services import WeatherDataService
+import logging
+
+logger = logging.getLogger(__name__)
+
+PLAN_BATCH_SIZE = 1000
+
+# Observations ignorées détaillées dans BackfillJob.error (au-delà: décompte seul)
+MAX_REPORTED_ROWS = 10
+
+
+def plan_jobs(station_ids, start, end, force=False):
+    """
+    Crée les tâches manquantes pour chaque station et chaque jour de [start, end].
+    
+    Args:
+        force: remet aussi en attente les jours déjà terminés
+    
+    Returns:
+        queryset des tâches à exécuter (en attente ou en échec)
+    """
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    BackfillJob.objects.bulk_create(
+        [BackfillJob(station_id=station_id, date=day) for station_id in station_ids for day in days],
+        batch_size=PLAN_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    
+    jobs = BackfillJob.objects.filter(station_id__in=station_ids, date__gte=start, date__lte=end)
+    if force:
+        jobs.exclude(status=BackfillJob.STATUS_PENDING).update(status=BackfillJob.STATUS_PENDING, error='')
+    return jobs.exclude(status=BackfillJob.STATUS_DONE)
+
+
+def fetch_day(client, station_id, day, api_url=None, api_key=None):
+    """Observations d'une station pour un jour local (liste vide si l'API n'a rien)"""
+    response = client.fetch_observations(
+        station_id,
+        url=api_url or settings.WEATHER_HISTORY_API_URL,
+        api_key=api_key,
+        params={'date': day.strftime('%Y%m%d')},
+        conditional=False
+    )
+    # 204 No Content: pas de données pour ce jour
+    if response.status_code == 204 or not response.content:
+        return []
+    return response.json().get('observations') or []
+
+
+def run_backfill(station_ids, start, end, workers=None, rate=None, batch_rows=None,
+                 api_url=None, api_key=None, force=False, progress=None):
+    """
+    Récupère et enregistre l'historique de [start, end] (jours locaux, inclus).
+    
+    Au plus 2 × workers jours sont en cours ou en attente d'enregistrement, plus
+    un lot d'au plus batch_rows observations: la mémoire reste bornée.
+    
+    Args:
+        workers: requêtes simultanées (défaut: WEATHER_BACKFILL_WORKERS)
+        rate: requêtes par seconde, nouvelles tentatives comprises (défaut: WEATHER_BACKFILL_RATE)
+        batch_rows: observations par transaction (défaut: WEATHER_BACKFILL_BATCH_ROWS)
+        progress: fonction appelée après chaque lot avec le dict des compteurs
+    
+    Returns:
+        dict {'jobs', 'done', 'failed', 'fetched', 'saved'}
+    """
+    workers = workers or settings.WEATHER_BACKFILL_WORKERS
+    rate = rate or settings.WEATHER_BACKFILL_RATE
+    batch_rows = batch_rows or settings.WEATHER_BACKFILL_BATCH_ROWS
+    
+    jobs = list(plan_jobs(station_ids, start, end, force).order_by('station_id', 'date'))
+    stats = {'jobs': len(jobs), 'done': 0, 'failed': 0, 'fetched': 0, 'saved': 0}
+    if not jobs:
+        return stats
+    
+    client = PWSClient(api_key=api_key, pool_maxsize=workers, rate_limiter=RateLimiter(rate))
+    remaining = iter(jobs)
+    in_flight = {}
+    batch = []
+    batch_size = 0
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-backfill') as executor:
+            def submit():
+                job = next(remaining, None)
+                if job is not None:
+                    future = executor.submit(fetch_day, client, job.station_id, job.date, api_url, api_key)
+                    in_flight[future] = job
+            
+            for _ in range(workers * 2):
+                submit()
+            
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        observations = future.result()
+                    except (requests.RequestException, ValueError) as e:
+                        logger.warning(f"Rattrapage {job.station_id} {job.date}: {str(e)}")
+                        observations = None
+                        job.error = str(e)
+                    except Exception as e:
+                        # Réponse inattendue: seul ce jour échoue, le rattrapage continue
+                        logger.error(f"Rattrapage {job.station_id} {job.date}: {type(e).__name__}: {str(e)}")
+                        observations = None
+                        job.error = f"{type(e).__name__}: {str(e)}"
+                    batch.append((job, observations))
+                    batch_size += len(observations or ())
+                    submit()
+                
+                if batch_size >= batch_rows:
+                    save_batch(batch, stats)
+                    batch, batch_size = [], 0
+                    if progress:
+                        progress(stats)
+            
+            save_batch(batch, stats)
+            if progress:
+                progress(stats)
+    finally:
+        client.close()
+        close_old_connections()
+    
+    return stats
+
+
+def save_batch(batch, stats):
+    """
+    Enregistre les observations d'un lot de jours et met à jour leurs tâches.
+    
+    Chaque jour est jugé sur ses propres observations: terminé si toutes ses
+    observations valides et nouvelles sont en base après l'écriture. Les
+    observations invalides (ou refusées par la base, isolées par
+    save_observations_bulk) sont ignorées et notées sur la tâche du jour, sans
+    faire échouer ses voisins. Si l'écriture échoue entièrement (erreur
+    journalisée, transaction annulée), les jours qui avaient des observations
+    à enregistrer restent à refaire.
+    """
+    if not batch:
+        return
+    
+    days = []
+    for job, day_observations in batch:
+        valid, invalid = [], []
+        for obs_data in day_observations or ():
+            try:
+                validate_observations([obs_data])
+                valid.append(obs_data)
+            except ValueError as e:
+                invalid.append(str(e))
+        days.append((valid, invalid))
+    
+    observations = [obs_data for valid, _ in days for obs_data in valid]
+    existing = existing_keys({(obs_data['stationID'], obs_data['epoch']) for obs_data in observations})
+    new_keys = [
+        {(obs_data['stationID'], obs_data['epoch']) for obs_data in valid} - existing
+        for valid, _ in days
+    ]
+    expected = set().union(*new_keys)
+    
+    saved = WeatherDataService.save_observations_bulk({'observations': observations}) if expected else 0
+    stored = existing_keys(expected) if saved else set()
+    
+    now = timezone.now()
+    for (job, day_observations), (valid, invalid), day_keys in zip(batch, days, new_keys):
+        job.attempts += 1
+        job.updated_at = now
+        if day_observations is None:
+            job.status = BackfillJob.STATUS_FAILED
+            stats['failed'] += 1
+            continue
+        
+        job.fetched_count = len(day_observations)
+        if day_keys and not saved:
+            job.status = BackfillJob.STATUS_FAILED
+            job.error = "Échec de l'enregistrement du lot (voir les journaux)"
+            stats['failed'] += 1
+            continue
+        
+        refused = sorted(epoch for _, epoch in day_keys - stored)
+        job.saved_count = len(day_keys) - len(refused)
+        job.status = BackfillJob.STATUS_DONE
+        ignored = invalid + [f"epoch {epoch} refusé par la base" for epoch in refused]
+        job.error = (
+            f"{len(ignored)} observation(s) ignorée(s): {'; '.join(ignored[:MAX_REPORTED_ROWS])}"
+            if ignored else ''
+        )
+        stats['done'] += 1
+    
+    stats['fetched'] += sum(len(day_observations or ()) for _, day_observations in batch)
+    stats['saved'] += saved
+    BackfillJob.objects.bulk_update(
+        [job for job, _ in batch],
+        ['status', 'attempts', 'fetched_count', 'saved_count', 'error', 'updated_at'],
+        batch_size=PLAN_BATCH_SIZE
+    )
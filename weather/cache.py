@@ -0,0 +1,270 @@
+# cache.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StationMeteo
+
+# Fragment {% cache %} des cartes de station du tableau de bord (dashboard.html)
+STATION_CARD_FRAGMENT = 'station_card'
+# Réponses de GET /api/daily/<station_id>/, par station et par jour
+DAILY_RESPONSE_PREFIX = 'weather:daily'
+
+# Backends propres à chaque processus: les invalidations faites par les autres
+# processus (workers Celery, thread de surveillance, autres workers web) n'y sont pas vues
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class StationCache:
+    """
+    Cache local au processus station_id -> StationMeteo.
+    
+    Borné en taille (éviction LRU) et en durée (TTL). Les entrées sont invalidées
+    par les signaux post_save/post_delete de StationMeteo (voir signals.py); le TTL
+    couvre les modifications faites dans un autre processus ou via QuerySet.update().
+    """
+    
+    def __init__(self, max_size=1024, ttl_seconds=300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, station_id):
+        """Retourne la station en cache, ou None si absente ou expirée"""
+        with self._lock:
+            entry = self._entries.get(station_id)
+            if entry is None:
+                return None
+            
+            station, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[station_id]
+                return None
+            
+            self._entries.move_to_end(station_id)
+            return station
+    
+    def set(self, station):
+        """Ajoute ou rafraîchit une station dans le cache"""
+        with self._lock:
+            self._entries[station.station_id] = (station, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(station.station_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def get_station(self, station_id):
+        """
+        Retourne la station (depuis le cache ou la base).
+        
+        Raises:
+            StationMeteo.DoesNotExist
+        """
+        station = self.get(station_id)
+        if station is None:
+            station = StationMeteo.objects.get(station_id=station_id)
+            self.set(station)
+        return station
+    
+    def get_many(self, station_ids):
+        """Retourne {station_id: StationMeteo} en une seule requête pour les absents du cache"""
+        stations = {}
+        missing = []
+        for station_id in station_ids:
+            station = self.get(station_id)
+            if station is None:
+                missing.append(station_id)
+            else:
+                stations[station_id] = station
+        
+        if missing:
+            for station in StationMeteo.objects.filter(station_id__in=missing):
+                self.set(station)
+                stations[station.station_id] = station
+        
+        return stations
+    
+    async def aget_station(self, station_id):
+        """Version asynchrone de get_station (ORM asynchrone pour les absents du cache)"""
+        station = self.get(station_id)
+        if station is None:
+            station = await StationMeteo.objects.aget(station_id=station_id)
+            self.set(station)
+        return station
+    
+    async def aget_many(self, station_ids):
+        """Version asynchrone de get_many"""
+        stations = {}
+        missing = []
+        for station_id in station_ids:
+            station = self.get(station_id)
+            if station is None:
+                missing.append(station_id)
+            else:
+                stations[station_id] = station
+        
+        if missing:
+            async for station in StationMeteo.objects.filter(station_id__in=missing):
+                self.set(station)
+                stations[station.station_id] = station
+        
+        return stations
+    
+    def invalidate(self, station=None):
+        """Retire une station du cache (par station_id et par clé primaire), ou vide le cache"""
+        with self._lock:
+            if station is None:
+                self._entries.clear()
+                return
+            
+            self._entries.pop(station.station_id, None)
+            # Le station_id a pu être modifié: retirer aussi l'ancienne clé
+            stale_keys = [
+                key for key, (cached, _) in self._entries.items()
+                if cached.pk == station.pk
+            ]
+            for key in stale_keys:
+                del self._entries[key]
+
+
+station_cache = StationCache(
+    max_size=getattr(settings, 'WEATHER_STATION_CACHE_SIZE', 1024),
+    ttl_seconds=getattr(settings, 'WEATHER_STATION_CACHE_TTL', 300)
+)
+
+
+def is_shared_cache():
+    """Indique si le cache par défaut est partagé entre processus (Redis, Memcached...)"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def dashboard_cache_ttl():
+    """Durée des fragments du tableau de bord: bornée à WEATHER_LOCAL_CACHE_TTL avec un cache local"""
+    if is_shared_cache():
+        return settings.WEATHER_DASHBOARD_CACHE_TTL
+    return min(settings.WEATHER_DASHBOARD_CACHE_TTL, settings.WEATHER_LOCAL_CACHE_TTL)
+
+
+def daily_cache_ttl(day):
+    """
+    Durée de mise en cache de la réponse journalière d'un jour (None: pas de cache).
+    
+    Avec un cache local au processus, une réception dans un autre processus
+    n'invalide pas la réponse: les jours encore alimentés (WEATHER_DAILY_IMMUTABLE_AFTER)
+    ne sont pas mis en cache, les autres le sont pour WEATHER_LOCAL_CACHE_TTL secondes.
+    """
+    if is_shared_cache():
+        return settings.WEATHER_DAILY_CACHE_TTL
+    if day > timezone.now().date() - timedelta(days=settings.WEATHER_DAILY_IMMUTABLE_AFTER):
+        return None
+    return settings.WEATHER_LOCAL_CACHE_TTL
+
+
+def station_card_key(station_pk, day):
+    """Clé du fragment en cache de la carte d'une station pour un jour donné"""
+    return make_template_fragment_key(STATION_CARD_FRAGMENT, [station_pk, day])
+
+
+def daily_response_keys(station_pk, day):
+    """Clés (réponse, version) de la réponse journalière en cache d'une station"""
+    suffix = f"{station_pk}:{day.isoformat()}"
+    return f"{DAILY_RESPONSE_PREFIX}:{suffix}", f"{DAILY_RESPONSE_PREFIX}:version:{suffix}"
+
+
+def get_daily_response(station_pk, day):
+    """
+    Réponse journalière en cache.
+    
+    Chaque réponse est enregistrée avec la version courante de son jour; une
+    réception de données change la version, ce qui invalide aussi une réponse
+    calculée pendant la réception et mise en cache juste après.
+    
+    Returns:
+        (entrée ou None, version à passer à set_daily_response; None si le jour
+         n'est pas mis en cache, voir daily_cache_ttl)
+    """
+    ttl = daily_cache_ttl(day)
+    if ttl is None:
+        return None, None
+    
+    response_key, version_key = daily_response_keys(station_pk, day)
+    values = cache.get_many([response_key, version_key])
+    
+    version = values.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, ttl)
+        version = cache.get(version_key)
+    
+    entry = values.get(response_key)
+    if entry is None or entry['version'] != version:
+        return None, version
+    return entry, version
+
+
+async def aget_daily_response(station_pk, day):
+    """Version asynchrone de get_daily_response"""
+    ttl = daily_cache_ttl(day)
+    if ttl is None:
+        return None, None
+    
+    response_key, version_key = daily_response_keys(station_pk, day)
+    values = await cache.aget_many([response_key, version_key])
+    
+    version = values.get(version_key)
+    if version is None:
+        await cache.aadd(version_key, uuid.uuid4().hex, ttl)
+        version = await cache.aget(version_key)
+    
+    entry = values.get(response_key)
+    if entry is None or entry['version'] != version:
+        return None, version
+    return entry, version
+
+
+def set_daily_response(station_pk, day, version, entry):
+    """Met en cache une réponse journalière calculée pour la version donnée (None: pas de cache)"""
+    if version is None:
+        return
+    response_key, _ = daily_response_keys(station_pk, day)
+    cache.set(response_key, {**entry, 'version': version}, daily_cache_ttl(day))
+
+
+def invalidate_station_days(keys):
+    """
+    Invalide les fragments et réponses en cache qui dépendent des jours modifiés.
+    
+    L'invalidation a lieu après la validation de la transaction en cours, pour
+    qu'un rendu concurrent ne remette pas en cache des données pas encore visibles.
+    
+    Args:
+        keys: couples (station_pk, date) modifiés (voir update_daily_summaries)
+    """
+    if not keys:
+        return
+    
+    # La carte du jour affiche aussi la dernière observation de la station
+    today = timezone.now().date()
+    card_keys = {station_card_key(station_pk, day) for station_pk, day in keys}
+    card_keys.update(station_card_key(station_pk, today) for station_pk, _ in keys)
+    
+    version_keys = [daily_response_keys(station_pk, day)[1] for station_pk, day in keys]
+    
+    def invalidate():
+        cache.delete_many(list(card_keys))
+        cache.set_many(
+            {version_key: uuid.uuid4().hex for version_key in version_keys},
+            settings.WEATHER_DAILY_CACHE_TTL
+        )
+    
+    transaction.on_commit(invalidate)
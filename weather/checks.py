@@ -0,0 +1,24 @@
+# checks.py
+from django.core.checks import Tags, Warning, register
+
+from .cache import is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Cache local au processus en production: invalidations non partagées (voir cache.py)"""
+    if is_shared_cache():
+        return []
+    return [
+        Warning(
+            "Le cache par défaut est local au processus: les réceptions faites par les "
+            "workers Celery, le thread de surveillance ou les autres workers web "
+            "n'invalident pas les réponses en cache des autres processus.",
+            hint=(
+                "Définir WEATHER_CACHE_URL (Redis). Sans cache partagé, les jours récents "
+                "de /api/daily/ ne sont pas mis en cache et les autres entrées expirent "
+                "après WEATHER_LOCAL_CACHE_TTL secondes."
+            ),
+            id='weather.W001',
+        )
+    ]
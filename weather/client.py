@@ -0,0 +1,230 @@
+# client.py
+"""
+Client HTTP de l'API PWS Weather.com.
+
+- sessions persistantes avec pool de connexions (keep-alive)
+- délais de connexion et de lecture distincts
+- nouvelles tentatives avec backoff exponentiel et jitter sur les erreurs transitoires
+- respect de l'en-tête Retry-After (429/503)
+- requêtes conditionnelles (If-None-Match / If-Modified-Since) quand l'API fournit ETag / Last-Modified
+- limitation de débit optionnelle (seau à jetons partagé entre threads)
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PWSError(requests.RequestException):
+    """Échec définitif d'une requête vers l'API PWS (après les nouvelles tentatives)"""
+
+
+class RateLimiter:
+    """Seau à jetons partagé entre threads: au plus `rate` requêtes par seconde, rafales de `burst`"""
+    
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Attend qu'un jeton soit disponible et le consomme"""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            self.sleep(delay)
+
+
+class PWSClient:
+    """Client de l'API PWS, partageable entre threads"""
+    
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, api_key=None, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, max_retry_after=None, pool_maxsize=None,
+                 rate_limiter=None, sleep=time.sleep):
+        """
+        Args:
+            api_key: Clé API Weather.com (défaut: WEATHER_API_KEY)
+            connect_timeout / read_timeout: délais en secondes
+            max_retries: nombre de nouvelles tentatives après le premier essai
+            backoff_base / backoff_max: délai de base et plafond du backoff exponentiel
+            max_retry_after: Retry-After au-delà duquel on abandonne plutôt que d'attendre
+            pool_maxsize: connexions conservées par hôte
+            rate_limiter: RateLimiter appliqué à chaque tentative (optionnel)
+            sleep: fonction d'attente (remplaçable pour les tests)
+        """
+        self.api_key = api_key or settings.WEATHER_API_KEY
+        self.connect_timeout = connect_timeout or settings.WEATHER_HTTP_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or settings.WEATHER_HTTP_READ_TIMEOUT
+        self.max_retries = settings.WEATHER_HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or settings.WEATHER_HTTP_BACKOFF_BASE
+        self.backoff_max = backoff_max or settings.WEATHER_HTTP_BACKOFF_MAX
+        self.max_retry_after = max_retry_after or settings.WEATHER_HTTP_MAX_RETRY_AFTER
+        self.rate_limiter = rate_limiter
+        self.sleep = sleep
+        
+        pool_maxsize = pool_maxsize or settings.WEATHER_POLL_WORKERS
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Validateurs de cache HTTP par (url, station): {'etag': ..., 'last_modified': ...}
+        self._validators = {}
+        self._lock = threading.Lock()
+    
+    def fetch_observations(self, station_id, url=None, api_key=None, params=None, conditional=True):
+        """
+        Récupère les observations d'une station.
+        
+        Returns:
+            requests.Response (status 304 si le contenu n'a pas changé depuis la requête précédente)
+        
+        Raises:
+            PWSError si toutes les tentatives échouent, requests.HTTPError sur une erreur non transitoire
+        """
+        url = url or settings.WEATHER_API_URL
+        query = {
+            'format': 'json',
+            'units': 'e',  # Imperial units (nous convertissons en métrique)
+            'apiKey': api_key or self.api_key,
+            'stationId': station_id,
+        }
+        query.update(params or {})
+        
+        key = self._validator_key(url, station_id, params)
+        headers = self._conditional_headers(key) if conditional else {}
+        
+        response = self._get_with_retries(url, query, headers)
+        if conditional and response.status_code != 304:
+            self._remember_validators(key, response)
+        return response
+    
+    def forget_validators(self, station_id, url=None, params=None):
+        """
+        Oublie l'ETag / Last-Modified d'une station: à appeler si le traitement de
+        la dernière réponse a échoué, pour que la prochaine requête ne reçoive pas de 304.
+        """
+        key = self._validator_key(url or settings.WEATHER_API_URL, station_id, params)
+        with self._lock:
+            self._validators.pop(key, None)
+    
+    def close(self):
+        self.session.close()
+    
+    @staticmethod
+    def _validator_key(url, station_id, params):
+        return (url, station_id, tuple(sorted((params or {}).items())))
+    
+    def _get_with_retries(self, url, params, headers):
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = self.session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=(self.connect_timeout, self.read_timeout)
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                delay = self._backoff_delay(attempt)
+            else:
+                if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response
+                
+                error = requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                retry_after = self._retry_after(response)
+                delay = self._backoff_delay(attempt) if retry_after is None else retry_after
+            
+            if attempt == self.max_retries:
+                break
+            if delay > self.max_retry_after:
+                logger.warning(f"Retry-After de {delay:.0f}s trop long, abandon de la requête")
+                break
+            
+            logger.warning(
+                f"Erreur transitoire de l'API ({error}), nouvelle tentative "
+                f"{attempt + 1}/{self.max_retries} dans {delay:.1f}s"
+            )
+            self.sleep(delay)
+        
+        raise PWSError(f"Échec de la requête après {attempt + 1} tentative(s): {error}") from error
+    
+    def _backoff_delay(self, attempt):
+        """Backoff exponentiel plafonné avec jitter complet"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    @staticmethod
+    def _retry_after(response):
+        """Délai demandé par l'en-tête Retry-After (secondes ou date HTTP), None si absent"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - timezone.now()).total_seconds())
+        except (TypeError, ValueError):
+            return None
+    
+    def _conditional_headers(self, key):
+        with self._lock:
+            validators = self._validators.get(key, {})
+        
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+    
+    def _remember_validators(self, key, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            if etag or last_modified:
+                self._validators[key] = {'etag': etag, 'last_modified': last_modified}
+            else:
+                self._validators.pop(key, None)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Client partagé du processus (Celery, commandes de gestion)"""
+    global _default_client
+    
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = PWSClient()
+        return _default_client
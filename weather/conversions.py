@@ -0,0 +1,161 @@
+# conversions.py
+"""
+Conversions des unités impériales (API Weather.com, units=e) vers le système métrique.
+
+Les fonctions scalaires servent à l'enregistrement unitaire; convert_imperial_batch
+convertit un lot complet colonne par colonne avec NumPy, avec exactement les mêmes
+arrondis que les fonctions scalaires.
+"""
+from itertools import chain
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy absent: repli sur les conversions scalaires
+    np = None
+
+
+def fahrenheit_to_celsius(f_temp):
+    """Convertit Fahrenheit en Celsius"""
+    if f_temp is None:
+        return None
+    return round((f_temp - 32) * 5/9, 1)
+
+
+def mph_to_kmh(mph):
+    """Convertit mph en km/h"""
+    if mph is None:
+        return None
+    return round(mph * 1.60934, 1)
+
+
+def inches_to_mm(inches):
+    """Convertit inches en mm"""
+    if inches is None:
+        return None
+    return round(inches * 25.4, 1)
+
+
+def incheshg_to_hpa(inches_hg):
+    """Convertit inches Hg en hPa"""
+    if inches_hg is None:
+        return None
+    return round(inches_hg * 33.8639, 1)
+
+
+# Formules vectorisées: mêmes opérations, dans le même ordre, que les fonctions scalaires
+_VECTOR_FORMULAS = {
+    fahrenheit_to_celsius: lambda values: (values - 32) * 5 / 9,
+    mph_to_kmh: lambda values: values * 1.60934,
+    inches_to_mm: lambda values: values * 25.4,
+    incheshg_to_hpa: lambda values: values * 33.8639,
+}
+
+# Types acceptés dans un bloc 'imperial' (None: valeur manquante)
+_NUMERIC_TYPES = {int, float, bool, type(None)}
+
+# Clé du bloc 'imperial' -> (champ ObservationMeteo, conversion)
+IMPERIAL_FIELDS = (
+    ('tempHigh', 'temp_high', fahrenheit_to_celsius),
+    ('tempLow', 'temp_low', fahrenheit_to_celsius),
+    ('tempAvg', 'temp_avg', fahrenheit_to_celsius),
+    ('windspeedHigh', 'windspeed_high', mph_to_kmh),
+    ('windspeedLow', 'windspeed_low', mph_to_kmh),
+    ('windspeedAvg', 'windspeed_avg', mph_to_kmh),
+    ('windgustHigh', 'windgust_high', mph_to_kmh),
+    ('windgustLow', 'windgust_low', mph_to_kmh),
+    ('windgustAvg', 'windgust_avg', mph_to_kmh),
+    ('dewptHigh', 'dewpt_high', fahrenheit_to_celsius),
+    ('dewptLow', 'dewpt_low', fahrenheit_to_celsius),
+    ('dewptAvg', 'dewpt_avg', fahrenheit_to_celsius),
+    ('windchillHigh', 'windchill_high', fahrenheit_to_celsius),
+    ('windchillLow', 'windchill_low', fahrenheit_to_celsius),
+    ('windchillAvg', 'windchill_avg', fahrenheit_to_celsius),
+    ('heatindexHigh', 'heatindex_high', fahrenheit_to_celsius),
+    ('heatindexLow', 'heatindex_low', fahrenheit_to_celsius),
+    ('heatindexAvg', 'heatindex_avg', fahrenheit_to_celsius),
+    ('pressureMax', 'pressure_max', incheshg_to_hpa),
+    ('pressureMin', 'pressure_min', incheshg_to_hpa),
+    ('precipRate', 'precip_rate', inches_to_mm),
+    ('precipTotal', 'precip_total', inches_to_mm),
+)
+
+
+def convert_imperial(imperial_data):
+    """Convertit un bloc 'imperial' en dict {champ du modèle: valeur métrique}"""
+    return {
+        field: convert(imperial_data.get(key))
+        for key, field, convert in IMPERIAL_FIELDS
+    }
+
+
+def _round1(values):
+    """
+    Arrondi à 1 décimale identique à round(x, 1).
+    
+    np.round calcule rint(x * 10) / 10, ce qui ne peut différer de l'arrondi
+    décimal exact de Python que lorsque x * 10 tombe (presque) sur une demi-unité:
+    ces rares valeurs sont recalculées avec round().
+    """
+    scaled = values * 10
+    rounded = np.round(values, 1)
+    
+    distance_to_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    for index in np.flatnonzero(distance_to_half < 1e-6):
+        rounded[index] = round(float(values[index]), 1)
+    
+    return rounded
+
+
+def _extract_columns(imperial_blocks):
+    """
+    Matrice (observations x champs) des valeurs impériales, None -> NaN.
+    
+    Raises:
+        TypeError: valeur non numérique (chaîne comprise, refusée comme par les
+                   fonctions scalaires)
+    """
+    get_all = itemgetter(*(key for key, _, _ in IMPERIAL_FIELDS))
+    try:
+        # Cas courant: l'API renvoie toutes les clés (éventuellement à null)
+        rows = [get_all(imperial_data) for imperial_data in imperial_blocks]
+    except KeyError:
+        rows = [
+            [imperial_data.get(key) for key, _, _ in IMPERIAL_FIELDS]
+            for imperial_data in imperial_blocks
+        ]
+    
+    # np.array accepterait les chaînes numériques ("61"): types vérifiés d'abord
+    invalid_types = set(map(type, chain.from_iterable(rows))) - _NUMERIC_TYPES
+    if invalid_types:
+        raise TypeError(f"Valeurs non numériques: {', '.join(sorted(t.__name__ for t in invalid_types))}")
+    return np.array(rows, dtype=np.float64)
+
+
+def convert_imperial_batch(imperial_blocks):
+    """
+    Convertit une liste de blocs 'imperial' colonne par colonne.
+    
+    Les valeurs manquantes (None ou clé absente) restent None.
+    
+    Raises:
+        TypeError: bloc ou valeur non numérique; convertir alors chaque bloc
+                   avec convert_imperial pour n'écarter que les blocs invalides
+    
+    Returns:
+        liste de dicts {champ du modèle: valeur métrique}, dans l'ordre des blocs
+    """
+    if np is None or not imperial_blocks:
+        return [convert_imperial(imperial_data) for imperial_data in imperial_blocks]
+    
+    values = _extract_columns(imperial_blocks)
+    converted = np.empty_like(values)
+    for column, (_, _, convert) in enumerate(IMPERIAL_FIELDS):
+        converted[:, column] = _round1(_VECTOR_FORMULAS[convert](values[:, column]))
+    
+    # NaN -> None
+    result = converted.astype(object)
+    result[np.isnan(values)] = None
+    
+    fields = [field for _, field, _ in IMPERIAL_FIELDS]
+    return [dict(zip(fields, row)) for row in result.tolist()]
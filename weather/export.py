@@ -0,0 +1,237 @@
+# export.py
+"""
+Export en masse des observations (GET /api/export/, commande export_observations).
+
+Les observations sont lues par lots par pagination sur la clé (station, epoch):
+la mémoire reste bornée quel que soit le volume, y compris sous MySQL où le
+curseur client charge sinon tout le résultat. Formats:
+
+- csv: une ligne par observation, produite au fil de la lecture;
+- arrow: flux Arrow IPC, un lot d'enregistrements par lot lu (pyarrow requis);
+- npz: archive NumPy, une colonne par tableau. Les colonnes sont écrites lot par
+  lot dans des fichiers temporaires puis assemblées dans l'archive.
+"""
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from datetime import datetime, timezone as dt_timezone
+
+try:
+    import numpy as np
+except ImportError:  # NumPy absent: format npz indisponible
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow absent: format arrow indisponible
+    pa = None
+
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .models import ObservationMeteo
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'npz': ('application/octet-stream', 'npz'),
+}
+
+# Observations lues par requête
+EXPORT_CHUNK_SIZE = 10000
+
+# Colonnes exportées après station_id, epoch, obs_time_utc et obs_time_local
+VALUE_COLUMNS = (
+    'temp_high', 'temp_low', 'temp_avg',
+    'humidity_high', 'humidity_low', 'humidity_avg',
+    'dewpt_high', 'dewpt_low', 'dewpt_avg',
+    'windchill_high', 'windchill_low', 'windchill_avg',
+    'heatindex_high', 'heatindex_low', 'heatindex_avg',
+    'windspeed_high', 'windspeed_low', 'windspeed_avg',
+    'windgust_high', 'windgust_low', 'windgust_avg',
+    'winddir_avg',
+    'pressure_max', 'pressure_min', 'pressure_trend',
+    'precip_rate', 'precip_total',
+    'solar_radiation_high', 'uv_high',
+    'qc_status',
+)
+COLUMNS = ('station_id', 'epoch', 'obs_time_utc', 'obs_time_local', *VALUE_COLUMNS)
+
+
+def available_formats():
+    """Formats utilisables avec les dépendances installées"""
+    formats = ['csv']
+    if pa is not None:
+        formats.append('arrow')
+    if np is not None:
+        formats.append('npz')
+    return formats
+
+
+def iter_chunks(stations, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Lots d'observations, station par station puis par epoch croissant.
+    
+    Chaque lot est une recherche sur l'index unique (station, epoch):
+    epoch > dernier epoch lu, LIMIT chunk_size. Les lignes sont des tuples
+    (station_id, epoch, heure locale 'YYYY-MM-DD HH:MM:SS', *VALUE_COLUMNS):
+    l'heure locale est lue en texte et l'heure UTC est déduite de l'epoch, ce qui
+    évite la conversion ligne à ligne des dates par l'ORM (l'essentiel du temps
+    de lecture).
+    
+    Args:
+        start, end: bornes [start, end) en epoch, optionnelles
+    """
+    for station in stations:
+        observations = ObservationMeteo.objects.filter(station=station)
+        if start is not None:
+            observations = observations.filter(epoch__gte=start)
+        if end is not None:
+            observations = observations.filter(epoch__lt=end)
+        observations = observations.annotate(
+            local_text=Cast('obs_time_local', CharField())
+        ).order_by('epoch').values_list('epoch', 'local_text', *VALUE_COLUMNS)
+        
+        last_epoch = None
+        while True:
+            page = observations if last_epoch is None else observations.filter(epoch__gt=last_epoch)
+            rows = list(page[:chunk_size])
+            if not rows:
+                break
+            # PostgreSQL ajoute le décalage ('+00') au texte
+            yield [(station.station_id, epoch, local[:19], *values) for epoch, local, *values in rows]
+            if len(rows) < chunk_size:
+                break
+            last_epoch = rows[-1][0]
+
+
+class _Echo:
+    """Pseudo-fichier qui renvoie ce qu'on y écrit (csv.writer en flux)"""
+    
+    def write(self, value):
+        return value
+
+
+def iter_csv(chunks):
+    """Export CSV par morceaux (str), en-tête compris"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for rows in chunks:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (station_id, epoch, datetime.fromtimestamp(epoch, dt_timezone.utc).isoformat(), local, *values)
+            for station_id, epoch, local, *values in rows
+        )
+        yield buffer.getvalue()
+
+
+def arrow_schema():
+    """Schéma Arrow de l'export (valeurs numériques en float64, None -> null)"""
+    return pa.schema(
+        [
+            ('station_id', pa.string()),
+            ('epoch', pa.int64()),
+            ('obs_time_utc', pa.timestamp('s', tz='UTC')),
+            # Heure locale de la station, sans fuseau
+            ('obs_time_local', pa.timestamp('s')),
+        ]
+        + [(column, pa.float64()) for column in VALUE_COLUMNS if column != 'qc_status']
+        + [('qc_status', pa.int32())]
+    )
+
+
+def iter_arrow(chunks):
+    """Flux Arrow IPC par morceaux (bytes), un lot d'enregistrements par lot lu"""
+    if pa is None:
+        raise RuntimeError("Format arrow indisponible: pyarrow n'est pas installé")
+    
+    schema = arrow_schema()
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        station_ids, epochs, local_times, *values = zip(*rows)
+        arrays = [
+            pa.array(station_ids, type=pa.string()),
+            pa.array(epochs, type=pa.int64()),
+            # obs_time_utc: l'epoch lui-même
+            pa.array(epochs, type=schema.field('obs_time_utc').type),
+            pa.array(local_times, type=pa.string()).cast(pa.timestamp('s')),
+        ] + [pa.array(column, type=field.type) for column, field in zip(values, list(schema)[4:])]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+def npz_dtypes():
+    """
+    Type NumPy de chaque colonne de l'archive npz (valeurs manquantes: NaN).
+    
+    station_id est remplacé par station_index, indice dans le tableau station_ids.
+    """
+    dtypes = {
+        'station_id': np.dtype('int32'),
+        'epoch': np.dtype('int64'),
+        'obs_time_utc': np.dtype('datetime64[s]'),
+        'obs_time_local': np.dtype('datetime64[s]'),
+        'qc_status': np.dtype('int32'),
+    }
+    return [dtypes.get(column, np.dtype('float64')) for column in COLUMNS]
+
+
+def write_npz(chunks, output):
+    """
+    Écrit une archive .npz (un tableau par colonne) dans output (fichier binaire).
+    
+    Chaque colonne est ajoutée lot par lot à un fichier temporaire brut; l'en-tête
+    .npy, qui contient le nombre de lignes, est écrit une fois la lecture terminée.
+    
+    Returns:
+        nombre d'observations exportées
+    """
+    if np is None:
+        raise RuntimeError("Format npz indisponible: NumPy n'est pas installé")
+    
+    dtypes = npz_dtypes()
+    names = ['station_index', *COLUMNS[1:]]
+    station_ids = {}
+    count = 0
+    with tempfile.TemporaryDirectory(prefix='weather-export-') as directory:
+        paths = [os.path.join(directory, f'{name}.bin') for name in names]
+        files = [open(path, 'wb') for path in paths]
+        try:
+            for rows in chunks:
+                columns = list(zip(*rows))
+                columns[0] = [station_ids.setdefault(station_id, len(station_ids)) for station_id in columns[0]]
+                # obs_time_utc déduit de l'epoch, obs_time_local analysé par NumPy
+                columns.insert(2, columns[1])
+                for file, values, dtype in zip(files, columns, dtypes):
+                    # None -> NaN pour les colonnes float64
+                    np.asarray(values, dtype=dtype).tofile(file)
+                count += len(rows)
+        finally:
+            for file in files:
+                file.close()
+        
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name, path, dtype in zip(names, paths, dtypes):
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as member, open(path, 'rb') as data:
+                    np.lib.format.write_array_header_1_0(member, {
+                        'descr': np.lib.format.dtype_to_descr(dtype),
+                        'fortran_order': False,
+                        'shape': (count,),
+                    })
+                    while True:
+                        block = data.read(1024 * 1024)
+                        if not block:
+                            break
+                        member.write(block)
+            
+            with archive.open('station_ids.npy', 'w') as member:
+                np.lib.format.write_array(member, np.array(list(station_ids), dtype='U50'))
+    
+    return count
@@ -0,0 +1,275 @@
+# ingest.py
+"""
+Réception asynchrone (write-behind) de POST /api/receive/.
+
+La vue valide l'envoi, crée un IngestBatch et place ses observations dans une
+file bornée, puis répond 202 avec l'identifiant du lot. Le BatchWriter, un
+thread par processus, regroupe les envois de plusieurs requêtes (jusqu'à
+WEATHER_INGEST_COALESCE_ROWS observations ou WEATHER_INGEST_COALESCE_WAIT
+secondes d'attente) en un seul save_observations_bulk, puis met à jour l'état
+des lots (GET /api/receive/batches/<batch_id>/).
+
+File pleine: la vue répond 503 avec Retry-After. Les lots en file sont
+enregistrés avant la sortie normale du processus (atexit); après un arrêt
+brutal ils restent 'queued' et l'envoi peut être répété sans risque, les
+doublons étant écartés.
+"""
+import atexit
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import IngestBatch, ObservationMeteo
+from .services import WeatherDataService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Champs sans lesquels une observation ne peut pas être enregistrée (lat, lon et tz:
+# création de la station à sa première réception)
+REQUIRED_FIELDS = ('stationID', 'epoch', 'obsTimeLocal', 'lat', 'lon', 'tz')
+
+# Tentatives d'une écriture (verrous, interblocages), avec un délai doublé à chaque fois
+WRITE_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 0.5  # secondes
+
+
+def is_number(value):
+    """Nombre JSON (les booléens sont exclus)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_observations(observations):
+    """
+    Vérifie un envoi avant sa mise en file: une observation acceptée ne doit pas
+    être écartée à l'enregistrement (champs de la station, dates, valeurs numériques).
+    
+    Raises:
+        ValueError: première observation invalide
+    """
+    if not observations:
+        raise ValueError("Aucune observation")
+    for index, obs_data in enumerate(observations):
+        if not isinstance(obs_data, dict):
+            raise ValueError(f"Observation {index}: objet JSON attendu")
+        missing = [field for field in REQUIRED_FIELDS if obs_data.get(field) in (None, '')]
+        if missing:
+            raise ValueError(f"Observation {index}: champs manquants: {', '.join(missing)}")
+        if not isinstance(obs_data['epoch'], int) or isinstance(obs_data['epoch'], bool):
+            raise ValueError(f"Observation {index}: epoch entier attendu")
+        if not (is_number(obs_data['lat']) and is_number(obs_data['lon'])):
+            raise ValueError(f"Observation {index}: lat et lon numériques attendus")
+        
+        imperial = obs_data.get('imperial', {})
+        if not (isinstance(imperial, dict) and all(value is None or is_number(value) for value in imperial.values())):
+            raise ValueError(f"Observation {index}: valeurs impériales numériques attendues")
+        
+        # Construction identique à l'enregistrement: dates et tous les champs numériques du modèle
+        try:
+            WeatherDataService.build_observation(None, obs_data)
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            raise ValueError(f"Observation {index}: {str(e)}")
+
+
+def existing_keys(keys):
+    """Couples (station_id, epoch) déjà en base parmi keys, en une requête sur la plage d'epochs"""
+    if not keys:
+        return set()
+    
+    epochs = [epoch for _, epoch in keys]
+    return set(
+        ObservationMeteo.objects.filter(
+            station__station_id__in={station_id for station_id, _ in keys},
+            epoch__gte=min(epochs),
+            epoch__lte=max(epochs)
+        ).values_list('station__station_id', 'epoch')
+    )
+
+
+class BatchWriter(threading.Thread):
+    """
+    Thread d'enregistrement des envois acceptés en mode asynchrone.
+    
+    Les envois de plusieurs requêtes sont regroupés en une seule écriture en
+    bloc. Les observations nouvelles de chaque lot sont décomptées avant
+    l'écriture: s'il en manque ensuite en base (erreur journalisée, transaction
+    annulée), les manquantes sont réécrites. Une ligne refusée par la base est
+    isolée par save_observations_bulk et signalée dans IngestBatch.rejected,
+    sans faire échouer le reste de son lot.
+    """
+    
+    def __init__(self, queue_size=None, coalesce_rows=None, coalesce_wait=None):
+        super().__init__(daemon=True, name='ingest-batch-writer')
+        self.queue = queue.Queue(maxsize=queue_size or settings.WEATHER_INGEST_QUEUE_SIZE)
+        self.coalesce_rows = coalesce_rows or settings.WEATHER_INGEST_COALESCE_ROWS
+        self.coalesce_wait = settings.WEATHER_INGEST_COALESCE_WAIT if coalesce_wait is None else coalesce_wait
+        self._stop_event = threading.Event()
+    
+    def submit(self, batch, observations):
+        """Met un lot en file; False si la file est pleine"""
+        try:
+            self.queue.put_nowait((batch, observations))
+            return True
+        except queue.Full:
+            return False
+    
+    def run(self):
+        logger.info("BatchWriter démarré")
+        while not (self._stop_event.is_set() and self.queue.empty()):
+            try:
+                items = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            
+            # Regroupement: autres envois arrivés pendant coalesce_wait secondes
+            rows = len(items[0][1])
+            deadline = time.monotonic() + self.coalesce_wait
+            while rows < self.coalesce_rows:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                items.append(item)
+                rows += len(item[1])
+            
+            try:
+                self.write(items)
+            except Exception as e:
+                logger.error(f"BatchWriter: {str(e)}")
+            finally:
+                close_old_connections()
+        logger.info("BatchWriter arrêté")
+    
+    def write(self, items):
+        """
+        Enregistre des lots (batch, observations) en une écriture et met à jour leur état.
+        
+        Les observations nouvelles de chaque lot sont fixées avant la première
+        tentative: les enregistrées et les refusées sont décomptées par lot, même
+        si une tentative précédente en a déjà enregistré une partie.
+        """
+        new_keys = self._new_keys(items)
+        missing = set().union(*new_keys)
+        
+        for attempt in range(WRITE_ATTEMPTS):
+            if not missing:
+                break
+            if attempt:
+                time.sleep(WRITE_RETRY_DELAY * 2 ** (attempt - 1))
+            missing = self._save(items, missing)
+        
+        now = timezone.now()
+        batches = []
+        for (batch, observations), keys in zip(items, new_keys):
+            rejected = keys & missing
+            # Lignes refusées (isolées par save_observations_bulk): signalées une à une,
+            # le lot n'échoue que si aucune de ses observations nouvelles n'est enregistrée
+            batch.status = IngestBatch.STATUS_FAILED if rejected and rejected == keys else IngestBatch.STATUS_DONE
+            batch.saved_count = len(keys) - len(rejected)
+            batch.skipped_count = len(observations) - len(keys)
+            batch.rejected = self._rejected_rows(observations, rejected)
+            batch.error = f"{len(rejected)} observation(s) refusée(s) (voir les journaux)" if rejected else ''
+            batch.completed_at = now
+            batches.append(batch)
+        IngestBatch.objects.bulk_update(
+            batches, ['status', 'saved_count', 'skipped_count', 'rejected', 'error', 'completed_at']
+        )
+    
+    @staticmethod
+    def _rejected_rows(observations, rejected):
+        """[{'index', 'station_id', 'epoch'}] des observations refusées (première occurrence)"""
+        rows = []
+        for index, obs_data in enumerate(observations):
+            key = (obs_data['stationID'], obs_data['epoch'])
+            if key in rejected:
+                rows.append({'index': index, 'station_id': key[0], 'epoch': key[1]})
+                rejected = rejected - {key}
+        return rows
+    
+    @staticmethod
+    def _new_keys(items):
+        """Couples (station_id, epoch) nouveaux de chaque lot (un couple répété revient au premier lot)"""
+        keys = [
+            {(obs_data['stationID'], obs_data['epoch']) for obs_data in observations}
+            for _, observations in items
+        ]
+        seen = existing_keys(set().union(*keys))
+        
+        new_keys = []
+        for batch_keys in keys:
+            new = batch_keys - seen
+            seen |= new
+            new_keys.append(new)
+        return new_keys
+    
+    @staticmethod
+    def _save(items, missing):
+        """
+        Enregistre les observations de missing.
+        
+        Returns:
+            couples de missing toujours absents de la base après l'écriture
+        """
+        observations = {}
+        for _, batch_observations in items:
+            for obs_data in batch_observations:
+                key = (obs_data['stationID'], obs_data['epoch'])
+                if key in missing:
+                    observations.setdefault(key, obs_data)
+        
+        WeatherDataService.save_observations_bulk({'observations': list(observations.values())})
+        return missing - existing_keys(missing)
+    
+    def stop(self):
+        """Arrête le thread une fois la file vidée"""
+        self._stop_event.set()
+
+
+# BatchWriter de ce processus, démarré au premier envoi asynchrone
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_batch_writer():
+    """Retourne le BatchWriter du processus, démarré si besoin"""
+    global _writer
+    
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = BatchWriter()
+            _writer.start()
+        return _writer
+
+
+def stop_batch_writer(timeout=30):
+    """Arrête le BatchWriter après l'enregistrement des lots en file"""
+    global _writer
+    
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer:
+        writer.stop()
+        writer.join(timeout=timeout)
+
+
+def enqueue_observations(observations):
+    """
+    Crée le lot et le met en file.
+    
+    Returns:
+        IngestBatch, ou None si la file est pleine
+    """
+    writer = get_batch_writer()
+    batch = IngestBatch.objects.create(observation_count=len(observations))
+    if not writer.submit(batch, observations):
+        batch.delete()
+        return None
+    return batch
+
+
+# Lots en file enregistrés à la sortie normale du processus
+atexit.register(stop_batch_writer)
@@ -0,0 +1,197 @@
+# leader.py
+"""
+Élection d'un leader pour la collecte: une seule instance (processus web,
+worker...) fait tourner WeatherMonitorThread.
+
+Le bail est une ligne IngestionLease prise ou renouvelée par un UPDATE
+conditionnel (libre, expiré ou déjà détenu par l'instance), atomique sur toutes
+les bases. Le leader le renouvelle tous les tiers de WEATHER_LEADER_LEASE_TTL;
+s'il disparaît, une autre instance le reprend à l'expiration. Les horloges des
+instances sont supposées synchronisées (NTP).
+
+Tant que le bail est détenu, dispatch_fetch_task (Celery beat) ne planifie
+aucune récupération: l'API n'est jamais interrogée par les deux chemins.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import IngestionLease
+import logging
+
+logger = logging.getLogger(__name__)
+
+MONITOR_LEASE = 'weather-monitor'
+
+# Identifiant de l'instance (processus)
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def try_acquire(name, holder, ttl):
+    """
+    Prend ou renouvelle le bail.
+    
+    Returns:
+        True si holder détient le bail jusqu'à maintenant + ttl secondes
+    """
+    now = timezone.now()
+    updated = IngestionLease.objects.filter(
+        Q(holder=holder) | Q(expires_at__isnull=True) | Q(expires_at__lt=now),
+        name=name
+    ).update(
+        # Avant holder: MySQL évalue les SET dans l'ordre, avec les valeurs déjà modifiées
+        acquired_at=Case(When(holder=holder, then=F('acquired_at')), default=Value(now)),
+        holder=holder,
+        renewed_at=now,
+        expires_at=now + timedelta(seconds=ttl)
+    )
+    if updated:
+        return True
+    
+    if IngestionLease.objects.filter(name=name).exists():
+        return False
+    try:
+        IngestionLease.objects.create(
+            name=name,
+            holder=holder,
+            acquired_at=now,
+            renewed_at=now,
+            expires_at=now + timedelta(seconds=ttl)
+        )
+        return True
+    except IntegrityError:
+        # Créé entre-temps par une autre instance
+        return False
+
+
+def active_holder(name):
+    """Instance qui détient le bail (None s'il est libre ou expiré)"""
+    lease = IngestionLease.objects.filter(name=name).first()
+    if lease and lease.holder and lease.expires_at and lease.expires_at > timezone.now():
+        return lease.holder
+    return None
+
+
+def release(name, holder):
+    """Libère le bail s'il est détenu par holder (reprise immédiate par une autre instance)"""
+    IngestionLease.objects.filter(name=name, holder=holder).update(holder='', expires_at=None)
+
+
+class LeaderElector(threading.Thread):
+    """
+    Thread qui tente de prendre (puis renouvelle) un bail et appelle on_elected /
+    on_revoked à chaque changement de leadership.
+    """
+    
+    def __init__(self, name, on_elected, on_revoked, ttl=None, holder=INSTANCE_ID):
+        super().__init__(daemon=True, name=f'leader-{name}')
+        self.lease_name = name
+        self.on_elected = on_elected
+        self.on_revoked = on_revoked
+        self.ttl = ttl or settings.WEATHER_LEADER_LEASE_TTL
+        self.holder = holder
+        self.is_leader = False
+        self._renewed_at = None
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        logger.info(f"Élection {self.lease_name}: instance {self.holder}")
+        while not self._stop_event.is_set():
+            try:
+                acquired = try_acquire(self.lease_name, self.holder, self.ttl)
+                if acquired:
+                    self._renewed_at = time.monotonic()
+                self._set_leader(acquired)
+            except Exception as e:
+                logger.error(f"Élection {self.lease_name}: {str(e)}")
+                # Sans renouvellement pendant ttl, une autre instance a pu reprendre le bail
+                if self.is_leader and time.monotonic() - self._renewed_at >= self.ttl:
+                    self._set_leader(False)
+            finally:
+                close_old_connections()
+            
+            self._stop_event.wait(self.ttl / 3)
+        
+        if self.is_leader:
+            self._set_leader(False)
+            try:
+                release(self.lease_name, self.holder)
+            except Exception as e:
+                logger.error(f"Élection {self.lease_name}: libération du bail impossible: {str(e)}")
+            finally:
+                close_old_connections()
+    
+    def _set_leader(self, leader):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        if leader:
+            logger.info(f"✓ {self.holder} devient leader de {self.lease_name}")
+            self.on_elected()
+        else:
+            logger.warning(f"{self.holder} n'est plus leader de {self.lease_name}")
+            self.on_revoked()
+    
+    def stop(self):
+        """Arrête l'élection (le bail est libéré à la sortie de la boucle)"""
+        self._stop_event.set()
+
+
+# Élection de la surveillance dans ce processus
+_elector = None
+
+
+def start_monitor_election(api_url, api_key, interval_seconds=900, station_id=None):
+    """
+    Démarre l'élection: la surveillance ne tourne que tant que l'instance détient le bail.
+    Une élection déjà en cours est conservée telle quelle.
+    """
+    global _elector
+    from .services import start_weather_monitoring, stop_weather_monitoring
+    
+    if _elector and _elector.is_alive():
+        return _elector
+    
+    _elector = LeaderElector(
+        MONITOR_LEASE,
+        on_elected=lambda: start_weather_monitoring(api_url, api_key, interval_seconds, station_id),
+        on_revoked=stop_weather_monitoring
+    )
+    _elector.start()
+    return _elector
+
+
+def stop_monitor_election():
+    """Arrête l'élection et la surveillance si l'instance était leader"""
+    global _elector
+    
+    if _elector:
+        _elector.stop()
+        _elector.join(timeout=5)
+        _elector = None
+
+
+def monitor_status():
+    """État de la surveillance: instance courante et détenteur du bail"""
+    lease = IngestionLease.objects.filter(name=MONITOR_LEASE).first()
+    active = bool(lease and lease.holder and lease.expires_at and lease.expires_at > timezone.now())
+    return {
+        'instance': INSTANCE_ID,
+        'is_leader': bool(_elector and _elector.is_leader),
+        'election_running': bool(_elector and _elector.is_alive()),
+        'lease': {
+            'name': MONITOR_LEASE,
+            'holder': lease.holder if active else None,
+            'acquired_at': lease.acquired_at.isoformat() if active else None,
+            'renewed_at': lease.renewed_at.isoformat() if active else None,
+            'expires_at': lease.expires_at.isoformat() if active else None,
+        },
+    }
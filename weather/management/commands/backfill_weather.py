@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from weather.backfill import run_backfill
+from weather.services import monitored_station_ids
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Load observation history from the PWS history endpoint, one job per station and local day, '
+        'fetched concurrently under a global rate limit. Progress is checkpointed in the database: '
+        'rerunning the same command resumes the remaining days.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stations',
+            nargs='+',
+            help='Station IDs (default: monitored stations)',
+        )
+        parser.add_argument(
+            '--from',
+            dest='start',
+            required=True,
+            help='First local day (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            help='Last local day, inclusive (YYYY-MM-DD, default: today)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.WEATHER_BACKFILL_WORKERS,
+            help=f'Concurrent requests (default: {settings.WEATHER_BACKFILL_WORKERS})',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=settings.WEATHER_BACKFILL_RATE,
+            help=f'Requests per second across all workers, retries included '
+                 f'(default: {settings.WEATHER_BACKFILL_RATE}, the PWS quota). One request per '
+                 f'station and day: this rate bounds the run time (1 year x 20 stations is '
+                 f'7,300 requests, about 4 hours at 0.5/s). Raise it only with a larger quota',
+        )
+        parser.add_argument(
+            '--batch-rows',
+            type=int,
+            default=settings.WEATHER_BACKFILL_BATCH_ROWS,
+            help=f'Observations saved per transaction (default: {settings.WEATHER_BACKFILL_BATCH_ROWS})',
+        )
+        parser.add_argument(
+            '--api-url',
+            default=settings.WEATHER_HISTORY_API_URL,
+            help='History endpoint (default: WEATHER_HISTORY_API_URL)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Fetch again days already completed',
+        )
+    
+    def handle(self, *args, **options):
+        start = parse_date(options['start'])
+        end = parse_date(options['end']) if options['end'] else timezone.localdate()
+        if start is None or end is None:
+            raise CommandError("Dates must be YYYY-MM-DD")
+        if start > end:
+            raise CommandError("--from must not be after --to")
+        
+        station_ids = options['stations'] or monitored_station_ids()
+        if not station_ids:
+            raise CommandError("No station to backfill")
+        
+        started = time.perf_counter()
+        
+        def progress(stats):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{stats['done'] + stats['failed']}/{stats['jobs']} days, "
+                f"{stats['saved']} saved, {stats['failed']} failed ({elapsed:.0f} s)"
+            )
+        
+        self.stdout.write(f"Backfilling {len(station_ids)} station(s) from {start} to {end}...")
+        stats = run_backfill(
+            station_ids,
+            start,
+            end,
+            workers=options['workers'],
+            rate=options['rate'],
+            batch_rows=options['batch_rows'],
+            api_url=options['api_url'],
+            force=options['force'],
+            progress=progress
+        )
+        
+        elapsed = time.perf_counter() - started
+        if not stats['jobs']:
+            self.stdout.write(self.style.SUCCESS("Nothing to do: all days already loaded"))
+            return
+        
+        message = (
+            f"{stats['done']}/{stats['jobs']} days loaded, {stats['fetched']} observations fetched, "
+            f"{stats['saved']} saved in {elapsed:.1f} s"
+        )
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{message}; {stats['failed']} day(s) failed, rerun the command to retry them"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
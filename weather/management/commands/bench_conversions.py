@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand
+from weather import conversions
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark: scalar vs batch (NumPy) imperial-to-metric conversion'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=105120,
+            help='Number of observations to convert (default: one year of 5-minute data)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of runs; the best time is reported',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+        )
+    
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        blocks = [self._imperial_block(rng) for _ in range(options['rows'])]
+        
+        scalar_time, scalar_rows = self._best_of(
+            options['repeat'],
+            lambda: [conversions.convert_imperial(block) for block in blocks]
+        )
+        batch_time, batch_rows = self._best_of(
+            options['repeat'],
+            lambda: conversions.convert_imperial_batch(blocks)
+        )
+        
+        if scalar_rows != batch_rows:
+            self.stdout.write(self.style.ERROR("Mismatch between scalar and batch results"))
+            return
+        
+        backend = 'numpy' if conversions.np is not None else 'scalar fallback (NumPy not installed)'
+        self.stdout.write(f"Rows: {options['rows']} - batch backend: {backend}")
+        self.stdout.write(f"Scalar: {scalar_time * 1000:.1f} ms ({scalar_time / options['rows'] * 1e6:.2f} µs/row)")
+        self.stdout.write(f"Batch:  {batch_time * 1000:.1f} ms ({batch_time / options['rows'] * 1e6:.2f} µs/row)")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: x{scalar_time / batch_time:.1f} (identical results)"))
+    
+    @staticmethod
+    def _best_of(repeat, func):
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+    
+    @staticmethod
+    def _imperial_block(rng):
+        """Bloc 'imperial' réaliste avec ~5% de valeurs manquantes"""
+        def value(low, high, digits):
+            if rng.random() < 0.05:
+                return None
+            return round(rng.uniform(low, high), digits)
+        
+        block = {}
+        for key, _, convert in conversions.IMPERIAL_FIELDS:
+            if convert is conversions.fahrenheit_to_celsius:
+                block[key] = value(20, 110, 1)
+            elif convert is conversions.mph_to_kmh:
+                block[key] = value(0, 60, 1)
+            elif convert is conversions.incheshg_to_hpa:
+                block[key] = value(28.5, 30.5, 2)
+            else:
+                block[key] = value(0, 3, 2)
+        return block
@@ -0,0 +1,162 @@
+from django.core.management.base import BaseCommand
+from weather.scheduler import CADENCE_SAMPLE, PollScheduler
+import random
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a day of polling against synthetic stations (regular, slow, irregular and '
+        'offline) and compare fixed-interval polling with the adaptive scheduler: upstream '
+        'calls, useless calls and delay between publication and ingestion. No database access.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stations',
+            type=int,
+            default=40,
+            help='Number of simulated stations (default: 40)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=300,
+            help='Fixed polling interval in seconds (default: 300, as passed by the monitoring view)',
+        )
+        parser.add_argument(
+            '--min-interval',
+            type=int,
+            help='Adaptive scheduler floor in seconds (default: the fixed interval, as in production)',
+        )
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Simulated duration in hours (default: 24)',
+        )
+        parser.add_argument(
+            '--publish-lag',
+            type=int,
+            default=30,
+            help='Seconds between an observation and its availability upstream (default: 30)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+        )
+    
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = 1_700_000_100  # Multiple de 300: observations alignées comme sur PWS
+        end = start + options['hours'] * 3600
+        stations = self._stations(options['stations'], start - 3600, end, rng)
+        lag = options['publish_lag']
+        
+        fixed = self._simulate_fixed(stations, start, end, options['interval'], lag)
+        adaptive = self._simulate_adaptive(
+            stations, start, end, options['interval'], options['min_interval'], lag, rng
+        )
+        
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{len(stations)} stations, {options['hours']} h, "
+            f"{sum(len(epochs) for epochs in stations.values())} observations"
+        ))
+        for name, (calls, useless, delays, peak) in (('Fixed', fixed), ('Adaptive', adaptive)):
+            delays.sort()
+            self.stdout.write(
+                f"{name + ':':<10} {calls:>6} calls, {useless:>6} without new data, "
+                f"delay median {delays[len(delays) // 2]:.0f} s / p95 {delays[int(len(delays) * 0.95)]:.0f} s, "
+                f"peak {peak} calls in one second"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"x{fixed[0] / adaptive[0]:.1f} fewer calls, "
+            f"x{fixed[1] / max(adaptive[1], 1):.1f} fewer useless calls"
+        ))
+    
+    @staticmethod
+    def _stations(count, start, end, rng):
+        """Epochs des observations de chaque station simulée"""
+        stations = {}
+        for index in range(count):
+            kind = index % 5
+            if kind in (0, 1):
+                # Station régulière: toutes les 5 minutes
+                epochs = list(range(start, end, 300))
+            elif kind == 2:
+                # Station lente: toutes les 15 minutes
+                epochs = list(range(start, end, 900))
+            elif kind == 3:
+                # Station irrégulière: 5 minutes avec des trous
+                epochs = [epoch for epoch in range(start, end, 300) if rng.random() > 0.2]
+            else:
+                # Station hors ligne depuis la veille
+                epochs = list(range(start - 86400, start - 3600 * rng.randint(1, 20), 300))
+            stations[f'SIM{index:03d}'] = epochs
+        return stations
+    
+    @staticmethod
+    def _poll(epochs, known, now, lag):
+        """Observations publiées et pas encore reçues à l'instant now"""
+        new = []
+        while known < len(epochs) and epochs[known] + lag <= now:
+            new.append(epochs[known])
+            known += 1
+        return new, known
+    
+    def _simulate_fixed(self, stations, start, end, interval, lag):
+        known = {station_id: 0 for station_id in stations}
+        for station_id, epochs in stations.items():
+            # Historique déjà en base au démarrage
+            _, known[station_id] = self._poll(epochs, 0, start, lag)
+        
+        calls = useless = peak = 0
+        delays = []
+        for now in range(start, end, interval):
+            for station_id, epochs in stations.items():
+                new, known[station_id] = self._poll(epochs, known[station_id], now, lag)
+                calls += 1
+                useless += not new
+                delays.extend(now - (epoch + lag) for epoch in new)
+            peak = max(peak, len(stations))
+        return calls, useless, delays, peak
+    
+    def _simulate_adaptive(self, stations, start, end, interval, min_interval, lag, rng):
+        now = start
+        known = {}
+        
+        def load_epochs(station_id):
+            epochs = stations[station_id][:known[station_id]]
+            return epochs[-CADENCE_SAMPLE:]
+        
+        scheduler = PollScheduler(
+            default_interval=interval,
+            grace=lag,
+            min_interval=min_interval or interval,
+            max_interval=3600,
+            stale_after=86400,
+            jitter=0.1,
+            clock=lambda: now,
+            rng=rng.random,
+            load_epochs=load_epochs
+        )
+        for station_id, epochs in stations.items():
+            _, known[station_id] = self._poll(epochs, 0, start, lag)
+        scheduler.sync(list(stations))
+        
+        calls = useless = peak = 0
+        delays = []
+        while True:
+            next_due = scheduler.next_due()
+            if next_due is None or next_due >= end:
+                break
+            now = next_due
+            due = scheduler.pop_due()
+            peak = max(peak, len(due))
+            for station_id in due:
+                new, known[station_id] = self._poll(stations[station_id], known[station_id], now, lag)
+                calls += 1
+                useless += not new
+                delays.extend(now - (epoch + lag) for epoch in new)
+                scheduler.update(station_id, len(new))
+        return calls, useless, delays, peak
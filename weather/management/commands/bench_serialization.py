@@ -0,0 +1,114 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from weather.models import StationMeteo, ObservationMeteo
+from weather.serializers import iter_json_array, iter_observation_rows
+import json
+import time
+import tracemalloc
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark observation listing serialization: model instances + JsonResponse-style '
+        'dumps vs values_list + streaming encoder (CPU time and peak Python memory)'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--station',
+            default='BENCH01',
+            help='Station ID (default: the bench_time_queries station, see --seed-rows there)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            action='append',
+            help='Window size in days, ending at the last observation (repeatable, default: 1 and 30)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of runs; the best CPU time is reported',
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            station = StationMeteo.objects.get(station_id=options['station'])
+        except StationMeteo.DoesNotExist:
+            raise CommandError(f"Unknown station {options['station']}")
+        
+        last = station.observations.order_by('-obs_time_utc').values_list('obs_time_local', flat=True).first()
+        if last is None:
+            raise CommandError(f"Station {station.station_id} has no observations")
+        
+        for days in options['days'] or [1, 30]:
+            observations = ObservationMeteo.objects.filter(
+                station=station,
+                obs_time_local__gt=last - timedelta(days=days),
+                obs_time_local__lte=last
+            ).order_by('obs_time_local')
+            
+            legacy_cpu, legacy_peak, legacy_body = self._measure(
+                options['repeat'], lambda: self._legacy(observations)
+            )
+            # Morceaux consommés au fil de l'eau, comme par le serveur WSGI
+            stream_cpu, stream_peak, _ = self._measure(
+                options['repeat'], lambda: sum(len(chunk) for chunk in iter_json_array(iter_observation_rows(observations)))
+            )
+            stream_body = b''.join(iter_json_array(iter_observation_rows(observations)))
+            
+            if legacy_body != stream_body:
+                raise CommandError(f"Output mismatch for {days} day(s)")
+            
+            rows = observations.count()
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{days} day(s): {rows} observations, {len(stream_body) / 1024:.0f} KiB"
+            ))
+            self.stdout.write(f"Models + dumps: CPU {legacy_cpu * 1000:.1f} ms, peak {legacy_peak / 1024:.0f} KiB")
+            self.stdout.write(f"Streaming:      CPU {stream_cpu * 1000:.1f} ms, peak {stream_peak / 1024:.0f} KiB")
+            self.stdout.write(self.style.SUCCESS(
+                f"x{legacy_cpu / stream_cpu:.1f} CPU, x{legacy_peak / max(stream_peak, 1):.1f} memory "
+                f"(identical output)"
+            ))
+    
+    @staticmethod
+    def _legacy(observations):
+        """Sérialisation d'origine de GET /api/daily/ (instances, dicts imbriqués, json.dumps)"""
+        return json.dumps([
+            {
+                'time_utc': obs.obs_time_utc.isoformat(),
+                'time_local': obs.obs_time_local.strftime('%Y-%m-%d %H:%M:%S'),
+                'temperature': {'high': obs.temp_high, 'low': obs.temp_low, 'avg': obs.temp_avg},
+                'humidity': {'high': obs.humidity_high, 'low': obs.humidity_low, 'avg': obs.humidity_avg},
+                'wind': {
+                    'direction': obs.winddir_avg,
+                    'speed_high': obs.windspeed_high,
+                    'speed_avg': obs.windspeed_avg,
+                    'gust_high': obs.windgust_high
+                },
+                'pressure': {'max': obs.pressure_max, 'min': obs.pressure_min, 'trend': obs.pressure_trend},
+                'precipitation': {'rate': obs.precip_rate, 'total': obs.precip_total},
+                'solar_radiation': obs.solar_radiation_high,
+                'uv_index': obs.uv_high
+            }
+            for obs in observations.all()
+        ], cls=DjangoJSONEncoder).encode()
+    
+    @staticmethod
+    def _measure(repeat, func):
+        best_cpu = None
+        result = None
+        for _ in range(repeat):
+            start = time.process_time()
+            result = func()
+            elapsed = time.process_time() - start
+            best_cpu = elapsed if best_cpu is None else min(best_cpu, elapsed)
+        
+        # Mémoire mesurée sur une exécution séparée (tracemalloc ralentit l'exécution)
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return best_cpu, peak, result
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from weather.models import StationMeteo, ObservationMeteo
+from weather.services import WeatherDataService
+import random
+import time
+
+BENCH_STATION_ID = 'BENCH01'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark time-range queries on ObservationMeteo: DATE() predicate vs half-open '
+        'range predicate, with query plans. Use --seed-rows to build a large table first.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-rows',
+            type=int,
+            default=0,
+            help=f'Insert N synthetic 5-minute observations for station {BENCH_STATION_ID} first',
+        )
+        parser.add_argument(
+            '--station',
+            default=BENCH_STATION_ID,
+            help='Station ID to query (default: the benchmark station)',
+        )
+        parser.add_argument(
+            '--date',
+            help='Local date to query (YYYY-MM-DD, default: middle of the station history)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+        )
+        parser.add_argument(
+            '--compare-indexes',
+            action='store_true',
+            help='Also measure with the composite time indexes dropped (restored afterwards). '
+                 'Do not use on a production database.',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help=f'Delete the benchmark station {BENCH_STATION_ID} and its observations, then exit',
+        )
+    
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = StationMeteo.objects.filter(station_id=BENCH_STATION_ID).delete()
+            self.stdout.write(f"Deleted {deleted} rows")
+            return
+        
+        if options['seed_rows']:
+            self._seed(options['seed_rows'])
+        
+        try:
+            station = StationMeteo.objects.get(station_id=options['station'])
+        except StationMeteo.DoesNotExist:
+            raise CommandError(f"Unknown station {options['station']} (use --seed-rows)")
+        
+        if options['date']:
+            day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+        else:
+            day = self._middle_day(station)
+        
+        total = ObservationMeteo.objects.count()
+        self.stdout.write(f"Table rows: {total} - station {station.station_id} - day {day} - {connection.vendor}")
+        
+        self._run(station, day, options['repeat'], label='with composite indexes')
+        
+        if options['compare_indexes']:
+            indexes = list(ObservationMeteo._meta.indexes)
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(ObservationMeteo, index)
+            try:
+                self._run(station, day, options['repeat'], label='without composite indexes')
+            finally:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.add_index(ObservationMeteo, index)
+    
+    def _queries(self, station, day):
+        day_start, day_end = WeatherDataService.local_day_bounds(day)
+        return [
+            ('daily list, DATE() predicate', ObservationMeteo.objects.filter(
+                station=station, obs_time_local__date=day
+            ).order_by('obs_time_local')),
+            ('daily list, range predicate', ObservationMeteo.objects.filter(
+                station=station, obs_time_local__gte=day_start, obs_time_local__lt=day_end
+            ).order_by('obs_time_local')),
+            ('latest observation', station.observations.order_by('-obs_time_utc')[:1]),
+            ('last 7 days (UTC range)', ObservationMeteo.objects.filter(
+                station=station, obs_time_utc__gte=day_start - timedelta(days=7), obs_time_utc__lt=day_end
+            )),
+        ]
+    
+    def _run(self, station, day, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== {label} ==="))
+        for name, queryset in self._queries(station, day):
+            timings = []
+            rows = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = len(list(queryset.values_list('id', 'obs_time_local', 'temp_avg')))
+                timings.append(time.perf_counter() - start)
+            
+            timings.sort()
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {rows} rows - median {timings[len(timings) // 2] * 1000:.2f} ms, "
+                f"best {timings[0] * 1000:.2f} ms"
+            ))
+            self.stdout.write(queryset.values_list('id', 'obs_time_local', 'temp_avg').explain())
+    
+    def _middle_day(self, station):
+        observations = station.observations.order_by('obs_time_utc')
+        count = observations.count()
+        if not count:
+            raise CommandError(f"Station {station.station_id} has no observations")
+        return observations.values_list('obs_time_local', flat=True)[count // 2].date()
+    
+    def _seed(self, rows, batch_size=5000):
+        """Observations synthétiques toutes les 5 minutes, en remontant depuis maintenant"""
+        station, _ = StationMeteo.objects.get_or_create(
+            station_id=BENCH_STATION_ID,
+            defaults={'latitude': -3.38, 'longitude': 29.36, 'timezone': 'Africa/Bujumbura', 'nom': 'Benchmark'}
+        )
+        oldest = station.observations.order_by('epoch').values_list('epoch', flat=True).first()
+        epoch = (oldest or int(time.time()) // 300 * 300) - 300
+        rng = random.Random(0)
+        
+        self.stdout.write(f"Seeding {rows} observations...")
+        created = 0
+        while created < rows:
+            batch = []
+            for _ in range(min(batch_size, rows - created)):
+                obs_time_utc = datetime.fromtimestamp(epoch, tz=timezone.utc)
+                batch.append(ObservationMeteo(
+                    station=station,
+                    epoch=epoch,
+                    obs_time_utc=obs_time_utc,
+                    obs_time_local=obs_time_utc + timedelta(hours=2),
+                    temp_avg=round(rng.uniform(15, 30), 1),
+                    humidity_avg=rng.randint(40, 95),
+                ))
+                epoch -= 300
+            with transaction.atomic():
+                ObservationMeteo.objects.bulk_create(batch)
+            created += len(batch)
+        self.stdout.write(f"Seeded {created} observations")
@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+from weather.export import EXPORT_CHUNK_SIZE, FORMATS, available_formats, iter_arrow, iter_chunks, iter_csv, write_npz
+from weather.models import StationMeteo
+from weather.services import WeatherDataService
+import sys
+import time
+
+
+class Command(BaseCommand):
+    help = 'Export observations to CSV, Arrow IPC stream or NumPy .npz, reading in bounded chunks'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--station',
+            action='append',
+            dest='stations',
+            help='Station ID to export (repeatable, default: all stations)',
+        )
+        parser.add_argument(
+            '--start',
+            help='Start of the range (date, ISO 8601 datetime or epoch, inclusive)',
+        )
+        parser.add_argument(
+            '--end',
+            help='End of the range (date, ISO 8601 datetime or epoch, exclusive)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=list(FORMATS),
+            default='csv',
+        )
+        parser.add_argument(
+            '--output',
+            '-o',
+            default='-',
+            help="Output file ('-' for stdout, csv and arrow only)",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f'Observations read per query (default: {EXPORT_CHUNK_SIZE})',
+        )
+    
+    def handle(self, *args, **options):
+        export_format = options['format']
+        if export_format not in available_formats():
+            raise CommandError(f"Format {export_format} unavailable (missing dependency)")
+        if export_format == 'npz' and options['output'] == '-':
+            raise CommandError("The npz format needs --output")
+        
+        try:
+            start = WeatherDataService.parse_time_bound(options['start'])
+            end = WeatherDataService.parse_time_bound(options['end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        stations = StationMeteo.objects.order_by('station_id')
+        if options['stations']:
+            stations = list(stations.filter(station_id__in=options['stations']))
+            missing = set(options['stations']) - {station.station_id for station in stations}
+            if missing:
+                raise CommandError(f"Unknown station(s): {', '.join(sorted(missing))}")
+        
+        count = 0
+        
+        def counted(chunks):
+            nonlocal count
+            for rows in chunks:
+                count += len(rows)
+                yield rows
+        
+        chunks = counted(iter_chunks(list(stations), start, end, options['chunk_size']))
+        started = time.perf_counter()
+        
+        if export_format == 'npz':
+            with open(options['output'], 'wb') as output:
+                write_npz(chunks, output)
+        elif export_format == 'csv':
+            output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='')
+            try:
+                for part in iter_csv(chunks):
+                    output.write(part)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+        else:
+            output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+            try:
+                for part in iter_arrow(chunks):
+                    output.write(part)
+            finally:
+                if output is not sys.stdout.buffer:
+                    output.close()
+        
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {count} observations ({export_format}) in {elapsed:.1f} s "
+            f"({count / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
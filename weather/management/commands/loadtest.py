@@ -0,0 +1,149 @@
+from django.core.management.base import BaseCommand, CommandError
+from urllib.parse import urlsplit
+import asyncio
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test HTTP GET endpoints with N concurrent keep-alive clients and report '
+        'requests per second and latency percentiles. Run it against the same endpoints '
+        'served by a WSGI server (gunicorn weatherapi.wsgi) and by an ASGI server '
+        '(uvicorn weatherapi.asgi:application) to compare them.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls',
+            nargs='+',
+            help='URLs to request, in turn by each client (e.g. http://127.0.0.1:8000/api/stations/)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Concurrent clients, one connection each (default: 200)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Measured duration in seconds (default: 30)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=3,
+            help='Seconds of load before measuring (default: 3)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Seconds before a request counts as an error (default: 30)',
+        )
+    
+    def handle(self, *args, **options):
+        targets = []
+        for url in options['urls']:
+            parts = urlsplit(url)
+            if parts.scheme != 'http' or not parts.hostname:
+                raise CommandError(f"Only http:// URLs are supported: {url}")
+            path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            targets.append((parts.hostname, parts.port or 80, path))
+        
+        latencies, statuses, errors, elapsed = asyncio.run(self._run(targets, options))
+        
+        total = len(latencies)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{options['concurrency']} clients, {elapsed:.1f} s, {len(targets)} URL(s)"
+        ))
+        self.stdout.write(f"Requests:  {total} ({total / elapsed:.1f}/s), {errors} errors")
+        self.stdout.write(f"Statuses:  {', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))}")
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                "Latency:   "
+                + ', '.join(
+                    f"{name} {latencies[min(int(total * quantile), total - 1)] * 1000:.1f} ms"
+                    for name, quantile in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+                )
+                + f", max {latencies[-1] * 1000:.1f} ms"
+            )
+    
+    async def _run(self, targets, options):
+        latencies = []
+        statuses = {}
+        errors = 0
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        measure_from = started + options['warmup']
+        stop_at = measure_from + options['duration']
+        
+        async def client(index):
+            nonlocal errors
+            connection = None
+            request_index = index
+            while loop.time() < stop_at:
+                host, port, path = targets[request_index % len(targets)]
+                request_index += 1
+                sent_at = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection = await asyncio.wait_for(
+                            asyncio.open_connection(host, port), options['timeout']
+                        )
+                    status, keep_alive = await asyncio.wait_for(
+                        self._request(*connection, host, port, path), options['timeout']
+                    )
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    if loop.time() >= measure_from:
+                        errors += 1
+                    if connection is not None:
+                        connection[1].close()
+                    connection = None
+                    continue
+                
+                if loop.time() >= measure_from:
+                    latencies.append(time.perf_counter() - sent_at)
+                    statuses[status] = statuses.get(status, 0) + 1
+                if not keep_alive:
+                    connection[1].close()
+                    connection = None
+            if connection is not None:
+                connection[1].close()
+        
+        await asyncio.gather(*(client(index) for index in range(options['concurrency'])))
+        return latencies, statuses, errors, loop.time() - measure_from
+    
+    @staticmethod
+    async def _request(reader, writer, host, port, path):
+        """Envoie une requête GET et lit la réponse entière; retourne (statut, connexion réutilisable)"""
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: application/json\r\n\r\n".encode()
+        )
+        await writer.drain()
+        
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split(' ', 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip().lower()
+        
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        elif status not in (204, 304):
+            # Corps délimité par la fermeture de la connexion
+            await reader.read()
+            return status, False
+        
+        return status, headers.get('connection') != 'close'
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from weather.models import StationMeteo
+from weather.summaries import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailySummary table from raw observations'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--station',
+            action='append',
+            dest='stations',
+            help='Station ID to rebuild (repeatable, default: all stations)',
+        )
+    
+    def handle(self, *args, **options):
+        stations = None
+        if options['stations']:
+            stations = list(StationMeteo.objects.filter(station_id__in=options['stations']))
+            missing = set(options['stations']) - {station.station_id for station in stations}
+            if missing:
+                raise CommandError(f"Unknown station(s): {', '.join(sorted(missing))}")
+        
+        count = rebuild_daily_summaries(stations)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily summaries"))
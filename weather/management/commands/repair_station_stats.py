@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from weather.models import StationMeteo
+from weather.station_stats import refresh_station_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the denormalized station statistics (observation count, first and '
+        'last observation) from raw observations'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--station',
+            action='append',
+            dest='stations',
+            help='Station ID to repair (repeatable, default: all stations)',
+        )
+    
+    def handle(self, *args, **options):
+        stations = None
+        if options['stations']:
+            stations = list(StationMeteo.objects.filter(station_id__in=options['stations']))
+            missing = set(options['stations']) - {station.station_id for station in stations}
+            if missing:
+                raise CommandError(f"Unknown station(s): {', '.join(sorted(missing))}")
+        
+        count = refresh_station_stats(stations)
+        self.stdout.write(self.style.SUCCESS(f"Repaired statistics for {count} stations"))
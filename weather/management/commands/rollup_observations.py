@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from weather.rollups import prune_expired, rebuild_rollups, roll_up
+
+
+class Command(BaseCommand):
+    help = 'Update hourly/daily/monthly observation rollups and apply the retention policy'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Drop and rebuild all rollups from raw observations '
+                 '(buckets whose raw rows were pruned are lost)',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Apply WEATHER_RETENTION after rolling up',
+        )
+    
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            integrated = rebuild_rollups()
+        else:
+            integrated = roll_up()
+        self.stdout.write(self.style.SUCCESS(f"{integrated} observations rolled up"))
+        
+        if options['prune']:
+            deleted = prune_expired()
+            self.stdout.write(f"Pruned: {deleted or 'nothing (no retention configured)'}")
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0002_observationmeteo_stationmeteo_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stationmeteo',
+            name='actif',
+            field=models.BooleanField(default=True, verbose_name='Surveillance active'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.26 on 2026-10-17 06:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0003_stationmeteo_actif'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('observation_count', models.IntegerField(default=0)),
+                ('temp_sum', models.FloatField(default=0)),
+                ('temp_count', models.IntegerField(default=0)),
+                ('temp_max', models.FloatField(blank=True, null=True)),
+                ('temp_min', models.FloatField(blank=True, null=True)),
+                ('humidity_sum', models.FloatField(default=0)),
+                ('humidity_count', models.IntegerField(default=0)),
+                ('humidity_max', models.IntegerField(blank=True, null=True)),
+                ('humidity_min', models.IntegerField(blank=True, null=True)),
+                ('wind_sum', models.FloatField(default=0)),
+                ('wind_count', models.IntegerField(default=0)),
+                ('wind_max', models.FloatField(blank=True, null=True)),
+                ('gust_max', models.FloatField(blank=True, null=True)),
+                ('precip_total', models.FloatField(blank=True, null=True)),
+                ('precip_rate_max', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='weather.stationmeteo')),
+            ],
+            options={
+                'verbose_name': 'Résumé Journalier',
+                'verbose_name_plural': 'Résumés Journaliers',
+                'ordering': ['-date'],
+                'unique_together': {('station', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.26 on 2026-10-17 06:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0004_dailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_observation_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Point de Reprise des Agrégats',
+                'verbose_name_plural': 'Points de Reprise des Agrégats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ObservationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observation_count', models.IntegerField(default=0)),
+                ('temp_sum', models.FloatField(default=0)),
+                ('temp_count', models.IntegerField(default=0)),
+                ('temp_max', models.FloatField(blank=True, null=True)),
+                ('temp_min', models.FloatField(blank=True, null=True)),
+                ('humidity_sum', models.FloatField(default=0)),
+                ('humidity_count', models.IntegerField(default=0)),
+                ('humidity_max', models.IntegerField(blank=True, null=True)),
+                ('humidity_min', models.IntegerField(blank=True, null=True)),
+                ('wind_sum', models.FloatField(default=0)),
+                ('wind_count', models.IntegerField(default=0)),
+                ('wind_max', models.FloatField(blank=True, null=True)),
+                ('gust_max', models.FloatField(blank=True, null=True)),
+                ('precip_total', models.FloatField(blank=True, null=True)),
+                ('precip_rate_max', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('resolution', models.CharField(choices=[('hour', 'Heure'), ('day', 'Jour'), ('month', 'Mois')], max_length=5)),
+                ('bucket_start', models.DateTimeField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='weather.stationmeteo')),
+            ],
+            options={
+                'verbose_name': "Agrégat d'Observations",
+                'verbose_name_plural': "Agrégats d'Observations",
+                'ordering': ['station', 'resolution', 'bucket_start'],
+                'unique_together': {('station', 'resolution', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.26 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0005_observationrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='observationmeteo',
+            index=models.Index(fields=['station', 'obs_time_utc'], name='obs_station_time_utc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observationmeteo',
+            index=models.Index(fields=['station', 'obs_time_local'], name='obs_station_time_local_idx'),
+        ),
+    ]
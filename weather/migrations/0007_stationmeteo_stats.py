@@ -0,0 +1,34 @@
+# Generated by Django 4.2.26 on 2026-10-17 06:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0006_observation_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stationmeteo',
+            name='first_obs_utc',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='stationmeteo',
+            name='last_obs',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='weather.observationmeteo'),
+        ),
+        migrations.AddField(
+            model_name='stationmeteo',
+            name='last_obs_utc',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='stationmeteo',
+            name='observation_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-17 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0007_stationmeteo_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='observationmeteo',
+            index=models.Index(fields=['obs_time_utc'], name='obs_time_utc_idx'),
+        ),
+    ]
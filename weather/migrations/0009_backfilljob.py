@@ -0,0 +1,34 @@
+# Generated by Django 4.2.26 on 2026-10-17 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0008_observation_time_utc_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station_id', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('done', 'Terminé'), ('failed', 'Échec')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('fetched_count', models.PositiveIntegerField(default=0)),
+                ('saved_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tâche de Rattrapage',
+                'verbose_name_plural': 'Tâches de Rattrapage',
+                'ordering': ['station_id', 'date'],
+                'indexes': [models.Index(fields=['status', 'station_id', 'date'], name='backfill_status_idx')],
+                'unique_together': {('station_id', 'date')},
+            },
+        ),
+    ]
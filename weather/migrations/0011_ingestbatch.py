@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-17 07:34
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0010_ingestionlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('queued', 'En attente'), ('done', 'Terminé'), ('failed', 'Échec')], default='queued', max_length=10)),
+                ('observation_count', models.PositiveIntegerField(default=0)),
+                ('saved_count', models.PositiveIntegerField(default=0)),
+                ('skipped_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Lot de Réception',
+                'verbose_name_plural': 'Lots de Réception',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
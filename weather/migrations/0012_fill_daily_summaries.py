@@ -0,0 +1,25 @@
+# Remplissage des résumés journaliers à partir des observations déjà en base:
+# sans lui, les statistiques lues dans DailySummary (/api/daily/, /api/compare/,
+# tableau de bord) sont vides pour les jours antérieurs au déploiement
+
+from django.db import migrations
+
+
+def fill_daily_summaries(apps, schema_editor):
+    from weather.summaries import rebuild_daily_summaries
+    
+    rebuild_daily_summaries(
+        observation_model=apps.get_model('weather', 'ObservationMeteo'),
+        summary_model=apps.get_model('weather', 'DailySummary')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0011_ingestbatch'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_daily_summaries, migrations.RunPython.noop),
+    ]
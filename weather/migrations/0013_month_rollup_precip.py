@@ -0,0 +1,44 @@
+# Niveau mois des agrégats: precip_total devient la somme des totaux journaliers
+# (auparavant le maximum, soit le jour le plus pluvieux). Recalcul des mois existants
+# à partir du niveau jour, sauf ceux dont des jours ont pu être supprimés par la rétention
+
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def sum_daily_precip(apps, schema_editor):
+    from weather.rollups import DAY, MONTH, retention_cutoff, truncate
+    
+    ObservationRollup = apps.get_model('weather', 'ObservationRollup')
+    
+    totals = defaultdict(lambda: None)
+    days = ObservationRollup.objects.filter(
+        resolution=DAY,
+        precip_total__isnull=False
+    ).values_list('station_id', 'bucket_start', 'precip_total')
+    for station_pk, bucket, precip_total in days.iterator():
+        key = (station_pk, truncate(bucket, MONTH))
+        totals[key] = (totals[key] or 0) + precip_total
+    
+    months = ObservationRollup.objects.filter(resolution=MONTH)
+    cutoff = retention_cutoff(DAY)
+    if cutoff is not None:
+        months = months.filter(bucket_start__gte=cutoff)
+    
+    updated = []
+    for month in months.iterator():
+        month.precip_total = totals[(month.station_id, month.bucket_start)]
+        updated.append(month)
+    ObservationRollup.objects.bulk_update(updated, ['precip_total'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0012_fill_daily_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(sum_daily_precip, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0013_month_rollup_precip'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestbatch',
+            name='rejected',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Remplissage des statistiques dénormalisées des stations (0007) à partir des
+# observations déjà en base: sans lui, les stations existantes affichent 0
+# observation et aucune dernière observation, et les mises à jour incrémentales
+# partent de ces valeurs fausses
+
+from django.db import migrations
+
+
+def fill_station_stats(apps, schema_editor):
+    from weather.station_stats import refresh_station_stats
+    
+    refresh_station_stats(
+        station_model=apps.get_model('weather', 'StationMeteo'),
+        observation_model=apps.get_model('weather', 'ObservationMeteo')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather', '0014_ingestbatch_rejected'),
+    ]
+    
+    operations = [
+        migrations.RunPython(fill_station_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 # models.py
 from django.db import models
 from django.utils import timezone
+import uuid
 
 class StationMeteo(models.Model):
     station_id = models.CharField(max_length=50, unique=True)
@@ -8,6 +9,21 @@ class StationMeteo(models.Model):
     longitude = models.FloatField()
     timezone = models.CharField(max_length=50)
     nom = models.CharField(max_length=100, blank=True)
+    actif = models.BooleanField(default=True, verbose_name="Surveillance active")
+    
+    # Statistiques dénormalisées, tenues à jour à l'enregistrement des observations
+    # (voir station_stats.py, réparables par la commande repair_station_stats)
+    observation_count = models.PositiveIntegerField(default=0, editable=False)
+    first_obs_utc = models.DateTimeField(null=True, blank=True, editable=False)
+    last_obs_utc = models.DateTimeField(null=True, blank=True, editable=False)
+    last_obs = models.ForeignKey(
+        'ObservationMeteo',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
     
     class Meta:
         verbose_name = "Station Météo"
@@ -84,6 +100,204 @@ class ObservationMeteo(models.Model):
         verbose_name_plural = "Observations Météo"
         ordering = ['-obs_time_utc']
         unique_together = ['station', 'epoch']  # Éviter les doublons
+        indexes = [
+            # Dernières observations d'une station, plages UTC (ordering inclus)
+            models.Index(fields=['station', 'obs_time_utc'], name='obs_station_time_utc_idx'),
+            # Observations d'un jour / d'une plage en heure locale
+            models.Index(fields=['station', 'obs_time_local'], name='obs_station_time_local_idx'),
+            # Tri par défaut de l'admin sur toutes les stations
+            models.Index(fields=['obs_time_utc'], name='obs_time_utc_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.station.station_id} - {self.obs_time_local}"
+
+class ObservationAggregate(models.Model):
+    """Agrégats d'observations sur une période (champs communs aux résumés et rollups)"""
+    observation_count = models.IntegerField(default=0)
+    
+    # Température (temp_avg: somme/nombre, temp_high: max, temp_low: min)
+    temp_sum = models.FloatField(default=0)
+    temp_count = models.IntegerField(default=0)
+    temp_max = models.FloatField(null=True, blank=True)
+    temp_min = models.FloatField(null=True, blank=True)
+    
+    # Humidité (humidity_avg: somme/nombre, humidity_high: max, humidity_low: min)
+    humidity_sum = models.FloatField(default=0)
+    humidity_count = models.IntegerField(default=0)
+    humidity_max = models.IntegerField(null=True, blank=True)
+    humidity_min = models.IntegerField(null=True, blank=True)
+    
+    # Vent (windspeed_avg: somme/nombre, windspeed_high et windgust_high: max)
+    wind_sum = models.FloatField(default=0)
+    wind_count = models.IntegerField(default=0)
+    wind_max = models.FloatField(null=True, blank=True)
+    gust_max = models.FloatField(null=True, blank=True)
+    
+    # Précipitations (precip_total est un cumul journalier: le max est le total du jour;
+    # agrégats mensuels: somme des totaux journaliers, voir rollups.py)
+    precip_total = models.FloatField(null=True, blank=True)
+    precip_rate_max = models.FloatField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        abstract = True
+    
+    @property
+    def temp_avg(self):
+        return self.temp_sum / self.temp_count if self.temp_count else None
+    
+    @property
+    def humidity_avg(self):
+        return self.humidity_sum / self.humidity_count if self.humidity_count else None
+    
+    @property
+    def wind_avg(self):
+        return self.wind_sum / self.wind_count if self.wind_count else None
+
+
+class DailySummary(ObservationAggregate):
+    """Agrégats d'une station pour un jour local, mis à jour à chaque enregistrement d'observations"""
+    station = models.ForeignKey(StationMeteo, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()  # Jour local de la station (obs_time_local)
+    
+    class Meta:
+        verbose_name = "Résumé Journalier"
+        verbose_name_plural = "Résumés Journaliers"
+        ordering = ['-date']
+        unique_together = ['station', 'date']
+    
+    def __str__(self):
+        return f"{self.station.station_id} - {self.date}"
+
+
+class ObservationRollup(ObservationAggregate):
+    """
+    Agrégats d'une station par heure, jour ou mois locaux, construits périodiquement
+    à partir des observations brutes (voir rollups.py)
+    """
+    RESOLUTION_HOUR = 'hour'
+    RESOLUTION_DAY = 'day'
+    RESOLUTION_MONTH = 'month'
+    RESOLUTION_CHOICES = [
+        (RESOLUTION_HOUR, 'Heure'),
+        (RESOLUTION_DAY, 'Jour'),
+        (RESOLUTION_MONTH, 'Mois'),
+    ]
+    
+    station = models.ForeignKey(StationMeteo, on_delete=models.CASCADE, related_name='rollups')
+    resolution = models.CharField(max_length=5, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()  # Début de période, heure locale de la station (comme obs_time_local)
+    
+    class Meta:
+        verbose_name = "Agrégat d'Observations"
+        verbose_name_plural = "Agrégats d'Observations"
+        ordering = ['station', 'resolution', 'bucket_start']
+        unique_together = ['station', 'resolution', 'bucket_start']
+    
+    def __str__(self):
+        return f"{self.station.station_id} - {self.resolution} - {self.bucket_start}"
+
+
+class RollupCheckpoint(models.Model):
+    """Point de reprise du calcul des agrégats: dernière observation (id) intégrée"""
+    name = models.CharField(max_length=50, unique=True)
+    last_observation_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Point de Reprise des Agrégats"
+        verbose_name_plural = "Points de Reprise des Agrégats"
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_observation_id}"
+
+
+class BackfillJob(models.Model):
+    """
+    Récupération de l'historique d'une station pour un jour local (commande
+    backfill_weather): point de reprise d'un chargement interrompu
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_DONE, 'Terminé'),
+        (STATUS_FAILED, 'Échec'),
+    ]
+    
+    # Identifiant PWS: la station peut ne pas encore exister en base
+    station_id = models.CharField(max_length=50)
+    date = models.DateField()  # Jour local de la station
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    fetched_count = models.PositiveIntegerField(default=0)  # Observations reçues de l'API
+    saved_count = models.PositiveIntegerField(default=0)  # Observations nouvelles enregistrées
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Tâche de Rattrapage"
+        verbose_name_plural = "Tâches de Rattrapage"
+        ordering = ['station_id', 'date']
+        unique_together = ['station_id', 'date']
+        indexes = [
+            models.Index(fields=['status', 'station_id', 'date'], name='backfill_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.station_id} - {self.date} ({self.status})"
+
+
+class IngestionLease(models.Model):
+    """
+    Bail de leadership de la collecte (weather/leader.py): seule l'instance qui
+    le détient, et le renouvelle avant expires_at, fait tourner la surveillance
+    """
+    name = models.CharField(max_length=50, unique=True)
+    holder = models.CharField(max_length=255, blank=True)  # Instance: hôte:pid:suffixe aléatoire
+    acquired_at = models.DateTimeField(null=True, blank=True)
+    renewed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Bail de Collecte"
+        verbose_name_plural = "Baux de Collecte"
+    
+    def __str__(self):
+        return f"{self.name}: {self.holder or 'libre'}"
+
+
+class IngestBatch(models.Model):
+    """
+    Envoi accepté en mode asynchrone par POST /api/receive/ (réponse 202),
+    enregistré ensuite par le BatchWriter (weather/ingest.py)
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'En attente'),
+        (STATUS_DONE, 'Terminé'),
+        (STATUS_FAILED, 'Échec'),
+    ]
+    
+    batch_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    observation_count = models.PositiveIntegerField(default=0)  # Observations reçues
+    saved_count = models.PositiveIntegerField(default=0)  # Observations nouvelles enregistrées
+    skipped_count = models.PositiveIntegerField(default=0)  # Doublons (déjà en base ou répétés)
+    rejected = models.JSONField(default=list, blank=True)  # Refusées à l'écriture: [{'index', 'station_id', 'epoch'}]
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Lot de Réception"
+        verbose_name_plural = "Lots de Réception"
+        ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.station.station_id} - {self.obs_time_local}"
\ No newline at end of file
+        return f"{self.batch_id} ({self.status})"
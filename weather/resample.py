@@ -0,0 +1,198 @@
+# resample.py
+"""
+Rééchantillonnage des observations par intervalles de temps (GET /api/resample/).
+
+Les intervalles sont alignés sur l'heure locale de la station. Les intervalles
+d'une heure ou d'un jour sont lus dans les agrégats (rollups.py) quand tous les
+couples (colonne, agrégat) demandés y sont maintenus; sinon, et pour les
+intervalles plus courts, le regroupement est fait par la base sur les
+observations brutes.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db.models import Avg, Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Mod, TruncDate
+
+from .models import ObservationMeteo
+from .rollups import DAY, HOUR, aggregate_series
+from .summaries import SUMMARY_AGGREGATES
+
+# Intervalle -> durée en secondes. Les intervalles d'au plus une heure divisent
+# l'heure: leur alignement local ne dépend pas des changements d'heure (1 h)
+BUCKETS = {
+    '5min': 300,
+    '10min': 600,
+    '15min': 900,
+    '30min': 1800,
+    '1h': 3600,
+    '1d': 86400,
+}
+ROLLUP_RESOLUTIONS = {'1h': HOUR, '1d': DAY}
+
+RESAMPLE_FIELDS = (
+    'temp_high', 'temp_low', 'temp_avg',
+    'humidity_high', 'humidity_low', 'humidity_avg',
+    'dewpt_high', 'dewpt_low', 'dewpt_avg',
+    'windchill_high', 'windchill_low', 'windchill_avg',
+    'heatindex_high', 'heatindex_low', 'heatindex_avg',
+    'windspeed_high', 'windspeed_low', 'windspeed_avg',
+    'windgust_high', 'windgust_low', 'windgust_avg',
+    'winddir_avg',
+    'pressure_max', 'pressure_min', 'pressure_trend',
+    'precip_rate', 'precip_total',
+    'solar_radiation_high', 'uv_high',
+)
+
+RESAMPLE_AGGREGATES = {'avg': Avg, 'min': Min, 'max': Max, 'sum': Sum, 'count': Count}
+
+# (colonne, agrégat) -> calcul depuis un agrégat de rollups.py
+ROLLUP_EQUIVALENTS = {}
+for _field, (_source, _kind) in SUMMARY_AGGREGATES.items():
+    ROLLUP_EQUIVALENTS[(_source, _kind)] = _field
+    if _kind == 'sum':
+        ROLLUP_EQUIVALENTS[(_source, 'avg')] = (_field, _field.replace('_sum', '_count'))
+
+
+def station_zone(station):
+    """Fuseau de la station (UTC si inconnu)"""
+    try:
+        return ZoneInfo(station.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return dt_timezone.utc
+
+
+def resample(station, start, end, bucket, fields, aggregates):
+    """
+    Série rééchantillonnée d'une station sur [start, end).
+    
+    Args:
+        start, end: bornes en epoch (secondes), alignées sur les intervalles
+        bucket: clé de BUCKETS
+        fields: colonnes de RESAMPLE_FIELDS
+        aggregates: clés de RESAMPLE_AGGREGATES, appliquées à chaque colonne
+    
+    Returns:
+        dict {'source', 'time': [début d'intervalle local ISO 8601], 'count': [...],
+              'series': {colonne: {agrégat: [...]}}}
+    """
+    zone = station_zone(station)
+    pairs = [(field, aggregate) for field in fields for aggregate in aggregates]
+    
+    # Série horaire des agrégats: precip_total y est la pluie de l'heure, pas le
+    # maximum du cumul journalier calculé sur les observations brutes; indexée sur
+    # l'heure locale, elle fusionne l'heure répétée du passage à l'heure d'hiver
+    use_rollups = (
+        bucket in ROLLUP_RESOLUTIONS
+        and all(pair in ROLLUP_EQUIVALENTS for pair in pairs)
+        and not (bucket == '1h' and ('precip_total' in fields or local_time_goes_back(zone, start, end)))
+    )
+    if use_rollups:
+        buckets, source = rollup_buckets(station, zone, start, end, bucket, pairs)
+    else:
+        buckets, source = raw_buckets(station, zone, start, end, bucket, pairs)
+    
+    result = {
+        'source': source,
+        'time': [],
+        'count': [],
+        'series': {field: {aggregate: [] for aggregate in aggregates} for field in fields},
+    }
+    for bucket_start, count, values in buckets:
+        result['time'].append(bucket_start.isoformat())
+        result['count'].append(count)
+        for (field, aggregate), value in zip(pairs, values):
+            if aggregate == 'avg' and value is not None:
+                value = round(value, 2)
+            result['series'][field][aggregate].append(value)
+    return result
+
+
+def local_time_goes_back(zone, start, end):
+    """Vrai si l'heure locale recule sur [start, end) (relevé de jour en jour)"""
+    previous = None
+    for epoch in [*range(start, end, 86400), end]:
+        offset = datetime.fromtimestamp(epoch, zone).utcoffset()
+        if previous is not None and offset < previous:
+            return True
+        previous = offset
+    return False
+
+
+def rollup_buckets(station, zone, start, end, bucket, pairs):
+    """Intervalles depuis les agrégats horaires / journaliers (et les observations récentes)"""
+    def local_wall_time(epoch):
+        # Les agrégats sont indexés sur obs_time_local: heure locale notée UTC
+        return datetime.fromtimestamp(epoch, zone).replace(tzinfo=dt_timezone.utc)
+    
+    series = aggregate_series(station, local_wall_time(start), local_wall_time(end), ROLLUP_RESOLUTIONS[bucket])
+    
+    buckets = []
+    for row in series:
+        values = []
+        for pair in pairs:
+            equivalent = ROLLUP_EQUIVALENTS[pair]
+            if isinstance(equivalent, tuple):
+                total, count = row[equivalent[0]], row[equivalent[1]]
+                values.append(total / count if count else None)
+            else:
+                values.append(row[equivalent])
+        bucket_start = row['bucket_start'].replace(tzinfo=None).replace(tzinfo=zone)
+        buckets.append((bucket_start, row['observation_count'], values))
+    return buckets, f"rollup:{ROLLUP_RESOLUTIONS[bucket]}"
+
+
+def raw_buckets(station, zone, start, end, bucket, pairs):
+    """Intervalles calculés par la base (GROUP BY) sur les observations brutes"""
+    observations = ObservationMeteo.objects.filter(
+        station=station,
+        epoch__gte=start,
+        epoch__lt=end
+    )
+    
+    size = BUCKETS[bucket]
+    if size == 86400:
+        # Jour local: obs_time_local est l'heure locale de la station
+        bucket_expression = TruncDate('obs_time_local')
+    else:
+        # Début d'intervalle en epoch, aligné sur l'heure locale: epoch - (epoch + décalage) mod durée
+        offset = int(datetime.fromtimestamp(start, zone).utcoffset().total_seconds())
+        bucket_expression = F('epoch') - Mod(F('epoch') + Value(offset), Value(size))
+    
+    db_aggregates = {
+        f'{field}__{aggregate}': RESAMPLE_AGGREGATES[aggregate](field)
+        for field, aggregate in pairs
+    }
+    rows = observations.annotate(
+        bucket=bucket_expression
+    ).values('bucket').annotate(
+        observation_count=Count('id'),
+        **db_aggregates
+    ).order_by('bucket')
+    
+    buckets = []
+    for row in rows:
+        if size == 86400:
+            bucket_start = datetime.combine(row['bucket'], datetime.min.time(), tzinfo=zone)
+        else:
+            bucket_start = datetime.fromtimestamp(int(row['bucket']), zone)
+        values = [row[f'{field}__{aggregate}'] for field, aggregate in pairs]
+        buckets.append((bucket_start, row['observation_count'], values))
+    return buckets, 'raw'
+
+
+def align(epoch, bucket, zone, ceil=False):
+    """Aligne un epoch sur le début (ou la fin si ceil) de son intervalle local"""
+    size = BUCKETS[bucket]
+    if size == 86400:
+        moment = datetime.fromtimestamp(epoch, zone)
+        day = moment.date()
+        if ceil and moment.replace(tzinfo=None) != datetime.combine(day, datetime.min.time()):
+            day += timedelta(days=1)
+        return int(datetime.combine(day, datetime.min.time(), tzinfo=zone).timestamp())
+    
+    offset = int(datetime.fromtimestamp(epoch, zone).utcoffset().total_seconds())
+    aligned = epoch - (epoch + offset) % size
+    if ceil and aligned != epoch:
+        aligned += size
+    return aligned
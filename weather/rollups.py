@@ -0,0 +1,483 @@
+# rollups.py
+"""
+Agrégats multi-résolution (heure, jour, mois locaux) des observations brutes.
+
+- roll_up(): intègre de façon incrémentale les observations enregistrées depuis le
+  dernier passage (point de reprise sur l'id), tâche planifiée.
+- prune_expired(): applique la politique de rétention WEATHER_RETENTION; les
+  observations brutes ne sont supprimées qu'une fois intégrées aux agrégats.
+- select_tier() / aggregate_series(): choisissent le niveau le plus grossier qui
+  satisfait la résolution et la période demandées.
+
+Tous les agrégats (sommes, nombres, min, max) sont fusionnables: un agrégat horaire,
+journalier ou mensuel se met à jour en y ajoutant les nouvelles observations.
+
+precip_total est un cumul depuis minuit local. Il est conservé par maximum aux
+niveaux heure (cumul atteint en fin d'heure) et jour (pluie du jour); le niveau
+mois additionne les totaux journaliers. aggregate_series() retourne la pluie de
+chaque période: différence des cumuls horaires dans la journée, total du jour,
+somme des jours du mois.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import ObservationMeteo, ObservationRollup, RollupCheckpoint
+from .station_stats import remove_from_station_stats
+from .summaries import DB_AGGREGATES, SUMMARY_AGGREGATES
+import logging
+
+logger = logging.getLogger(__name__)
+
+RAW = 'raw'
+HOUR = ObservationRollup.RESOLUTION_HOUR
+DAY = ObservationRollup.RESOLUTION_DAY
+MONTH = ObservationRollup.RESOLUTION_MONTH
+
+# Du plus fin au plus grossier
+TIERS = (RAW, HOUR, DAY, MONTH)
+RESOLUTIONS = (HOUR, DAY, MONTH)
+
+CHECKPOINT_NAME = 'observations'
+
+# Observations intégrées par transaction
+ROLLUP_CHUNK_SIZE = 50000
+
+# Délai avant intégration d'une observation: laisse aux transactions d'enregistrement
+# concurrentes le temps de valider (les id sont attribués avant la validation)
+ROLLUP_LAG = timedelta(minutes=2)
+
+AGGREGATE_FIELDS = ('observation_count', *SUMMARY_AGGREGATES)
+
+
+def truncate(value, resolution):
+    """Début de la période (heure, jour ou mois) contenant value"""
+    if resolution == HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    if resolution == DAY:
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_bucket(bucket, resolution):
+    """Début de la période suivante"""
+    if resolution == HOUR:
+        return bucket + timedelta(hours=1)
+    if resolution == DAY:
+        return bucket + timedelta(days=1)
+    if bucket.month == 12:
+        return bucket.replace(year=bucket.year + 1, month=1)
+    return bucket.replace(month=bucket.month + 1)
+
+
+def empty_aggregate():
+    aggregate = {field: None for field in AGGREGATE_FIELDS}
+    aggregate['observation_count'] = 0
+    for field, (_, kind) in SUMMARY_AGGREGATES.items():
+        if kind in ('sum', 'count'):
+            aggregate[field] = 0
+    return aggregate
+
+
+def merge(target, delta, precip_sum=False):
+    """
+    Fusionne les agrégats delta dans target (dicts).
+    
+    Args:
+        precip_sum: additionner precip_total (totaux de jours différents, niveau
+                    mois) plutôt que d'en garder le maximum (cumuls d'une même journée)
+    """
+    target['observation_count'] += delta['observation_count']
+    for field, (_, kind) in SUMMARY_AGGREGATES.items():
+        value = delta[field]
+        if value is None:
+            continue
+        current = target[field]
+        if kind in ('sum', 'count') or (precip_sum and field == 'precip_total'):
+            target[field] = (current or 0) + value
+        elif current is None:
+            target[field] = value
+        elif kind == 'max':
+            target[field] = max(current, value)
+        else:
+            target[field] = min(current, value)
+    return target
+
+
+def with_averages(aggregate):
+    """Ajoute les moyennes (temp_avg, humidity_avg, wind_avg) calculées depuis les sommes"""
+    for name, prefix in (('temp_avg', 'temp'), ('humidity_avg', 'humidity'), ('wind_avg', 'wind')):
+        count = aggregate[f'{prefix}_count']
+        aggregate[name] = aggregate[f'{prefix}_sum'] / count if count else None
+    return aggregate
+
+
+def grouped_raw_aggregates(observations, resolution):
+    """
+    Agrège des observations brutes par station et par période en une requête.
+    
+    Returns:
+        {(station_pk, bucket_start): aggregate}
+    """
+    db_aggregates = {
+        field: DB_AGGREGATES[kind](source)
+        for field, (source, kind) in SUMMARY_AGGREGATES.items()
+    }
+    rows = observations.annotate(
+        bucket=Trunc('obs_time_local', resolution)
+    ).values('station_id', 'bucket').annotate(
+        observation_count=Count('id'),
+        **db_aggregates
+    ).order_by()
+    
+    deltas = {}
+    for row in rows:
+        aggregate = merge(empty_aggregate(), row)
+        deltas[(row['station_id'], row['bucket'])] = aggregate
+    return deltas
+
+
+def coarsen(deltas, resolution, precip_sum=False):
+    """Regroupe des agrégats par période plus grossière (voir merge pour precip_sum)"""
+    coarse = defaultdict(empty_aggregate)
+    for (station_pk, bucket), aggregate in deltas.items():
+        merge(coarse[(station_pk, truncate(bucket, resolution))], aggregate, precip_sum)
+    return dict(coarse)
+
+
+def months_from_days(daily):
+    """Agrégats mensuels depuis des agrégats journaliers: les totaux de pluie des jours s'additionnent"""
+    return coarsen(daily, MONTH, precip_sum=True)
+
+
+def hourly_precip(buckets):
+    """
+    Remplace dans des agrégats horaires triés le cumul journalier precip_total
+    par la pluie de l'heure (différence avec l'heure précédente de la journée).
+    
+    Args:
+        buckets: [((station_pk, heure), agrégat)] d'une station, triés par heure
+                 et commençant à minuit
+    """
+    previous_totals = {}
+    for (_, bucket), aggregate in buckets:
+        total = aggregate['precip_total']
+        if total is None:
+            continue
+        day = truncate(bucket, DAY)
+        previous = previous_totals.get(day) or 0
+        previous_totals[day] = max(previous, total)
+        aggregate['precip_total'] = round(max(total - previous, 0), 1)
+
+
+def _apply(resolution, deltas, precip_sum=False):
+    """
+    Fusionne des agrégats dans les ObservationRollup existants (dans la transaction courante).
+    
+    Returns:
+        {(station_pk, bucket_start): hausse de precip_total} pour les périodes qui en ont un
+    """
+    increases = {}
+    if not deltas:
+        return increases
+    
+    station_pks = {station_pk for station_pk, _ in deltas}
+    buckets = {bucket for _, bucket in deltas}
+    existing = {
+        (rollup.station_id, rollup.bucket_start): rollup
+        for rollup in ObservationRollup.objects.select_for_update().filter(
+            resolution=resolution,
+            station_id__in=station_pks,
+            bucket_start__in=buckets
+        )
+    }
+    
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for (station_pk, bucket), delta in deltas.items():
+        rollup = existing.get((station_pk, bucket))
+        if rollup is None:
+            rollup = ObservationRollup(station_id=station_pk, resolution=resolution, bucket_start=bucket)
+            current = empty_aggregate()
+            to_create.append(rollup)
+        else:
+            current = {field: getattr(rollup, field) for field in AGGREGATE_FIELDS}
+            to_update.append(rollup)
+        
+        previous_precip = current['precip_total']
+        for field, value in merge(current, delta, precip_sum).items():
+            setattr(rollup, field, value)
+        rollup.updated_at = now
+        if rollup.precip_total is not None:
+            increases[(station_pk, bucket)] = rollup.precip_total - (previous_precip or 0)
+    
+    if to_update:
+        ObservationRollup.objects.bulk_update(to_update, [*AGGREGATE_FIELDS, 'updated_at'], batch_size=500)
+    if to_create:
+        ObservationRollup.objects.bulk_create(to_create, batch_size=500)
+    return increases
+
+
+def get_checkpoint():
+    checkpoint, _ = RollupCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    return checkpoint
+
+
+def roll_up(chunk_size=ROLLUP_CHUNK_SIZE, lag=ROLLUP_LAG):
+    """
+    Intègre aux agrégats horaires, journaliers et mensuels les observations
+    enregistrées depuis le dernier passage.
+    
+    Returns:
+        nombre d'observations intégrées
+    """
+    checkpoint_pk = get_checkpoint().pk
+    safe_until = timezone.now() - lag
+    total = 0
+    
+    while True:
+        with transaction.atomic():
+            # Verrou du point de reprise: deux passages ne peuvent pas intégrer les mêmes lignes
+            checkpoint = RollupCheckpoint.objects.select_for_update().get(pk=checkpoint_pk)
+            pending = ObservationMeteo.objects.filter(id__gt=checkpoint.last_observation_id)
+            
+            # Ne pas dépasser la première observation trop récente
+            first_recent = pending.filter(created_at__gt=safe_until).aggregate(first=Min('id'))['first']
+            if first_recent is not None:
+                pending = pending.filter(id__lt=first_recent)
+            
+            ids = list(pending.order_by('id').values_list('id', flat=True)[chunk_size - 1:chunk_size])
+            upper = ids[0] if ids else pending.aggregate(last=Max('id'))['last']
+            if upper is None:
+                break
+            
+            hourly = grouped_raw_aggregates(
+                ObservationMeteo.objects.filter(id__gt=checkpoint.last_observation_id, id__lte=upper),
+                HOUR
+            )
+            _apply(HOUR, hourly)
+            daily = coarsen(hourly, DAY)
+            increases = _apply(DAY, daily)
+            # Le total de pluie du mois augmente de la hausse du total de chaque jour
+            for key, aggregate in daily.items():
+                aggregate['precip_total'] = increases.get(key)
+            _apply(MONTH, months_from_days(daily), precip_sum=True)
+            
+            checkpoint.last_observation_id = upper
+            checkpoint.save()
+            total += sum(aggregate['observation_count'] for aggregate in hourly.values())
+        
+        if not ids:
+            break
+    
+    if total:
+        logger.info(f"{total} observations intégrées aux agrégats")
+    return total
+
+
+def rebuild_rollups():
+    """
+    Reconstruit tous les agrégats depuis les observations brutes.
+    Les périodes dont les observations brutes ont été supprimées par la rétention sont perdues.
+    """
+    with transaction.atomic():
+        ObservationRollup.objects.all().delete()
+        RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(last_observation_id=0)
+    return roll_up()
+
+
+def retention_cutoff(tier, now=None):
+    """Date avant laquelle les données du niveau sont supprimées (None: conservées)"""
+    days = settings.WEATHER_RETENTION.get(tier)
+    if days is None:
+        return None
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def prune_expired(now=None, batch_size=10000):
+    """
+    Applique la politique de rétention (WEATHER_RETENTION).
+    
+    Les observations brutes ne sont supprimées qu'une fois intégrées aux agrégats.
+    
+    Returns:
+        dict {niveau: nombre de lignes supprimées}
+    """
+    deleted = {}
+    
+    cutoff = retention_cutoff(RAW, now)
+    if cutoff is not None:
+        expired = ObservationMeteo.objects.filter(
+            obs_time_utc__lt=cutoff,
+            id__lte=get_checkpoint().last_observation_id
+        )
+        deleted[RAW] = 0
+        deleted_by_station = defaultdict(int)
+        # Suppression par lots pour ne pas verrouiller la table longtemps
+        while True:
+            rows = list(expired.order_by().values_list('id', 'station_id')[:batch_size])
+            if not rows:
+                break
+            deleted[RAW] += ObservationMeteo.objects.filter(pk__in=[pk for pk, _ in rows]).delete()[0]
+            for _, station_pk in rows:
+                deleted_by_station[station_pk] += 1
+        
+        if deleted_by_station:
+            # Statistiques des seules stations purgées
+            remove_from_station_stats(deleted_by_station)
+    
+    for resolution in RESOLUTIONS:
+        cutoff = retention_cutoff(resolution, now)
+        if cutoff is not None:
+            deleted[resolution] = ObservationRollup.objects.filter(
+                resolution=resolution,
+                bucket_start__lt=cutoff
+            ).delete()[0]
+    
+    if any(deleted.values()):
+        logger.info(f"Rétention appliquée: {deleted}")
+    return deleted
+
+
+def select_tier(resolution, start, now=None):
+    """
+    Niveau le plus grossier dont la granularité permet la résolution demandée
+    et dont la rétention couvre le début de la période.
+    
+    Args:
+        resolution: 'hour', 'day' ou 'month'
+        start: début de la période demandée
+    """
+    candidates = list(reversed(TIERS[:TIERS.index(resolution) + 1]))
+    for tier in candidates:
+        cutoff = retention_cutoff(tier, now)
+        if cutoff is None or start >= cutoff:
+            return tier
+    
+    # Aucun niveau ne couvre toute la période: le plus grossier remonte le plus loin
+    return candidates[0]
+
+
+def aggregate_series(station, start, end, resolution):
+    """
+    Série agrégée d'une station sur [start, end) à la résolution demandée.
+    
+    Les bornes sont en heure locale de la station (comme obs_time_local) et sont
+    étendues aux limites des périodes: chaque période retournée est complète. Les
+    observations pas encore intégrées aux agrégats sont ajoutées depuis la table brute.
+    precip_total est la pluie de la période (voir l'en-tête du module).
+    
+    Returns:
+        liste de dicts (bucket_start, agrégats et moyennes), triée par période
+    """
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    
+    start = truncate(start, resolution)
+    if truncate(end, resolution) != end:
+        end = next_bucket(truncate(end, resolution), resolution)
+    
+    tier = select_tier(resolution, start)
+    if tier == MONTH:
+        buckets = monthly_buckets(station, start, end)
+    else:
+        # Cumuls de pluie fusionnés par maximum: séries horaire ou journalière,
+        # mois recomposés à partir des jours
+        fine = HOUR if resolution == HOUR else DAY
+        # Série horaire: depuis minuit pour le cumul précédant la première heure
+        query_start = truncate(start, DAY) if resolution == HOUR else start
+        buckets = cumulative_buckets(station, query_start, end, tier, fine)
+        if resolution == HOUR:
+            buckets = sorted(buckets.items(), key=lambda item: item[0][1])
+            hourly_precip(buckets)
+            buckets = {key: aggregate for key, aggregate in buckets if key[1] >= start}
+        elif resolution == MONTH:
+            buckets = months_from_days(buckets)
+    
+    return [
+        with_averages({'bucket_start': bucket, **aggregate})
+        for (_, bucket), aggregate in sorted(buckets.items(), key=lambda item: item[0][1])
+    ]
+
+
+def cumulative_buckets(station, start, end, tier, resolution):
+    """
+    Agrégats horaires ou journaliers sur [start, end) depuis le niveau tier (brut,
+    heure ou jour), precip_total restant le cumul journalier maximal.
+    """
+    raw = ObservationMeteo.objects.filter(
+        station=station,
+        obs_time_local__gte=start,
+        obs_time_local__lt=end
+    )
+    if tier == RAW:
+        return grouped_raw_aggregates(raw, resolution)
+    
+    buckets = {}
+    for row in stored_rollups(station, tier, start, end):
+        buckets[(row['station_id'], row['bucket_start'])] = merge(empty_aggregate(), row)
+    buckets = coarsen(buckets, resolution)
+    
+    # Observations postérieures au dernier passage de roll_up()
+    recent = grouped_raw_aggregates(
+        raw.filter(id__gt=get_checkpoint().last_observation_id),
+        resolution
+    )
+    for key, aggregate in recent.items():
+        merge(buckets.setdefault(key, empty_aggregate()), aggregate)
+    return buckets
+
+
+def monthly_buckets(station, start, end):
+    """
+    Agrégats mensuels sur [start, end) depuis le niveau mois. Les observations
+    récentes augmentent le total de pluie du mois de la hausse du total de leur
+    jour par rapport au niveau jour.
+    """
+    buckets = {}
+    for row in stored_rollups(station, MONTH, start, end):
+        buckets[(row['station_id'], row['bucket_start'])] = merge(empty_aggregate(), row, precip_sum=True)
+    
+    recent = grouped_raw_aggregates(
+        ObservationMeteo.objects.filter(
+            station=station,
+            obs_time_local__gte=start,
+            obs_time_local__lt=end,
+            id__gt=get_checkpoint().last_observation_id
+        ),
+        DAY
+    )
+    if recent:
+        day_totals = {
+            (row['station_id'], row['bucket_start']): row['precip_total']
+            for row in ObservationRollup.objects.filter(
+                station=station,
+                resolution=DAY,
+                bucket_start__in=[bucket for _, bucket in recent]
+            ).values('station_id', 'bucket_start', 'precip_total')
+        }
+        for key, aggregate in recent.items():
+            total = aggregate['precip_total']
+            if total is not None:
+                aggregate['precip_total'] = max(total - (day_totals.get(key) or 0), 0)
+    
+    for key, aggregate in months_from_days(recent).items():
+        merge(buckets.setdefault(key, empty_aggregate()), aggregate, precip_sum=True)
+    return buckets
+
+
+def stored_rollups(station, tier, start, end):
+    return ObservationRollup.objects.filter(
+        station=station,
+        resolution=tier,
+        bucket_start__gte=start,
+        bucket_start__lt=end
+    ).values('station_id', 'bucket_start', *AGGREGATE_FIELDS)
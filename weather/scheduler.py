@@ -0,0 +1,180 @@
+# scheduler.py
+"""
+Planification adaptative des interrogations par station (WeatherMonitorThread).
+
+La cadence de chaque station est déduite de l'écart médian entre ses derniers
+epochs enregistrés. La station est interrogée juste après l'observation
+suivante attendue (dernier epoch + cadence + délai de publication). Une station
+en retard est réinterrogée avec un backoff exponentiel, et une station muette
+depuis WEATHER_POLL_STALE_AFTER secondes l'est au plus lentement.
+
+Par défaut, une station n'est jamais interrogée plus souvent qu'à l'intervalle
+fixe (min_interval = default_interval): le mode adaptatif place les appels
+juste après les publications et espace ceux des stations lentes ou muettes, sans
+jamais dépasser le nombre d'appels du mode fixe (ni le quota de l'API).
+
+Les stations PWS publient souvent sur les mêmes multiples de 5 minutes: un
+décalage propre à chaque station (entre 1 et 2 fois le délai de publication)
+et un jitter aléatoire étalent les interrogations.
+"""
+import random
+import statistics
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+from .models import ObservationMeteo
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Epochs utilisés pour estimer la cadence
+CADENCE_SAMPLE = 12
+
+
+def recent_epochs(station_id, limit=CADENCE_SAMPLE):
+    """Derniers epochs enregistrés d'une station, du plus récent au plus ancien"""
+    return list(
+        ObservationMeteo.objects.filter(
+            station__station_id=station_id
+        ).order_by('-epoch').values_list('epoch', flat=True)[:limit]
+    )
+
+
+def estimate_cadence(epochs):
+    """Écart médian (secondes) entre epochs successifs, None si moins de deux epochs"""
+    epochs = sorted(set(epochs))
+    gaps = [later - earlier for earlier, later in zip(epochs, epochs[1:])]
+    return statistics.median(gaps) if gaps else None
+
+
+class PollScheduler:
+    """
+    Échéances d'interrogation des stations, partagées entre threads.
+    
+    Utilisation: sync() avec les stations surveillées, pop_due() pour les stations
+    à interroger, puis update() à la fin de chaque interrogation.
+    """
+    
+    def __init__(self, default_interval, grace=None, min_interval=None, max_interval=None,
+                 stale_after=None, jitter=None, clock=time.time, rng=random.random, load_epochs=recent_epochs):
+        """
+        Args:
+            default_interval: délai pour une station sans historique (secondes)
+            grace: délai de publication attendu après l'observation (défaut: WEATHER_POLL_GRACE),
+                   allongé d'un décalage propre à la station (jusqu'à 2 × grace)
+            min_interval / max_interval: bornes du délai entre deux interrogations
+                                         (min_interval par défaut: WEATHER_POLL_MIN_INTERVAL,
+                                         sinon default_interval)
+            stale_after: ancienneté de la dernière observation au-delà de laquelle
+                         la station est interrogée toutes les max_interval secondes
+            jitter: fraction aléatoire ajoutée au délai (0.1: jusqu'à +10 %)
+            clock / rng / load_epochs: remplaçables pour la simulation
+        """
+        self.default_interval = default_interval
+        self.grace = settings.WEATHER_POLL_GRACE if grace is None else grace
+        self.min_interval = min_interval or settings.WEATHER_POLL_MIN_INTERVAL or default_interval
+        self.max_interval = max_interval or settings.WEATHER_POLL_MAX_INTERVAL
+        self.stale_after = stale_after or settings.WEATHER_POLL_STALE_AFTER
+        self.jitter = settings.WEATHER_POLL_JITTER if jitter is None else jitter
+        self.clock = clock
+        self.rng = rng
+        self.load_epochs = load_epochs
+        
+        self._due = {}  # station_id -> échéance (timestamp), absente pendant l'interrogation
+        self._state = {}  # station_id -> {'last_epoch', 'cadence', 'misses', 'loaded'}
+        self._lock = threading.Lock()
+    
+    def sync(self, station_ids):
+        """Ajoute les nouvelles stations (premières interrogations étalées sur min_interval) et oublie les autres"""
+        now = self.clock()
+        with self._lock:
+            for station_id in set(self._state) - set(station_ids):
+                self._state.pop(station_id)
+                self._due.pop(station_id, None)
+            for station_id in station_ids:
+                if station_id not in self._state:
+                    self._state[station_id] = {'last_epoch': None, 'cadence': None, 'misses': 0, 'loaded': False}
+                    self._due[station_id] = now + self._phase(station_id) * self.min_interval
+    
+    def pop_due(self):
+        """Stations dont l'échéance est passée, retirées jusqu'à leur update()"""
+        now = self.clock()
+        with self._lock:
+            due = sorted((when, station_id) for station_id, when in self._due.items() if when <= now)
+            for _, station_id in due:
+                del self._due[station_id]
+        return [station_id for _, station_id in due]
+    
+    def next_due(self):
+        """Prochaine échéance (timestamp), None si aucune station planifiée"""
+        with self._lock:
+            return min(self._due.values(), default=None)
+    
+    def update(self, station_id, saved_count, epochs=None):
+        """
+        Replanifie une station après une interrogation.
+        
+        Args:
+            saved_count: observations nouvelles enregistrées (0 si rien, None si échec)
+            epochs: derniers epochs de la station (défaut: lus en base, seulement
+                    si de nouvelles observations ont été enregistrées)
+        
+        Returns:
+            délai avant la prochaine interrogation (secondes)
+        """
+        with self._lock:
+            state = self._state.get(station_id)
+            if state is None:
+                return None
+            needs_epochs = saved_count or not state['loaded']
+        
+        if needs_epochs and epochs is None:
+            try:
+                epochs = self.load_epochs(station_id)
+            except Exception as e:
+                # Replanifier quand même, avec l'état connu
+                logger.error(f"{station_id}: lecture des derniers epochs impossible: {str(e)}")
+        
+        now = self.clock()
+        with self._lock:
+            if station_id not in self._state:
+                return None
+            if epochs is not None:
+                state['loaded'] = True
+                if epochs:
+                    state['last_epoch'] = max(epochs)
+                    state['cadence'] = estimate_cadence(epochs) or state['cadence']
+            if saved_count:
+                state['misses'] = 0
+            
+            delay = self._delay(station_id, state, now)
+            delay *= 1 + self.jitter * self.rng()
+            self._due[station_id] = now + delay
+            return delay
+    
+    def _delay(self, station_id, state, now):
+        last_epoch = state['last_epoch']
+        if last_epoch is None:
+            return self.default_interval
+        
+        cadence = state['cadence'] or self.default_interval
+        expected = last_epoch + cadence + self.grace * (1 + self._phase(station_id))
+        if expected > now:
+            # Juste après la prochaine observation attendue
+            delay = expected - now
+        elif now - last_epoch >= self.stale_after:
+            # Station muette: interrogation au plus lent
+            delay = self.max_interval
+        else:
+            # En retard: backoff exponentiel à partir de la cadence
+            delay = cadence * 2 ** state['misses']
+            state['misses'] += 1
+        return min(max(delay, self.min_interval), self.max_interval)
+    
+    @staticmethod
+    def _phase(station_id):
+        """Décalage stable propre à la station, dans [0, 1)"""
+        return zlib.crc32(station_id.encode()) / 2 ** 32
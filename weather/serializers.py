@@ -0,0 +1,157 @@
+# serializers.py
+"""
+Sérialisation JSON des observations sans instances de modèle.
+
+Seules les colonnes publiées sont lues (tuples values_list), chaque ligne est
+formatée par un gabarit précompilé et le tableau est produit par morceaux pour
+StreamingHttpResponse. La sortie est identique octet pour octet à
+json.dumps(..., cls=DjangoJSONEncoder) (séparateurs par défaut ', ' et ': ').
+"""
+import json
+import math
+from functools import lru_cache
+
+# Schéma d'une observation publiée: clé JSON -> colonne, ou sous-objet
+OBSERVATION_SCHEMA = [
+    ('time_utc', 'obs_time_utc'),
+    ('time_local', 'obs_time_local'),
+    ('temperature', [
+        ('high', 'temp_high'),
+        ('low', 'temp_low'),
+        ('avg', 'temp_avg'),
+    ]),
+    ('humidity', [
+        ('high', 'humidity_high'),
+        ('low', 'humidity_low'),
+        ('avg', 'humidity_avg'),
+    ]),
+    ('wind', [
+        ('direction', 'winddir_avg'),
+        ('speed_high', 'windspeed_high'),
+        ('speed_avg', 'windspeed_avg'),
+        ('gust_high', 'windgust_high'),
+    ]),
+    ('pressure', [
+        ('max', 'pressure_max'),
+        ('min', 'pressure_min'),
+        ('trend', 'pressure_trend'),
+    ]),
+    ('precipitation', [
+        ('rate', 'precip_rate'),
+        ('total', 'precip_total'),
+    ]),
+    ('solar_radiation', 'solar_radiation_high'),
+    ('uv_index', 'uv_high'),
+]
+
+# Lignes lues par aller-retour avec la base
+ITERATOR_CHUNK_SIZE = 2000
+# Taille approximative des morceaux envoyés
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+
+def encode_number(value):
+    """Nombre (ou None) au format de json.dumps"""
+    if value is None:
+        return 'null'
+    if value.__class__ is float and not math.isfinite(value):
+        return 'NaN' if value != value else ('Infinity' if value > 0 else '-Infinity')
+    return repr(value)
+
+
+def encode_utc(value):
+    """Date UTC au format isoformat() (comme DjangoJSONEncoder)"""
+    return f'"{value.isoformat()}"'
+
+
+def encode_local(value):
+    """Date locale au format 'YYYY-MM-DD HH:MM:SS'"""
+    return f'"{value.isoformat(" ")[:19]}"'
+
+
+COLUMN_ENCODERS = {
+    'obs_time_utc': encode_utc,
+    'obs_time_local': encode_local,
+}
+
+
+def compile_schema(schema):
+    """
+    Précompile un schéma en gabarit de ligne.
+    
+    Returns:
+        (gabarit '%s', colonnes dans l'ordre des '%s', encodeurs des colonnes)
+    """
+    columns = []
+    
+    def build(fields):
+        parts = []
+        for key, source in fields:
+            if isinstance(source, list):
+                value = build(source)
+            else:
+                columns.append(source)
+                value = '%s'
+            parts.append(f'{json.dumps(key)}: {value}')
+        return '{' + ', '.join(parts) + '}'
+    
+    template = build(schema)
+    encoders = [COLUMN_ENCODERS.get(column, encode_number) for column in columns]
+    return template, columns, encoders
+
+
+OBSERVATION_TEMPLATE, OBSERVATION_COLUMNS, OBSERVATION_ENCODERS = compile_schema(OBSERVATION_SCHEMA)
+
+
+@lru_cache(maxsize=64)
+def project_schema(fields):
+    """
+    Gabarit compilé pour une projection du schéma.
+    
+    Args:
+        fields: tuple de clés de premier niveau de OBSERVATION_SCHEMA, dans l'ordre voulu
+    
+    Raises:
+        KeyError: clé inconnue
+    """
+    schema = dict(OBSERVATION_SCHEMA)
+    return compile_schema([(field, schema[field]) for field in fields])
+
+
+def encode_rows(rows, template=OBSERVATION_TEMPLATE, encoders=OBSERVATION_ENCODERS):
+    """Formate des tuples (dans l'ordre des colonnes du gabarit) en JSON (str)"""
+    for row in rows:
+        yield template % tuple([encode(value) for encode, value in zip(encoders, row)])
+
+
+def iter_observation_rows(queryset, template=OBSERVATION_TEMPLATE, columns=OBSERVATION_COLUMNS,
+                          encoders=OBSERVATION_ENCODERS):
+    """Itère sur les observations d'un queryset, formatées une à une en JSON (str)"""
+    rows = queryset.values_list(*columns).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    return encode_rows(rows, template, encoders)
+
+
+def iter_json_array(items, prefix='[', suffix=']'):
+    """
+    Produit un tableau JSON par morceaux d'environ OUTPUT_CHUNK_SIZE octets.
+    
+    Args:
+        items: éléments déjà encodés en JSON (str)
+        prefix, suffix: texte autour du tableau (ex. en-tête d'un objet englobant)
+    """
+    buffer = [prefix]
+    size = len(prefix)
+    first = True
+    for item in items:
+        if not first:
+            buffer.append(', ')
+        buffer.append(item)
+        size += len(item) + 2
+        first = False
+        if size >= OUTPUT_CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    
+    buffer.append(suffix)
+    yield ''.join(buffer).encode()
@@ -1,15 +1,66 @@
 # services.py
+import hashlib
 import requests
 import threading
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, time as dt_time, timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
-from .models import StationMeteo, ObservationMeteo
+from django.utils.dateparse import parse_date, parse_datetime
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.db.models import Max
+from . import conversions
+from .cache import invalidate_station_days, station_cache
+from .client import PWSClient, get_client
+from .models import StationMeteo, ObservationMeteo, DailySummary
+from .scheduler import PollScheduler
+from .station_stats import update_station_stats
+from .summaries import update_daily_summaries
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Nombre de lignes par INSERT lors des insertions en bloc
+BULK_CREATE_BATCH_SIZE = 500
+
+# Champs numériques lus tels quels dans l'observation (hors bloc 'imperial', déjà
+# vérifié par la conversion): une valeur invalide n'écarte que son observation
+RAW_NUMERIC_FIELDS = (
+    'epoch', 'solar_radiation_high', 'uv_high', 'winddir_avg',
+    'humidity_high', 'humidity_low', 'humidity_avg', 'qc_status', 'pressure_trend',
+)
+
+# Erreurs d'une ligne à l'insertion en bloc (valeur hors limites de la colonne...):
+# repli ligne par ligne pour n'écarter que la ligne fautive
+ROW_ERRORS = (IntegrityError, DataError, ValueError, TypeError, OverflowError)
+
+
+# Métriques de GET /api/compare/: colonne -> (agrégat, champ de DailySummary).
+# 'avg' se calcule depuis les champs <préfixe>_sum / <préfixe>_count
+COMPARE_METRICS = {
+    'temp': {
+        'temp_avg': ('avg', 'temp'),
+        'temp_max': ('max', 'temp_max'),
+        'temp_min': ('min', 'temp_min'),
+    },
+    'humidity': {
+        'humidity_avg': ('avg', 'humidity'),
+        'humidity_max': ('max', 'humidity_max'),
+        'humidity_min': ('min', 'humidity_min'),
+    },
+    'precip': {
+        'precip_total': ('sum', 'precip_total'),
+        'precip_rate_max': ('max', 'precip_rate_max'),
+    },
+    'wind': {
+        'wind_avg': ('avg', 'wind'),
+        'wind_max': ('max', 'wind_max'),
+        'gust_max': ('max', 'gust_max'),
+    },
+}
+
 
 class WeatherDataService:
     """Service pour gérer les données météo"""
@@ -17,30 +68,22 @@ class WeatherDataService:
     @staticmethod
     def fahrenheit_to_celsius(f_temp):
         """Convertit Fahrenheit en Celsius"""
-        if f_temp is None:
-            return None
-        return round((f_temp - 32) * 5/9, 1)
+        return conversions.fahrenheit_to_celsius(f_temp)
     
     @staticmethod
     def mph_to_kmh(mph):
         """Convertit mph en km/h"""
-        if mph is None:
-            return None
-        return round(mph * 1.60934, 1)
+        return conversions.mph_to_kmh(mph)
     
     @staticmethod
     def inches_to_mm(inches):
         """Convertit inches en mm"""
-        if inches is None:
-            return None
-        return round(inches * 25.4, 1)
+        return conversions.inches_to_mm(inches)
     
     @staticmethod
     def incheshg_to_hpa(inches_hg):
         """Convertit inches Hg en hPa"""
-        if inches_hg is None:
-            return None
-        return round(inches_hg * 33.8639, 1)
+        return conversions.incheshg_to_hpa(inches_hg)
     
     @staticmethod
     def parse_datetime(date_string):
@@ -55,9 +98,46 @@ class WeatherDataService:
                 from dateutil import parser
                 return parser.parse(date_string)
     
+    @staticmethod
+    def local_day_bounds(day):
+        """
+        Bornes [début, fin) d'un jour local pour filtrer obs_time_local par plage
+        (prédicat indexable, contrairement à obs_time_local__date qui applique DATE() à la colonne)
+        """
+        start = timezone.make_aware(datetime.combine(day, dt_time.min))
+        return start, start + timedelta(days=1)
+    
+    @staticmethod
+    def parse_time_bound(value):
+        """
+        Borne de plage en epoch (secondes): date, date-heure ISO 8601 ou epoch.
+        Les dates et date-heures sans fuseau sont interprétées dans le fuseau courant.
+        
+        Raises:
+            ValueError: format non reconnu
+        """
+        if not value:
+            return None
+        if value.lstrip('-').isdigit():
+            return int(value)
+        
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"Date invalide: {value}")
+            moment = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return int(moment.timestamp())
+    
     @staticmethod
     def get_or_create_station(station_data):
-        """Crée ou récupère une station météo"""
+        """Crée ou récupère une station météo (via le cache des stations)"""
+        station = station_cache.get(station_data['stationID'])
+        if station is not None:
+            return station
+        
         station, created = StationMeteo.objects.get_or_create(
             station_id=station_data['stationID'],
             defaults={
@@ -70,9 +150,89 @@ class WeatherDataService:
         
         if created:
             logger.info(f"Nouvelle station créée: {station.station_id}")
-        
+            # Mise en cache après validation: si la transaction est annulée (repli
+            # après IntegrityError), le cache ne garde pas une clé primaire inexistante
+            transaction.on_commit(lambda: station_cache.set(station))
+        else:
+            station_cache.set(station)
         return station
     
+    @staticmethod
+    def build_observation(station, observation_data, metric_data=None):
+        """
+        Construit (sans l'enregistrer) une observation convertie en système métrique.
+        
+        Args:
+            metric_data: valeurs déjà converties (voir conversions.convert_imperial_batch);
+                         calculées ici si absentes
+        
+        Raises:
+            KeyError, ValueError: champ manquant ou valeur non numérique
+        """
+        imperial_data = observation_data.get('imperial', {})
+        if metric_data is None:
+            metric_data = conversions.convert_imperial(imperial_data)
+        
+        observation = ObservationMeteo(
+            station=station,
+            obs_time_utc=datetime.fromtimestamp(observation_data['epoch'], tz=timezone.utc),
+            obs_time_local=WeatherDataService.parse_datetime(observation_data['obsTimeLocal']),
+            epoch=observation_data['epoch'],
+            solar_radiation_high=observation_data.get('solarRadiationHigh'),
+            uv_high=observation_data.get('uvHigh'),
+            winddir_avg=observation_data.get('winddirAvg'),
+            humidity_high=observation_data.get('humidityHigh'),
+            humidity_low=observation_data.get('humidityLow'),
+            humidity_avg=observation_data.get('humidityAvg'),
+            qc_status=observation_data.get('qcStatus', -1),
+            pressure_trend=imperial_data.get('pressureTrend'),
+            
+            # Données converties en système métrique
+            **metric_data
+        )
+        
+        # Même conversion que le modèle à l'enregistrement ("12" -> 12), mais
+        # avant l'insertion en bloc: "abc" n'écarte que cette observation
+        for name in RAW_NUMERIC_FIELDS:
+            value = getattr(observation, name)
+            if value is not None:
+                try:
+                    setattr(observation, name, ObservationMeteo._meta.get_field(name).to_python(value))
+                except (ValidationError, OverflowError):
+                    raise ValueError(f"{name}: valeur numérique attendue, reçu {value!r}")
+        return observation
+    
+    @staticmethod
+    def build_observations(pending):
+        """
+        Construit un lot d'observations avec une conversion métrique vectorisée.
+        
+        Args:
+            pending: liste de tuples (station, observation_data)
+        
+        Returns:
+            liste d'ObservationMeteo non enregistrées (les observations invalides sont écartées)
+        """
+        try:
+            metric_rows = conversions.convert_imperial_batch([
+                observation_data.get('imperial') or {} for _, observation_data in pending
+            ])
+        except (TypeError, ValueError) as e:
+            # Valeur invalide dans le lot: conversion par observation, seules les invalides sont écartées
+            logger.warning(f"Conversion vectorisée impossible, conversion ligne par ligne: {str(e)}")
+            metric_rows = [None] * len(pending)
+        
+        observations = []
+        for (station, observation_data), metric_data in zip(pending, metric_rows):
+            try:
+                observations.append(
+                    WeatherDataService.build_observation(station, observation_data, metric_data)
+                )
+            except Exception as e:
+                logger.error(f"Erreur lors de la préparation de l'observation: {str(e)}")
+        
+        return observations
+    
     @staticmethod
     def save_observation(observation_data):
         """Enregistre une observation météo"""
@@ -90,158 +250,541 @@ class WeatherDataService:
                     return None
                 
                 # Créer l'observation
-                imperial_data = observation_data.get('imperial', {})
-                
-                # Conversions vers le système métrique
-                temp_high = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('tempHigh'))
-                temp_low = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('tempLow'))
-                temp_avg = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('tempAvg'))
-                
-                windspeed_high = WeatherDataService.mph_to_kmh(imperial_data.get('windspeedHigh'))
-                windspeed_low = WeatherDataService.mph_to_kmh(imperial_data.get('windspeedLow'))
-                windspeed_avg = WeatherDataService.mph_to_kmh(imperial_data.get('windspeedAvg'))
-                
-                windgust_high = WeatherDataService.mph_to_kmh(imperial_data.get('windgustHigh'))
-                windgust_low = WeatherDataService.mph_to_kmh(imperial_data.get('windgustLow'))
-                windgust_avg = WeatherDataService.mph_to_kmh(imperial_data.get('windgustAvg'))
-                
-                dewpt_high = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('dewptHigh'))
-                dewpt_low = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('dewptLow'))
-                dewpt_avg = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('dewptAvg'))
-                
-                windchill_high = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('windchillHigh'))
-                windchill_low = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('windchillLow'))
-                windchill_avg = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('windchillAvg'))
-                
-                heatindex_high = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('heatindexHigh'))
-                heatindex_low = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('heatindexLow'))
-                heatindex_avg = WeatherDataService.fahrenheit_to_celsius(imperial_data.get('heatindexAvg'))
-                
-                pressure_max = WeatherDataService.incheshg_to_hpa(imperial_data.get('pressureMax'))
-                pressure_min = WeatherDataService.incheshg_to_hpa(imperial_data.get('pressureMin'))
+                observation = WeatherDataService.build_observation(station, observation_data)
+                observation.save()
+                invalidate_station_days(update_daily_summaries([observation]))
+                update_station_stats([observation])
                 
-                precip_rate = WeatherDataService.inches_to_mm(imperial_data.get('precipRate'))
-                precip_total = WeatherDataService.inches_to_mm(imperial_data.get('precipTotal'))
-                
-                observation = ObservationMeteo.objects.create(
-                    station=station,
-                    obs_time_utc=datetime.fromtimestamp(observation_data['epoch'], tz=timezone.utc),
-                    obs_time_local=WeatherDataService.parse_datetime(observation_data['obsTimeLocal']),
-                    epoch=observation_data['epoch'],
-                    solar_radiation_high=observation_data.get('solarRadiationHigh'),
-                    uv_high=observation_data.get('uvHigh'),
-                    winddir_avg=observation_data.get('winddirAvg'),
-                    humidity_high=observation_data.get('humidityHigh'),
-                    humidity_low=observation_data.get('humidityLow'),
-                    humidity_avg=observation_data.get('humidityAvg'),
-                    qc_status=observation_data.get('qcStatus', -1),
-                    
-                    # Données converties en système métrique
-                    temp_high=temp_high,
-                    temp_low=temp_low,
-                    temp_avg=temp_avg,
-                    windspeed_high=windspeed_high,
-                    windspeed_low=windspeed_low,
-                    windspeed_avg=windspeed_avg,
-                    windgust_high=windgust_high,
-                    windgust_low=windgust_low,
-                    windgust_avg=windgust_avg,
-                    dewpt_high=dewpt_high,
-                    dewpt_low=dewpt_low,
-                    dewpt_avg=dewpt_avg,
-                    windchill_high=windchill_high,
-                    windchill_low=windchill_low,
-                    windchill_avg=windchill_avg,
-                    heatindex_high=heatindex_high,
-                    heatindex_low=heatindex_low,
-                    heatindex_avg=heatindex_avg,
-                    pressure_max=pressure_max,
-                    pressure_min=pressure_min,
-                    pressure_trend=imperial_data.get('pressureTrend'),
-                    precip_rate=precip_rate,
-                    precip_total=precip_total
-                )
-                
-                logger.info(f"Observation enregistrée: {station.station_id} - {observation.obs_time_local} - Temp: {temp_avg}°C")
+                logger.info(f"Observation enregistrée: {station.station_id} - {observation.obs_time_local} - Temp: {observation.temp_avg}°C")
                 return observation
-                
+        
         except Exception as e:
             logger.error(f"Erreur lors de l'enregistrement de l'observation: {str(e)}")
             return None
     
+    @staticmethod
+    def resolve_stations(observations):
+        """
+        Récupère toutes les stations d'un lot d'observations (cache des stations,
+        puis une seule requête pour les absentes).
+        Les stations inconnues sont créées (cas rare: première réception).
+        
+        Returns:
+            dict {station_id: StationMeteo}
+        """
+        station_data = {}
+        for obs_data in observations:
+            station_id = obs_data.get('stationID')
+            if station_id and station_id not in station_data:
+                station_data[station_id] = obs_data
+        
+        stations = station_cache.get_many(station_data)
+        
+        for station_id, obs_data in station_data.items():
+            if station_id not in stations:
+                try:
+                    stations[station_id] = WeatherDataService.get_or_create_station(obs_data)
+                except KeyError as e:
+                    logger.error(f"Données de station incomplètes pour {station_id}: {str(e)}")
+        
+        return stations
+    
+    @staticmethod
+    def get_existing_epochs(stations, epochs):
+        """
+        Charge en une seule requête les couples (station, epoch) déjà enregistrés
+        sur la plage d'epochs du lot (index unique station/epoch).
+        """
+        if not stations or not epochs:
+            return set()
+        
+        return set(
+            ObservationMeteo.objects.filter(
+                station__in=list(stations),
+                epoch__gte=min(epochs),
+                epoch__lte=max(epochs)
+            ).values_list('station_id', 'epoch')
+        )
+    
     @staticmethod
     def save_observations_bulk(data):
-        """Enregistre plusieurs observations en bloc"""
+        """
+        Enregistre plusieurs observations en bloc.
+        
+        Les stations sont résolues en une requête, les doublons détectés en une
+        requête sur la plage d'epochs, puis les nouvelles lignes sont insérées
+        par un seul bulk_create dans une transaction. Une observation invalide
+        est écartée seule, jamais le lot entier.
+        """
         if 'observations' not in data:
             logger.error("Format de données invalide: 'observations' manquant")
             return 0
         
-        saved_count = 0
-        for obs_data in data['observations']:
-            if WeatherDataService.save_observation(obs_data):
-                saved_count += 1
+        observations = data['observations']
+        if not observations:
+            logger.info("0 nouvelles observations enregistrées")
+            return 0
+        
+        try:
+            with transaction.atomic():
+                stations = WeatherDataService.resolve_stations(observations)
+                epochs = [obs_data['epoch'] for obs_data in observations if 'epoch' in obs_data]
+                existing = WeatherDataService.get_existing_epochs(stations.values(), epochs)
+                
+                pending = []
+                for obs_data in observations:
+                    try:
+                        station = stations[obs_data['stationID']]
+                        key = (station.pk, obs_data['epoch'])
+                    except Exception as e:
+                        logger.error(f"Erreur lors de la préparation de l'observation: {str(e)}")
+                        continue
+                    
+                    if key in existing:
+                        logger.debug(f"Observation déjà existante pour epoch {obs_data['epoch']}")
+                        continue
+                    
+                    pending.append((station, obs_data))
+                    existing.add(key)
+                
+                new_observations = WeatherDataService.build_observations(pending)
+                ObservationMeteo.objects.bulk_create(new_observations, batch_size=BULK_CREATE_BATCH_SIZE)
+                invalidate_station_days(update_daily_summaries(new_observations))
+                update_station_stats(new_observations)
+                saved_count = len(new_observations)
+        
+        except ROW_ERRORS as e:
+            # Écriture concurrente sur les mêmes (station, epoch) ou ligne refusée par
+            # la base: repli ligne par ligne, seules les lignes fautives sont écartées
+            logger.warning(f"Échec de l'insertion en bloc, repli ligne par ligne: {str(e)}")
+            saved_count = 0
+            for obs_data in observations:
+                if WeatherDataService.save_observation(obs_data):
+                    saved_count += 1
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement en bloc: {str(e)}")
+            return 0
         
         logger.info(f"{saved_count} nouvelles observations enregistrées")
         return saved_count
     
+    @staticmethod
+    def get_last_epoch(station_id):
+        """Epoch de la dernière observation enregistrée d'une station (statistiques dénormalisées, None si aucune)"""
+        return StationMeteo.objects.filter(
+            station_id=station_id
+        ).values_list('last_obs__epoch', flat=True).first()
+    
     @staticmethod
     def get_temperature_stats(station_id, days=7):
-        """Récupère les statistiques de température pour une station"""
-        from django.db.models import Avg, Max, Min
+        """
+        Récupère les statistiques de température pour une station.
+        
+        Calculées à partir des résumés journaliers (une ligne par jour local)
+        des `days` derniers jours, jour de début inclus.
+        """
+        from django.db.models import Max, Min, Sum
         
-        start_date = timezone.now() - timedelta(days=days)
+        start_date = (timezone.now() - timedelta(days=days)).date()
         
-        stats = ObservationMeteo.objects.filter(
-            station__station_id=station_id,
-            obs_time_utc__gte=start_date
+        try:
+            station = station_cache.get_station(station_id)
+        except StationMeteo.DoesNotExist:
+            station = None
+        
+        stats = DailySummary.objects.filter(
+            station=station,
+            date__gte=start_date
         ).aggregate(
-            avg_temp=Avg('temp_avg'),
-            max_temp=Max('temp_high'),
-            min_temp=Min('temp_low'),
-            avg_humidity=Avg('humidity_avg')
+            temp_sum=Sum('temp_sum'),
+            temp_count=Sum('temp_count'),
+            max_temp=Max('temp_max'),
+            min_temp=Min('temp_min'),
+            humidity_sum=Sum('humidity_sum'),
+            humidity_count=Sum('humidity_count')
         )
         
+        avg_temp = stats['temp_sum'] / stats['temp_count'] if stats['temp_count'] else None
+        avg_humidity = stats['humidity_sum'] / stats['humidity_count'] if stats['humidity_count'] else None
+        
         return {
-            'temp_moyenne': round(stats['avg_temp'] or 0, 1),
+            'temp_moyenne': round(avg_temp or 0, 1),
             'temp_maximale': round(stats['max_temp'] or 0, 1),
             'temp_minimale': round(stats['min_temp'] or 0, 1),
-            'humidite_moyenne': round(stats['avg_humidity'] or 0, 1)
+            'humidite_moyenne': round(avg_humidity or 0, 1)
         }
     
+    @staticmethod
+    def compare_stations(stations, days=7, metrics=None):
+        """
+        Statistiques de plusieurs stations sur les `days` derniers jours, en une
+        requête groupée par station sur les résumés journaliers.
+        
+        Args:
+            stations: stations à comparer
+            metrics: clés de COMPARE_METRICS (défaut: toutes)
+        
+        Returns:
+            (colonnes, {station_pk: valeurs dans l'ordre des colonnes})
+        """
+        from django.db.models import Max, Min, Sum
+        
+        metrics = metrics or list(COMPARE_METRICS)
+        start_date = (timezone.now() - timedelta(days=days)).date()
+        
+        aggregates = {'observation_count': Sum('observation_count')}
+        columns = ['observation_count']
+        for metric in metrics:
+            for column, (kind, field) in COMPARE_METRICS[metric].items():
+                columns.append(column)
+                if kind == 'avg':
+                    aggregates[f'{column}__sum'] = Sum(f'{field}_sum')
+                    aggregates[f'{column}__count'] = Sum(f'{field}_count')
+                else:
+                    aggregates[column] = {'sum': Sum, 'max': Max, 'min': Min}[kind](field)
+        
+        rows = DailySummary.objects.filter(
+            station__in=list(stations),
+            date__gte=start_date
+        ).values('station_id').annotate(**aggregates).order_by()
+        
+        results = {}
+        for row in rows:
+            for column in columns:
+                if f'{column}__sum' in row:
+                    count = row[f'{column}__count']
+                    row[column] = round(row[f'{column}__sum'] / count, 1) if count else None
+            results[row['station_id']] = [row[column] for column in columns]
+        
+        return columns, results
+    
     @staticmethod
     def get_latest_observation(station_id):
         """Récupère la dernière observation d'une station"""
         try:
+            station = station_cache.get_station(station_id)
             return ObservationMeteo.objects.filter(
-                station__station_id=station_id
+                station=station
             ).order_by('-obs_time_utc').first()
+        except StationMeteo.DoesNotExist:
+            return None
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de la dernière observation: {str(e)}")
             return None
 
 
+class PayloadFilter:
+    """
+    Écarte en amont de la base les données déjà connues:
+    - empreinte SHA-256 du dernier payload reçu pour chaque source (URL + station)
+    - high-water mark par station: epoch de la dernière observation enregistrée
+    
+    L'état est local au processus; le high-water mark d'une station est
+    initialisé depuis la base au premier passage.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digests = {}
+        self._high_water = {}
+    
+    @staticmethod
+    def digest(raw_payload):
+        """Empreinte d'un payload brut (bytes)"""
+        return hashlib.sha256(raw_payload).hexdigest()
+    
+    def is_unchanged(self, source, digest):
+        """Indique si le payload est identique au dernier payload traité pour cette source"""
+        with self._lock:
+            return self._digests.get(source) == digest
+    
+    def remember(self, source, digest):
+        """Mémorise l'empreinte du dernier payload traité avec succès"""
+        with self._lock:
+            self._digests[source] = digest
+    
+    def high_water_mark(self, station_id):
+        """Retourne le dernier epoch enregistré pour une station (None si aucun)"""
+        with self._lock:
+            if station_id in self._high_water:
+                return self._high_water[station_id]
+        
+        high_water = ObservationMeteo.objects.filter(
+            station__station_id=station_id
+        ).aggregate(max_epoch=Max('epoch'))['max_epoch']
+        
+        with self._lock:
+            return self._high_water.setdefault(station_id, high_water)
+    
+    def filter_new(self, observations):
+        """Ne conserve que les observations postérieures au high-water mark de leur station"""
+        new_observations = []
+        for obs_data in observations:
+            station_id = obs_data.get('stationID')
+            epoch = obs_data.get('epoch')
+            if station_id is None or epoch is None:
+                # Laisser le chemin d'enregistrement journaliser l'observation invalide
+                new_observations.append(obs_data)
+                continue
+            
+            high_water = self.high_water_mark(station_id)
+            if high_water is None or epoch > high_water:
+                new_observations.append(obs_data)
+        
+        return new_observations
+    
+    def advance(self, observations):
+        """Avance les high-water marks après un enregistrement complet"""
+        with self._lock:
+            for obs_data in observations:
+                station_id = obs_data.get('stationID')
+                epoch = obs_data.get('epoch')
+                if station_id is None or epoch is None:
+                    continue
+                current = self._high_water.get(station_id)
+                if current is None or epoch > current:
+                    self._high_water[station_id] = epoch
+    
+    def reset(self, station_ids=None):
+        """Oublie l'état mémorisé (toutes les stations, ou seulement celles indiquées)"""
+        with self._lock:
+            if station_ids is None:
+                self._high_water.clear()
+                self._digests.clear()
+                return
+            for station_id in station_ids:
+                self._high_water.pop(station_id, None)
+            self._digests = {
+                source: digest for source, digest in self._digests.items()
+                if source[1] not in station_ids
+            }
+
+
+def monitored_station_ids():
+    """Stations surveillées: stations actives en base, plus celles de WEATHER_STATION_IDS pas encore créées"""
+    station_ids = list(StationMeteo.objects.filter(actif=True).values_list('station_id', flat=True))
+    
+    configured = settings.WEATHER_STATION_IDS
+    known = set(StationMeteo.objects.filter(station_id__in=configured).values_list('station_id', flat=True))
+    station_ids.extend(station_id for station_id in configured if station_id not in known)
+    
+    return station_ids
+
+
+# Filtre partagé par le thread de surveillance, les tâches Celery et la commande fetch_weather
+_payload_filter = PayloadFilter()
+
+
+class WeatherService:
+    """Récupération des données depuis l'API Weather.com en ne traitant que les nouveautés"""
+    
+    @staticmethod
+    def fetch_and_save_if_changed(station_id=None, api_url=None, api_key=None, client=None):
+        """
+        Récupère le payload de l'API et n'enregistre que les observations nouvelles.
+        Un payload inchangé (304, ou contenu identique au précédent) ne touche pas la base.
+        
+        Args:
+            client: PWSClient à utiliser (défaut: client partagé du processus)
+        
+        Returns:
+            dict avec 'status', 'saved', 'count', 'message' et 'data'
+        """
+        station_id = station_id or settings.WEATHER_STATION_ID
+        api_url = api_url or settings.WEATHER_API_URL
+        client = client or get_client()
+        source = (api_url, station_id)
+        
+        try:
+            logger.debug(f"Récupération des données depuis: {api_url}")
+            logger.debug(f"Paramètres: stationId={station_id}")
+            
+            response = client.fetch_observations(station_id, url=api_url, api_key=api_key)
+            if response.status_code == 304:
+                return {
+                    'status': 'success',
+                    'saved': False,
+                    'count': 0,
+                    'message': 'Données inchangées (304 Not Modified)'
+                }
+            
+            processed = False
+            try:
+                digest = PayloadFilter.digest(response.content)
+                if _payload_filter.is_unchanged(source, digest):
+                    processed = True
+                    return {
+                        'status': 'success',
+                        'saved': False,
+                        'count': 0,
+                        'message': 'Payload inchangé depuis la dernière récupération'
+                    }
+                
+                data = response.json()
+                if 'observations' not in data:
+                    return {
+                        'status': 'error',
+                        'saved': False,
+                        'count': 0,
+                        'message': "Format de données invalide: 'observations' manquant"
+                    }
+                
+                observations = _payload_filter.filter_new(data['observations'] or [])
+                count = 0
+                if observations:
+                    count = WeatherDataService.save_observations_bulk({'observations': observations})
+                    
+                    if count != len(observations):
+                        # Enregistrement partiel: réinitialiser depuis la base au prochain passage
+                        _payload_filter.reset({obs_data.get('stationID') for obs_data in observations})
+                        return WeatherService._result(station_id, count)
+                    
+                    _payload_filter.advance(observations)
+                
+                _payload_filter.remember(source, digest)
+                processed = True
+                return WeatherService._result(station_id, count)
+            finally:
+                if not processed:
+                    # Ne pas recevoir de 304 pour un payload qui n'a pas été entièrement traité
+                    client.forget_validators(station_id, url=api_url)
+        
+        except requests.RequestException as e:
+            logger.error(f"Erreur de requête API: {str(e)}")
+            return {'status': 'error', 'saved': False, 'count': 0, 'message': f"Erreur de requête API: {str(e)}"}
+        except Exception as e:
+            logger.error(f"Erreur inattendue: {str(e)}")
+            return {'status': 'error', 'saved': False, 'count': 0, 'message': f"Erreur inattendue: {str(e)}"}
+    
+    @staticmethod
+    def fetch_new_observations(station_id, api_url=None, api_key=None, client=None):
+        """
+        Récupère le payload d'une station et ne retourne que les observations
+        postérieures à la dernière observation enregistrée en base (pipeline
+        Celery: l'état partagé entre les workers est celui de la base).
+        
+        Returns:
+            liste d'observations (vide si 304 ou rien de nouveau)
+        
+        Raises:
+            requests.RequestException, ValueError (JSON invalide)
+        """
+        api_url = api_url or settings.WEATHER_API_URL
+        client = client or get_client()
+        
+        response = client.fetch_observations(station_id, url=api_url, api_key=api_key)
+        if response.status_code == 304:
+            return []
+        
+        try:
+            observations = response.json().get('observations') or []
+            last_epoch = WeatherDataService.get_last_epoch(station_id)
+        except Exception:
+            client.forget_validators(station_id, url=api_url)
+            raise
+        
+        if last_epoch is None:
+            return observations
+        # Sans epoch: laisser le chemin d'enregistrement journaliser l'observation invalide
+        return [
+            obs_data for obs_data in observations
+            if obs_data.get('epoch') is None or obs_data['epoch'] > last_epoch
+        ]
+    
+    @staticmethod
+    def _result(station_id, count):
+        """Construit le résultat d'une récupération"""
+        if count == 0:
+            return {
+                'status': 'success',
+                'saved': False,
+                'count': 0,
+                'message': 'Aucune nouvelle observation'
+            }
+        
+        result = {
+            'status': 'success',
+            'saved': True,
+            'count': count,
+            'message': f'{count} nouvelles observations enregistrées',
+            'data': {}
+        }
+        
+        latest_obs = WeatherDataService.get_latest_observation(station_id)
+        if latest_obs:
+            result['data'] = {
+                'temperature': latest_obs.temp_avg,
+                'time_local': latest_obs.obs_time_local.isoformat()
+            }
+        
+        return result
+    
+    @staticmethod
+    def should_fetch_automatically(station_id=None, max_age_seconds=300):
+        """
+        Indique si une récupération est utile: pas d'observation en base, ou
+        dernière observation plus ancienne que max_age_seconds (cadence PWS: 5 minutes).
+        """
+        station_id = station_id or settings.WEATHER_STATION_ID
+        latest_obs = WeatherDataService.get_latest_observation(station_id)
+        if latest_obs is None:
+            return True
+        
+        return timezone.now() - latest_obs.obs_time_utc >= timedelta(seconds=max_age_seconds)
+
+
 class WeatherMonitorThread(threading.Thread):
-    """Thread pour surveiller et enregistrer automatiquement les données météo"""
+    """
+    Thread pour surveiller et enregistrer automatiquement les données météo.
     
-    def __init__(self, api_url, api_key, interval_seconds=900, station_id=None):
+    Les stations sont interrogées en parallèle (pool de threads borné, session
+    HTTP keep-alive partagée); l'échec ou la lenteur d'une station ne bloque pas
+    les autres. En mode adaptatif, chaque station est interrogée selon sa
+    propre cadence (scheduler.py); sinon toutes le sont à chaque intervalle.
+    """
+    
+    def __init__(self, api_url, api_key, interval_seconds=900, station_id=None, max_workers=None, timeout=None,
+                 adaptive=None):
         """
         Args:
             api_url: URL de base l'API météo
             api_key: Clé API Weather.com
-            interval_seconds: Intervalle de vérification en secondes (défaut: 5 minutes)
-            station_id: ID de la station à surveiller (optionnel)
+            interval_seconds: Intervalle de vérification en secondes (défaut: 15 minutes). En mode
+                              adaptatif: délai des stations sans historique et période de
+                              rafraîchissement de la liste des stations
+            station_id: ID de la seule station à surveiller (optionnel, sinon
+                        stations actives en base et WEATHER_STATION_IDS)
+            max_workers: Nombre de requêtes simultanées (défaut: WEATHER_POLL_WORKERS)
+            timeout: Délai de lecture par station en secondes (défaut: WEATHER_POLL_TIMEOUT)
+            adaptive: Planification par station (défaut: WEATHER_ADAPTIVE_POLLING)
         """
         super().__init__(daemon=True)
         self.api_url = api_url
         self.api_key = api_key
         self.interval_seconds = interval_seconds
         self.station_id = station_id
+        self.max_workers = max_workers or settings.WEATHER_POLL_WORKERS
+        self.timeout = timeout or settings.WEATHER_POLL_TIMEOUT
+        self.adaptive = settings.WEATHER_ADAPTIVE_POLLING if adaptive is None else adaptive
+        self.scheduler = PollScheduler(default_interval=interval_seconds) if self.adaptive else None
         self.running = False
         self._stop_event = threading.Event()
+        
+        self.client = PWSClient(api_key=api_key, read_timeout=self.timeout, pool_maxsize=self.max_workers)
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='weather-poll')
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
     
     def run(self):
         """Démarre la surveillance"""
         self.running = True
+        if self.adaptive:
+            logger.info("Thread de surveillance démarré - Planification adaptative")
+            self.run_adaptive()
+            logger.info("Thread de surveillance arrêté")
+            return
+        
         logger.info(f"Thread de surveillance démarré - Intervalle: {self.interval_seconds}s")
         
         while not self._stop_event.is_set():
@@ -249,55 +792,112 @@ class WeatherMonitorThread(threading.Thread):
                 self.fetch_and_save_data()
             except Exception as e:
                 logger.error(f"Erreur dans le thread de surveillance: {str(e)}")
+            finally:
+                close_old_connections()
             
             # Attendre avant la prochaine vérification
             self._stop_event.wait(self.interval_seconds)
         
         logger.info("Thread de surveillance arrêté")
     
+    def run_adaptive(self):
+        """Boucle de planification: interroge les stations à échéance, puis attend la suivante"""
+        next_sync = 0
+        while not self._stop_event.is_set():
+            try:
+                if time.time() >= next_sync:
+                    self.scheduler.sync(self.get_station_ids())
+                    next_sync = time.time() + self.interval_seconds
+                
+                for station_id in self.scheduler.pop_due():
+                    self._executor.submit(self.poll_station, station_id)
+            except Exception as e:
+                logger.error(f"Erreur dans le thread de surveillance: {str(e)}")
+            finally:
+                close_old_connections()
+            
+            next_due = self.scheduler.next_due()
+            wake_at = next_sync if next_due is None else min(next_due, next_sync)
+            self._stop_event.wait(max(1.0, wake_at - time.time()))
+    
+    def poll_station(self, station_id):
+        """Interroge une station puis la replanifie (mode adaptatif, exécuté dans le pool)"""
+        saved_count = None
+        try:
+            result = self.fetch_station(station_id)
+            if result['status'] == 'success':
+                saved_count = result['count']
+        except Exception as e:
+            logger.error(f"{station_id}: {str(e)}")
+        
+        try:
+            delay = self.scheduler.update(station_id, saved_count)
+            if delay is not None:
+                logger.debug(f"{station_id}: prochaine interrogation dans {delay:.0f}s")
+        finally:
+            close_old_connections()
+    
+    def get_station_ids(self):
+        """Stations à interroger: la station configurée, sinon les stations surveillées"""
+        if self.station_id:
+            return [self.station_id]
+        return monitored_station_ids()
+    
     def fetch_and_save_data(self):
-        """Récupère et enregistre les données depuis l'API"""
+        """Interroge toutes les stations en parallèle et enregistre les nouvelles données"""
+        futures = {}
+        for station_id in self.get_station_ids():
+            with self._in_flight_lock:
+                if station_id in self._in_flight:
+                    # Requête précédente encore en cours: ne pas empiler les appels
+                    logger.warning(f"{station_id}: récupération précédente toujours en cours, station ignorée")
+                    continue
+                self._in_flight.add(station_id)
+            futures[self._executor.submit(self.fetch_station, station_id)] = station_id
+        
+        if not futures:
+            return
+        
+        # Délai global: chaque station dispose de ses propres timeouts et nouvelles tentatives
+        done, not_done = wait(futures, timeout=self.timeout * (self.client.max_retries + 1))
+        for future in not_done:
+            logger.error(f"{futures[future]}: toujours en cours à la fin de l'intervalle de collecte")
+    
+    def fetch_station(self, station_id):
+        """Récupère et enregistre les nouvelles données d'une station (exécuté dans le pool)"""
+        close_old_connections()
         try:
-            # Construire l'URL avec les paramètres
-            params = {
-                'format': 'json',
-                'units': 'e',  # Imperial units (nous convertissons en métrique)
-                'apiKey': self.api_key
-            }
-            
-            if self.station_id:
-                params['stationId'] = self.station_id
-            
-            logger.debug(f"Récupération des données depuis: {self.api_url}")
-            logger.debug(f"Paramètres: stationId={self.station_id}")
+            result = WeatherService.fetch_and_save_if_changed(
+                station_id=station_id,
+                api_url=self.api_url,
+                api_key=self.api_key,
+                client=self.client
+            )
             
-            response = requests.get(self.api_url, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            count = WeatherDataService.save_observations_bulk(data)
-            
-            if count > 0:
-                # Récupérer la dernière température pour le log
-                latest_obs = WeatherDataService.get_latest_observation(self.station_id)
-                
-                if latest_obs:
-                    logger.info(f"✓ {count} nouvelles observations - Dernière temp: {latest_obs.temp_avg}°C")
+            if result['status'] != 'success':
+                logger.error(f"{station_id}: {result['message']}")
+            elif result['saved']:
+                temperature = result.get('data', {}).get('temperature')
+                if temperature is not None:
+                    logger.info(f"✓ {station_id}: {result['count']} nouvelles observations - Dernière temp: {temperature}°C")
                 else:
-                    logger.info(f"✓ {count} nouvelles observations enregistrées")
+                    logger.info(f"✓ {station_id}: {result['count']} nouvelles observations enregistrées")
             else:
-                logger.debug("Aucune nouvelle observation")
-                
-        except requests.RequestException as e:
-            logger.error(f"Erreur de requête API: {str(e)}")
-        except Exception as e:
-            logger.error(f"Erreur inattendue: {str(e)}")
+                logger.debug(f"{station_id}: {result['message']}")
+            
+            return result
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(station_id)
+            close_old_connections()
     
     def stop(self):
         """Arrête le thread proprement"""
         logger.info("Arrêt du thread de surveillance demandé...")
         self._stop_event.set()
         self.running = False
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
 
 
 # Instance globale du thread de surveillance
@@ -315,7 +915,7 @@ def start_weather_monitoring(api_url, api_key, interval_seconds=900, station_id=
     _monitor_thread = WeatherMonitorThread(api_url, api_key, interval_seconds, station_id)
     _monitor_thread.start()
     
-    logger.info(f"[OK] Surveillance météo démarrée: {station_id} (intervalle: {interval_seconds}s)")
+    logger.info(f"[OK] Surveillance météo démarrée: {station_id or 'stations surveillées'} (intervalle: {interval_seconds}s)")
     return _monitor_thread
 
 
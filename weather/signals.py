@@ -0,0 +1,16 @@
+# signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from django.utils import timezone
+
+from .cache import invalidate_station_days, station_cache
+from .models import StationMeteo
+
+
+@receiver(post_save, sender=StationMeteo)
+@receiver(post_delete, sender=StationMeteo)
+def invalidate_station_cache(sender, instance, **kwargs):
+    """Invalide le cache des stations lors d'une modification (admin, API, shell...)"""
+    station_cache.invalidate(instance)
+    invalidate_station_days({(instance.pk, timezone.now().date())})
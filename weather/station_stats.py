@@ -0,0 +1,160 @@
+# station_stats.py
+"""
+Statistiques dénormalisées des stations (nombre d'observations, première et
+dernière observation).
+
+Mises à jour de façon incrémentale par le chemin d'enregistrement et par la
+purge des observations brutes, réparables à partir de la table des
+observations (commande repair_station_stats).
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import ObservationMeteo, StationMeteo
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def update_station_stats(observations):
+    """
+    Ajoute des observations nouvellement enregistrées aux statistiques de leurs stations.
+    
+    Une requête UPDATE par station, à base d'expressions F(): pas de lecture
+    préalable, les écritures concurrentes s'additionnent correctement.
+    Doit être appelé dans la transaction d'enregistrement.
+    """
+    by_station = {}
+    for observation in observations:
+        stats = by_station.setdefault(observation.station_id, {
+            'count': 0,
+            'first': observation,
+            'last': observation,
+        })
+        stats['count'] += 1
+        if observation.obs_time_utc < stats['first'].obs_time_utc:
+            stats['first'] = observation
+        if observation.obs_time_utc > stats['last'].obs_time_utc:
+            stats['last'] = observation
+    
+    with transaction.atomic():
+        for station_pk, stats in by_station.items():
+            last = stats['last']
+            last_pk = last.pk
+            if last_pk is None:
+                # bulk_create ne renvoie pas les clés primaires sous MySQL
+                last_pk = ObservationMeteo.objects.filter(
+                    station_id=station_pk,
+                    epoch=last.epoch
+                ).values_list('id', flat=True).first()
+            
+            is_newer = Q(last_obs_utc__isnull=True) | Q(last_obs_utc__lt=last.obs_time_utc)
+            first_obs_utc = Value(stats['first'].obs_time_utc)
+            
+            # last_obs doit précéder last_obs_utc: MySQL évalue les affectations
+            # du SET dans l'ordre, avec les valeurs déjà modifiées
+            StationMeteo.objects.filter(pk=station_pk).update(
+                last_obs=Case(
+                    When(is_newer, then=Value(last_pk)),
+                    default=F('last_obs'),
+                    output_field=ObservationMeteo._meta.pk
+                ),
+                last_obs_utc=Case(When(is_newer, then=Value(last.obs_time_utc)), default=F('last_obs_utc')),
+                first_obs_utc=Least(Coalesce('first_obs_utc', first_obs_utc), first_obs_utc),
+                observation_count=F('observation_count') + stats['count']
+            )
+
+
+def remove_from_station_stats(deleted_counts):
+    """
+    Retire des statistiques de leurs stations des observations supprimées (purge).
+    
+    Le nombre d'observations est décrémenté par F(); la première observation et,
+    si elle a été supprimée, la dernière sont relues sur l'index
+    (station, obs_time_utc). Seules les stations concernées sont lues.
+    
+    Args:
+        deleted_counts: {clé primaire de station: nombre d'observations supprimées}
+    """
+    with transaction.atomic():
+        for station_pk, count in deleted_counts.items():
+            observations = ObservationMeteo.objects.filter(station_id=station_pk)
+            first_obs_utc = observations.order_by('obs_time_utc').values_list('obs_time_utc', flat=True).first()
+            last = observations.order_by('-obs_time_utc', '-epoch').values_list('id', 'obs_time_utc').first()
+            last_pk, last_obs_utc = last or (None, None)
+            
+            # La dernière observation supprimée a été détachée (SET_NULL): la remplacer.
+            # last_obs_utc doit précéder last_obs, dont il teste l'ancienne valeur
+            # (MySQL évalue les affectations du SET dans l'ordre)
+            was_deleted = Q(last_obs__isnull=True)
+            StationMeteo.objects.filter(pk=station_pk).update(
+                observation_count=Greatest(F('observation_count') - count, Value(0)),
+                first_obs_utc=Value(first_obs_utc, output_field=StationMeteo._meta.get_field('first_obs_utc')),
+                last_obs_utc=Case(
+                    When(was_deleted, then=Value(last_obs_utc)),
+                    default=F('last_obs_utc'),
+                    output_field=StationMeteo._meta.get_field('last_obs_utc')
+                ),
+                last_obs=Case(
+                    When(was_deleted, then=Value(last_pk)),
+                    default=F('last_obs'),
+                    output_field=ObservationMeteo._meta.pk
+                )
+            )
+
+
+def refresh_station_stats(stations=None, station_model=StationMeteo, observation_model=ObservationMeteo):
+    """
+    Recalcule les statistiques des stations à partir des observations brutes.
+    
+    Args:
+        stations: stations à recalculer (défaut: toutes)
+        station_model / observation_model: modèles à utiliser (modèles historiques
+                                           dans une migration)
+    
+    Returns:
+        nombre de stations mises à jour
+    """
+    queryset = station_model.objects.all()
+    if stations is not None:
+        queryset = queryset.filter(pk__in=[station.pk for station in stations])
+    
+    with transaction.atomic():
+        stations = list(queryset.select_for_update())
+        
+        rows = observation_model.objects.filter(
+            station__in=stations
+        ).values('station_id').annotate(
+            count=Count('id'),
+            first=Min('obs_time_utc'),
+            last=Max('obs_time_utc')
+        ).order_by()
+        aggregates = {row['station_id']: row for row in rows}
+        
+        for station in stations:
+            row = aggregates.get(station.pk)
+            if row is None:
+                station.observation_count = 0
+                station.first_obs_utc = None
+                station.last_obs_utc = None
+                station.last_obs_id = None
+                continue
+            
+            station.observation_count = row['count']
+            station.first_obs_utc = row['first']
+            station.last_obs_utc = row['last']
+            # Index (station, obs_time_utc): une recherche par station
+            station.last_obs_id = observation_model.objects.filter(
+                station=station,
+                obs_time_utc=row['last']
+            ).order_by('-epoch').values_list('id', flat=True).first()
+        
+        station_model.objects.bulk_update(
+            stations,
+            ['observation_count', 'first_obs_utc', 'last_obs_utc', 'last_obs'],
+            batch_size=500
+        )
+    
+    logger.info(f"Statistiques recalculées pour {len(stations)} stations")
+    return len(stations)
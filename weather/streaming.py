@@ -0,0 +1,186 @@
+# streaming.py
+"""
+Lecture incrémentale des envois d'observations (POST /api/receive/).
+
+Le corps de la requête n'est jamais chargé en entier: il est lu par blocs et
+les observations sont produites une à une, pour être enregistrées par lots.
+"""
+import codecs
+import json
+import re
+
+# Types de contenu traités comme du JSON délimité par des retours à la ligne
+NDJSON_CONTENT_TYPES = (
+    'application/x-ndjson',
+    'application/ndjson',
+    'application/jsonl',
+)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'\s*')
+_decoder = json.JSONDecoder()
+
+
+def iter_ndjson(stream):
+    """Itère sur les observations d'un flux NDJSON (une observation par ligne)"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        
+        observation = json.loads(line)
+        if not isinstance(observation, dict):
+            raise ValueError(f"Ligne {line_number}: objet JSON attendu")
+        yield observation
+
+
+def iter_json_observations(stream, chunk_size=READ_CHUNK_SIZE):
+    """
+    Itère sur les éléments du tableau 'observations' d'un document JSON
+    ({"observations": [...]}) ou d'un tableau JSON nu, lu par blocs.
+    
+    Ne produit rien si l'objet ne contient pas de clé 'observations'. Les
+    observations sont produites au fil de la lecture: une erreur plus loin dans
+    le document (y compris après le tableau) est levée après elles.
+    
+    Raises:
+        json.JSONDecodeError / ValueError si le document est invalide
+    """
+    reader = _ChunkReader(stream, chunk_size)
+    position = reader.skip_whitespace(0)
+    char = reader.char(position)
+    
+    if char == '[':
+        position = yield from _iter_array(reader, position + 1)
+        reader.expect_end(position)
+        return
+    
+    if char != '{':
+        raise ValueError("Objet ou tableau JSON attendu")
+    
+    # Parcours des clés de premier niveau: seules les autres valeurs sont décodées en entier
+    position += 1
+    expect_separator = False
+    while True:
+        position = reader.skip_whitespace(position)
+        char = reader.char(position)
+        
+        if char == '}':
+            reader.expect_end(position + 1)
+            return
+        if expect_separator:
+            reader.expect(position, ',')
+            position = reader.skip_whitespace(position + 1)
+        
+        reader.expect(position, '"')
+        key, position = reader.decode(position)
+        position = reader.skip_whitespace(position)
+        reader.expect(position, ':')
+        position = reader.skip_whitespace(position + 1)
+        
+        if key == 'observations' and reader.char(position) == '[':
+            position = yield from _iter_array(reader, position + 1)
+        else:
+            _, position = reader.decode(position)
+        position = reader.compact(position)
+        expect_separator = True
+
+
+def _iter_array(reader, position):
+    """
+    Produit les objets d'un tableau JSON dont le '[' précède position;
+    retourne la position qui suit le ']'
+    """
+    expect_separator = False
+    while True:
+        position = reader.skip_whitespace(position)
+        
+        if reader.char(position) == ']':
+            return position + 1
+        if expect_separator:
+            reader.expect(position, ',')
+            position = reader.skip_whitespace(position + 1)
+        
+        reader.expect(position, '{')
+        observation, position = reader.decode(position)
+        yield observation
+        expect_separator = True
+        
+        position = reader.compact(position)
+
+
+class _ChunkReader:
+    """Tampon de texte alimenté par blocs depuis un flux binaire"""
+    
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.offset = 0  # Position absolue du début du tampon (messages d'erreur)
+        self.eof = False
+    
+    def read_more(self):
+        """Ajoute un bloc au tampon; retourne False en fin de flux"""
+        if self.eof:
+            return False
+        
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.buffer += self.decoder.decode(b'', final=True)
+            self.eof = True
+            return False
+        
+        self.buffer += self.decoder.decode(chunk)
+        return True
+    
+    def char(self, position):
+        """Caractère à la position donnée (lit la suite du flux si besoin), None en fin de flux"""
+        while position >= len(self.buffer):
+            if not self.read_more():
+                return None
+        return self.buffer[position]
+    
+    def skip_whitespace(self, position):
+        while True:
+            position = _WHITESPACE.match(self.buffer, position).end()
+            if position < len(self.buffer) or not self.read_more():
+                return position
+    
+    def expect(self, position, expected):
+        """Vérifie le caractère attendu à la position donnée"""
+        char = self.char(position)
+        if char != expected:
+            found = 'fin du flux' if char is None else repr(char)
+            raise ValueError(f"{expected!r} attendu à la position {self.offset + position}, trouvé {found}")
+    
+    def expect_end(self, position):
+        """Vérifie que seuls des blancs suivent la fin du document"""
+        position = self.skip_whitespace(position)
+        char = self.char(position)
+        if char is not None:
+            raise ValueError(f"Fin du document attendue à la position {self.offset + position}, trouvé {char!r}")
+    
+    def decode(self, position):
+        """Décode la valeur JSON commençant à position, en lisant la suite du flux si besoin"""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, position)
+            except json.JSONDecodeError:
+                # Valeur incomplète: lire la suite, sinon l'erreur est définitive
+                if not self.read_more():
+                    raise
+                continue
+            
+            # Un nombre en fin de tampon peut être tronqué
+            if end < len(self.buffer) or not self.read_more():
+                return value, end
+    
+    def compact(self, position):
+        """Libère la partie déjà consommée du tampon"""
+        if position > self.chunk_size:
+            self.buffer = self.buffer[position:]
+            self.offset += position
+            return 0
+        return position
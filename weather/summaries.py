@@ -0,0 +1,182 @@
+# summaries.py
+"""
+Maintenance des résumés journaliers (DailySummary).
+
+Les résumés sont mis à jour de façon incrémentale par le chemin d'enregistrement
+(sommes, nombres, minima et maxima courants) et peuvent être reconstruits à partir
+des observations brutes (commande rebuild_daily_summaries).
+"""
+from collections import defaultdict
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySummary, ObservationMeteo
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Champ du résumé -> (champ de l'observation, agrégat)
+SUMMARY_AGGREGATES = {
+    'temp_sum': ('temp_avg', 'sum'),
+    'temp_count': ('temp_avg', 'count'),
+    'temp_max': ('temp_high', 'max'),
+    'temp_min': ('temp_low', 'min'),
+    'humidity_sum': ('humidity_avg', 'sum'),
+    'humidity_count': ('humidity_avg', 'count'),
+    'humidity_max': ('humidity_high', 'max'),
+    'humidity_min': ('humidity_low', 'min'),
+    'wind_sum': ('windspeed_avg', 'sum'),
+    'wind_count': ('windspeed_avg', 'count'),
+    'wind_max': ('windspeed_high', 'max'),
+    'gust_max': ('windgust_high', 'max'),
+    'precip_total': ('precip_total', 'max'),
+    'precip_rate_max': ('precip_rate', 'max'),
+}
+
+DB_AGGREGATES = {'sum': Sum, 'count': Count, 'max': Max, 'min': Min}
+
+
+def local_date(observation):
+    """Jour local d'une observation (obs_time_local est l'heure locale de la station)"""
+    return observation.obs_time_local.date()
+
+
+def accumulate(summary, observation):
+    """Ajoute une observation aux agrégats courants d'un résumé"""
+    summary.observation_count += 1
+    for field, (source, aggregate) in SUMMARY_AGGREGATES.items():
+        value = getattr(observation, source)
+        if value is None:
+            continue
+        
+        current = getattr(summary, field)
+        if aggregate == 'sum':
+            setattr(summary, field, current + value)
+        elif aggregate == 'count':
+            setattr(summary, field, current + 1)
+        elif aggregate == 'max':
+            setattr(summary, field, value if current is None else max(current, value))
+        else:
+            setattr(summary, field, value if current is None else min(current, value))
+
+
+def update_daily_summaries(observations):
+    """
+    Met à jour les résumés journaliers avec des observations nouvellement enregistrées.
+    
+    Doit être appelé dans la transaction d'enregistrement: les résumés existants
+    sont verrouillés (SELECT ... FOR UPDATE) le temps de la mise à jour.
+    
+    Returns:
+        ensemble des clés (station_pk, date) modifiées
+    """
+    by_key = defaultdict(list)
+    for observation in observations:
+        by_key[(observation.station_id, local_date(observation))].append(observation)
+    
+    if not by_key:
+        return set()
+    
+    station_pks = {station_pk for station_pk, _ in by_key}
+    dates = {day for _, day in by_key}
+    
+    with transaction.atomic():
+        existing = {
+            (summary.station_id, summary.date): summary
+            for summary in DailySummary.objects.select_for_update().filter(
+                station_id__in=station_pks,
+                date__in=dates
+            )
+        }
+        
+        to_create = []
+        to_update = []
+        for key, day_observations in by_key.items():
+            summary = existing.get(key)
+            if summary is None:
+                summary = DailySummary(station_id=key[0], date=key[1])
+                to_create.append(summary)
+            else:
+                to_update.append(summary)
+            
+            for observation in day_observations:
+                accumulate(summary, observation)
+        
+        if to_update:
+            # bulk_update n'applique pas auto_now
+            now = timezone.now()
+            for summary in to_update:
+                summary.updated_at = now
+            DailySummary.objects.bulk_update(
+                to_update,
+                ['observation_count', *SUMMARY_AGGREGATES, 'updated_at']
+            )
+        if to_create:
+            DailySummary.objects.bulk_create(to_create)
+    
+    return set(by_key)
+
+
+def rebuild_daily_summaries(stations=None, observation_model=ObservationMeteo, summary_model=DailySummary):
+    """
+    Reconstruit les résumés journaliers à partir des observations brutes.
+    
+    Si une rétention des observations brutes est configurée (WEATHER_RETENTION['raw']),
+    les jours dont les observations ont pu être supprimées sont conservés tels quels.
+    
+    Args:
+        stations: stations à reconstruire (défaut: toutes)
+        observation_model / summary_model: modèles à utiliser (modèles historiques
+                                           dans une migration)
+    
+    Returns:
+        nombre de résumés écrits
+    """
+    observations = observation_model.objects.all()
+    summaries = summary_model.objects.all()
+    if stations is not None:
+        observations = observations.filter(station__in=stations)
+        summaries = summaries.filter(station__in=stations)
+    
+    raw_retention_days = settings.WEATHER_RETENTION.get('raw')
+    if raw_retention_days is not None:
+        first_complete_day = (timezone.now() - timedelta(days=raw_retention_days)).date() + timedelta(days=1)
+        observations = observations.filter(
+            obs_time_local__gte=timezone.make_aware(datetime.combine(first_complete_day, time.min))
+        )
+        summaries = summaries.filter(date__gte=first_complete_day)
+    
+    aggregates = {
+        field: DB_AGGREGATES[aggregate](source)
+        for field, (source, aggregate) in SUMMARY_AGGREGATES.items()
+    }
+    rows = observations.annotate(
+        day=TruncDate('obs_time_local')
+    ).values('station_id', 'day').annotate(
+        observation_count=Count('id'),
+        **aggregates
+    ).order_by()
+    
+    rebuilt = []
+    for row in rows:
+        summary = summary_model(station_id=row['station_id'], date=row['day'])
+        summary.observation_count = row['observation_count']
+        for field, (_, aggregate) in SUMMARY_AGGREGATES.items():
+            value = row[field]
+            if aggregate == 'sum' and value is None:
+                value = 0
+            setattr(summary, field, value)
+        rebuilt.append(summary)
+    
+    with transaction.atomic():
+        summaries.delete()
+        summary_model.objects.bulk_create(rebuilt, batch_size=500)
+    
+    logger.info(f"{len(rebuilt)} résumés journaliers reconstruits")
+    return len(rebuilt)
@@ -1,13 +1,111 @@
-from weatherapi.celery import shared_task
-from .services import WeatherService
+"""
+Pipeline Celery de collecte.
+
+- dispatch_fetch_task (beat): une tâche fetch_station_task par station surveillée,
+  sauf si la surveillance du processus web (leader.py) détient le bail de collecte
+- fetch_station_task (file WEATHER_FETCH_QUEUE, limitée par WEATHER_FETCH_RATE_LIMIT):
+  récupère le payload et transmet les seules observations nouvelles
+- ingest_observations_task: enregistrement en bloc, routé vers la file
+  weather.ingest.<n> de la station (crc32(station_id) modulo WEATHER_INGEST_SHARDS)
+
+Une station est toujours écrite depuis la même file: avec un worker à
+concurrence 1 par file d'enregistrement, ses écritures restent ordonnées et
+sans conflit, et le débit augmente avec le nombre de files. Exemple:
+
+    celery -A weatherapi worker -Q celery,weather.fetch -c 8
+    celery -A weatherapi worker -Q weather.ingest.0 -c 1   # une commande par file
+"""
+import zlib
+
+import requests
+from celery import shared_task
+from django.conf import settings
+from .leader import MONITOR_LEASE, active_holder
+from .rollups import prune_expired, roll_up
+from .services import WeatherDataService, WeatherService, monitored_station_ids
 import logging
 
 logger = logging.getLogger(__name__)
 
+FETCH_TASK = 'weather.tasks.fetch_station_task'
+INGEST_TASK = 'weather.tasks.ingest_observations_task'
+
+
+def ingest_queue(station_id):
+    """File d'enregistrement d'une station (stable d'un processus à l'autre, contrairement à hash())"""
+    shard = zlib.crc32(station_id.encode()) % settings.WEATHER_INGEST_SHARDS
+    return f'weather.ingest.{shard}'
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Routeur Celery (CELERY_TASK_ROUTES)"""
+    if name == INGEST_TASK:
+        station_id = kwargs['station_id'] if 'station_id' in kwargs else args[0]
+        return {'queue': ingest_queue(station_id)}
+    if name == FETCH_TASK:
+        return {'queue': settings.WEATHER_FETCH_QUEUE}
+    return None
+
+
+@shared_task
+def dispatch_fetch_task():
+    """Celery task: fan out one fetch task per monitored station"""
+    # Surveillance dans le processus web activée (WEATHER_MONITOR_AUTOSTART) et élue:
+    # c'est elle qui interroge l'API, le pipeline Celery ne double pas les appels
+    holder = active_holder(MONITOR_LEASE)
+    if holder:
+        logger.info(f"Récupérations non planifiées: surveillance en cours sur {holder}")
+        return 0
+    
+    station_ids = monitored_station_ids()
+    for station_id in station_ids:
+        # Une récupération non démarrée avant la suivante est inutile
+        fetch_station_task.apply_async(args=[station_id], expires=settings.WEATHER_FETCH_INTERVAL)
+    logger.info(f"{len(station_ids)} récupérations planifiées")
+    return len(station_ids)
+
+
 @shared_task
 def fetch_weather_task():
-    """Celery task to fetch weather data every 5 minutes"""
-    logger.info("Starting weather fetch task")
-    result = WeatherService.fetch_and_save_if_changed()
-    logger.info(f"Weather fetch task completed: {result['message']}")
-    return result
+    """Celery task kept for existing beat entries: same as dispatch_fetch_task"""
+    return dispatch_fetch_task()
+
+
+@shared_task(rate_limit=settings.WEATHER_FETCH_RATE_LIMIT, ignore_result=True)
+def fetch_station_task(station_id):
+    """Celery task: fetch one station and hand new observations to its ingest queue"""
+    try:
+        observations = WeatherService.fetch_new_observations(station_id)
+    except (requests.RequestException, ValueError) as e:
+        # Le client a déjà fait ses nouvelles tentatives: la station sera reprise au prochain passage
+        logger.error(f"{station_id}: {str(e)}")
+        return 0
+    
+    if observations:
+        ingest_observations_task.delay(station_id, observations)
+    return len(observations)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30, ignore_result=True)
+def ingest_observations_task(self, station_id, observations):
+    """Celery task: bulk-save the new observations of one station"""
+    count = WeatherDataService.save_observations_bulk({'observations': observations})
+    if count == 0:
+        # Rien d'enregistré: doublons d'une tâche concurrente, ou échec (journalisé
+        # par save_observations_bulk) si la dernière observation n'est toujours pas en base
+        epochs = [obs_data['epoch'] for obs_data in observations if 'epoch' in obs_data]
+        last_epoch = WeatherDataService.get_last_epoch(station_id)
+        if epochs and (last_epoch is None or last_epoch < max(epochs)):
+            raise self.retry()
+    
+    logger.info(f"{station_id}: {count} nouvelles observations enregistrées")
+    return count
+
+
+@shared_task
+def rollup_observations_task():
+    """Celery task to update hourly/daily/monthly rollups and apply retention"""
+    integrated = roll_up()
+    deleted = prune_expired()
+    logger.info(f"Rollup task completed: {integrated} observations integrated, pruned {deleted}")
+    return {'integrated': integrated, 'pruned': deleted}
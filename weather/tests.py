@@ -1,3 +1,2062 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf
+from urllib.parse import parse_qsl, urlsplit
+from zoneinfo import ZoneInfo
+import csv
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from asgiref.sync import sync_to_async
+import requests
+from django.apps import apps
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.auth.models import User
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from weatherapi import celery_app
+
+from . import async_views, conversions, export, urls as weather_urls
+from .admin import EstimatedCountPaginator, ObservationDayFilter
+from .backfill import run_backfill
+from .cache import StationCache, get_daily_response, set_daily_response, station_cache
+from .apps import is_server_process
+from .client import PWSClient, PWSError
+from .ingest import BatchWriter, validate_observations
+from .leader import MONITOR_LEASE, LeaderElector, active_holder, release, try_acquire
+from .models import (
+    StationMeteo, ObservationMeteo, DailySummary, ObservationRollup, BackfillJob, IngestionLease, IngestBatch
+)
+from .resample import raw_buckets, resample, rollup_buckets
+from .rollups import DAY, HOUR, MONTH, aggregate_series, prune_expired, roll_up
+from .scheduler import PollScheduler
+from .services import COMPARE_METRICS, PayloadFilter, WeatherDataService, WeatherMonitorThread, WeatherService
+from .station_stats import refresh_station_stats
+from .streaming import iter_json_observations, iter_ndjson
+from .summaries import SUMMARY_AGGREGATES, rebuild_daily_summaries
+from .tasks import (
+    FETCH_TASK, INGEST_TASK, dispatch_fetch_task, fetch_station_task, ingest_observations_task, ingest_queue
+)
+from .views import parse_resample_query
+
+# 2025-11-08 00:00:00 UTC
+BASE_EPOCH = 1762560000
+
+
+def make_observation(station_id='ITEST1', epoch=BASE_EPOCH, utc_offset=7200, **imperial):
+    """Observation au format de l'API PWS (units=e)"""
+    local_time = datetime.utcfromtimestamp(epoch + utc_offset)
+    return {
+        'stationID': station_id,
+        'tz': 'Africa/Bujumbura',
+        'obsTimeLocal': local_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'epoch': epoch,
+        'lat': -3.38,
+        'lon': 29.36,
+        'humidityHigh': 80,
+        'humidityLow': 60,
+        'humidityAvg': 70,
+        'qcStatus': 1,
+        'imperial': {
+            'tempHigh': 70.0,
+            'tempLow': 60.0,
+            'tempAvg': 65.0,
+            'windspeedAvg': 5.0,
+            'precipRate': 0.0,
+            'precipTotal': 0.0,
+            **imperial
+        },
+    }
+
+
+def make_observations(station_id='ITEST1', count=5, start=BASE_EPOCH, step=300, **imperial):
+    return [make_observation(station_id, start + index * step, **imperial) for index in range(count)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        request = {
+            'path': parts.path,
+            'params': dict(parse_qsl(parts.query)),
+            'headers': dict(self.headers),
+        }
+        self.server.requests.append(request)
+        status, headers, body, delay = self.server.respond(request)
+        if delay:
+            time.sleep(delay)
+        
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            # Client parti (délai de lecture dépassé)
+            pass
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstream(ThreadingHTTPServer):
+    """
+    API PWS simulée sur un port local.
+    
+    respond(request) -> (status, en-têtes, corps, délai en secondes) pour chaque
+    requête reçue; les requêtes sont conservées dans self.requests.
+    """
+    
+    def __init__(self, respond):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.respond = respond
+        self.requests = []
+    
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/v2/pws/observations/all/1day'
+    
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def scripted(*responses):
+    """respond() qui rejoue des réponses (status, en-têtes, corps, délai) puis répète la dernière"""
+    responses = list(responses)
+    
+    def respond(request):
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+    
+    return respond
+
+
+class WeatherTestCase(TestCase):
+    def setUp(self):
+        # Caches locaux au processus: vidés entre les tests
+        station_cache.invalidate()
+        cache.clear()
+    
+    def save(self, observations):
+        with self.captureOnCommitCallbacks(execute=True):
+            return WeatherDataService.save_observations_bulk({'observations': observations})
+
+
+class BulkIngestTests(WeatherTestCase):
+    def test_skips_existing_and_repeated_observations(self):
+        self.assertEqual(self.save(make_observations(count=3)), 3)
+        
+        observations = make_observations(count=5)
+        observations.append(make_observation(epoch=BASE_EPOCH + 4 * 300))
+        self.assertEqual(self.save(observations), 2)
+        self.assertEqual(ObservationMeteo.objects.count(), 5)
+    
+    def test_integrity_error_falls_back_row_by_row(self):
+        self.save(make_observations(count=2))
+        
+        # Doublons non détectés (écriture concurrente): bulk_create lève IntegrityError
+        observations = make_observations(count=3) + make_observations('INEW1', count=2)
+        with mock.patch.object(WeatherDataService, 'get_existing_epochs', return_value=set()):
+            saved = self.save(observations)
+        
+        self.assertEqual(saved, 3)
+        self.assertEqual(ObservationMeteo.objects.count(), 5)
+        # La station créée dans la transaction annulée n'est pas restée en cache
+        station = StationMeteo.objects.get(station_id='INEW1')
+        self.assertEqual(station_cache.get('INEW1').pk, station.pk)
+        self.assertEqual(ObservationMeteo.objects.filter(station=station).count(), 2)
+    
+    def test_invalid_value_drops_only_its_row(self):
+        observations = make_observations(count=4)
+        observations[1]['humidityAvg'] = 'abc'
+        observations[2]['qcStatus'] = '1'  # Converti comme par le modèle
+        
+        self.assertEqual(self.save(observations), 3)
+        self.assertEqual(
+            list(ObservationMeteo.objects.order_by('epoch').values_list('epoch', 'qc_status')),
+            [(BASE_EPOCH, 1), (BASE_EPOCH + 600, 1), (BASE_EPOCH + 900, 1)]
+        )
+    
+    def test_row_refused_by_the_database_falls_back_row_by_row(self):
+        observations = make_observations(count=4)
+        # Accepté par le modèle, refusé par la base (hors limites d'un entier 64 bits)
+        observations[3]['uvHigh'] = 10 ** 20
+        
+        self.assertEqual(self.save(observations), 3)
+        self.assertFalse(ObservationMeteo.objects.filter(epoch=BASE_EPOCH + 900).exists())
+        self.assertEqual(StationMeteo.objects.get(station_id='ITEST1').observation_count, 3)
+
+
+class ConversionTests(WeatherTestCase):
+    def test_batch_matches_scalar_conversion(self):
+        blocks = [
+            {'tempAvg': 61.25, 'windspeedAvg': 3.0, 'pressureMax': 29.92, 'precipTotal': None},
+            {'tempAvg': -40, 'windgustHigh': 12.5, 'precipRate': 0.05},
+            {},
+        ]
+        self.assertEqual(
+            conversions.convert_imperial_batch(blocks),
+            [conversions.convert_imperial(block) for block in blocks]
+        )
+    
+    def test_batch_rejects_non_numeric_values(self):
+        for value in ('abc', '61'):
+            with self.assertRaises(TypeError):
+                conversions.convert_imperial_batch([{'tempAvg': 60.0}, {'tempAvg': value}])
+    
+    def test_invalid_value_drops_only_its_observation(self):
+        observations = make_observations(count=5)
+        observations[2]['imperial']['tempAvg'] = 'abc'
+        # Refusée comme par la conversion scalaire
+        observations[3]['imperial']['tempAvg'] = '61'
+        
+        self.assertEqual(self.save(observations), 3)
+        self.assertEqual(
+            sorted(ObservationMeteo.objects.values_list('epoch', flat=True)),
+            [BASE_EPOCH, BASE_EPOCH + 300, BASE_EPOCH + 4 * 300]
+        )
+        self.assertEqual(ObservationMeteo.objects.get(epoch=BASE_EPOCH).temp_avg, 18.3)
+
+
+class PartsStream:
+    """Flux binaire qui rend ses morceaux un par un, quelle que soit la taille demandée"""
+    
+    def __init__(self, *parts):
+        # Un morceau vide signalerait la fin du flux
+        self.parts = [part for part in parts if part]
+    
+    def read(self, size=-1):
+        return self.parts.pop(0) if self.parts else b''
+
+
+class StreamingTests(WeatherTestCase):
+    # Caractères multi-octets (2, 3 et 4 octets), échappements et nombres longs
+    DOCUMENT = (
+        '{"meta": {"source": "Bujumbura – été", "tags": ["\\u00e9", "a\\"b\\\\"]}, "count": 1234567890,\n'
+        ' "observations": [\n'
+        '  {"stationID": "IÉTÉ1", "note": "日本 😀 \\ud83d\\ude00 \\n\\t", "epoch": 1762560000, "value": -12.5e-3},\n'
+        '  {"stationID": "ITEST2", "nested": {"list": [1, 2.25, null, true]}, "epoch": 1762560300}\n'
+        ' ], "after": [null, "fin"]}\n'
+    ).encode()
+    
+    def test_matches_json_loads_at_every_split_point(self):
+        expected = json.loads(self.DOCUMENT)['observations']
+        
+        self.assertEqual(list(iter_json_observations(io.BytesIO(self.DOCUMENT), chunk_size=1)), expected)
+        for split in range(len(self.DOCUMENT) + 1):
+            stream = PartsStream(self.DOCUMENT[:split], self.DOCUMENT[split:])
+            with self.subTest(split=split):
+                self.assertEqual(list(iter_json_observations(stream)), expected)
+    
+    def test_bare_array_and_missing_key(self):
+        array = json.dumps(make_observations(count=3)).encode()
+        self.assertEqual(list(iter_json_observations(io.BytesIO(array), chunk_size=7)), make_observations(count=3))
+        self.assertEqual(list(iter_json_observations(io.BytesIO(b' {"other": [1, 2]} '))), [])
+        self.assertEqual(list(iter_json_observations(io.BytesIO(b'{"observations": []}'))), [])
+    
+    def test_truncated_documents_are_rejected(self):
+        end = self.DOCUMENT.rstrip()
+        for length in range(len(end)):
+            with self.subTest(length=length), self.assertRaises(ValueError):
+                list(iter_json_observations(io.BytesIO(end[:length]), chunk_size=5))
+    
+    def test_malformed_documents_are_rejected(self):
+        documents = [
+            b'',
+            b'"observations"',
+            b'{"observations": [{"epoch": 1},, {"epoch": 2}]}',
+            b'{"observations": [{"epoch": 1} {"epoch": 2}]}',
+            b'{"observations": [1, 2]}',
+            b'{"observations": [{"epoch": 1}]} trailing',
+            b'[{"epoch": 1}]]',
+            b'{"count": 1 "observations": []}',
+            b'{"observations" [{"epoch": 1}]}',
+            b'{observations: []}',
+            b'{"observations": [{"epoch": 01}]}',
+            # UTF-8 invalide, y compris un caractère tronqué en fin de flux
+            b'{"observations": [{"note": "\xff"}]}',
+            '{"observations": [{"note": "é'.encode()[:-1],
+        ]
+        for document in documents:
+            with self.subTest(document=document), self.assertRaises(ValueError):
+                list(iter_json_observations(io.BytesIO(document), chunk_size=4))
+    
+    def test_observations_before_an_error_are_produced(self):
+        observations = iter_json_observations(io.BytesIO(b'{"observations": [{"epoch": 1}, {"epoch": 2} oops'))
+        self.assertEqual(next(observations), {'epoch': 1})
+        self.assertEqual(next(observations), {'epoch': 2})
+        with self.assertRaises(ValueError):
+            next(observations)
+    
+    def test_ndjson_framing(self):
+        stream = io.BytesIO(
+            b'{"epoch": 1, "note": "\xc3\xa9t\xc3\xa9"}\r\n'
+            b'\n'
+            b'   \t\n'
+            b'  {"epoch": 2, "text": "a\\nb"}  \n'
+            b'{"epoch": 3}'
+        )
+        self.assertEqual(
+            list(iter_ndjson(stream)),
+            [{'epoch': 1, 'note': 'été'}, {'epoch': 2, 'text': 'a\nb'}, {'epoch': 3}]
+        )
+        
+        for lines in (b'{"epoch": 1}\n[1, 2]\n', b'{"epoch": 1}\n{"epoch":\n2}\n', b'{"epoch": 1} {"epoch": 2}\n'):
+            with self.subTest(lines=lines), self.assertRaises(ValueError):
+                list(iter_ndjson(io.BytesIO(lines)))
+    
+    @override_settings(WEATHER_INGEST_BATCH_SIZE=2)
+    def test_receive_keeps_batches_read_before_an_error(self):
+        url = reverse('weather:receive_data')
+        lines = b''.join(json.dumps(obs).encode() + b'\n' for obs in make_observations(count=3))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, lines, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['saved'], 3)
+        
+        body = json.dumps({'observations': make_observations(count=5)}).encode()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, body[:-40], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        # Lots complets enregistrés avant l'erreur, cinquième observation tronquée
+        self.assertEqual((response.json()['saved'], response.json()['skipped']), (1, 3))
+        self.assertEqual(ObservationMeteo.objects.count(), 4)
+
+
+class PWSClientTests(TestCase):
+    def make_client(self, **kwargs):
+        self.delays = []
+        options = {
+            'api_key': 'test',
+            'connect_timeout': 1,
+            'read_timeout': 1,
+            'max_retries': 2,
+            'backoff_base': 0.5,
+            'sleep': self.delays.append,
+        }
+        options.update(kwargs)
+        client = PWSClient(**options)
+        self.addCleanup(client.close)
+        return client
+    
+    def test_retries_transient_errors_with_retry_after(self):
+        payload = {'observations': [make_observation()]}
+        respond = scripted(
+            (503, {'Retry-After': '7'}, b'', 0),
+            (429, {}, b'', 0),
+            (200, {}, payload, 0),
+        )
+        with StubUpstream(respond) as upstream:
+            response = self.make_client().fetch_observations('ITEST1', url=upstream.url)
+        
+        self.assertEqual(response.json(), payload)
+        self.assertEqual(len(upstream.requests), 3)
+        self.assertEqual(upstream.requests[0]['params']['stationId'], 'ITEST1')
+        # Retry-After respecté, puis backoff avec jitter (au plus backoff_base * 2)
+        self.assertEqual(self.delays[0], 7)
+        self.assertLessEqual(self.delays[1], 1.0)
+    
+    def test_gives_up_when_retry_after_is_too_long(self):
+        with StubUpstream(scripted((429, {'Retry-After': '3600'}, b'', 0))) as upstream:
+            with self.assertRaises(PWSError):
+                self.make_client(max_retry_after=60).fetch_observations('ITEST1', url=upstream.url)
+        
+        self.assertEqual(len(upstream.requests), 1)
+        self.assertEqual(self.delays, [])
+    
+    def test_read_timeout_is_retried_then_raised(self):
+        with StubUpstream(scripted((200, {}, {'observations': []}, 0.5))) as upstream:
+            with self.assertRaises(PWSError) as raised:
+                self.make_client(read_timeout=0.1).fetch_observations('ITEST1', url=upstream.url)
+        
+        self.assertIsInstance(raised.exception.__cause__, requests.Timeout)
+        self.assertEqual(len(upstream.requests), 3)
+        self.assertEqual(len(self.delays), 2)
+    
+    def test_client_errors_are_not_retried(self):
+        with StubUpstream(scripted((404, {}, b'', 0))) as upstream:
+            with self.assertRaises(requests.HTTPError):
+                self.make_client().fetch_observations('ITEST1', url=upstream.url)
+        
+        self.assertEqual(len(upstream.requests), 1)
+    
+    def test_conditional_requests(self):
+        payload = {'observations': [make_observation()]}
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Sat, 08 Nov 2025 00:05:00 GMT'}
+        
+        def respond(request):
+            if request['headers'].get('If-None-Match') == '"v1"':
+                return 304, validators, b'', 0
+            return 200, validators, payload, 0
+        
+        client = self.make_client()
+        with StubUpstream(respond) as upstream:
+            first = client.fetch_observations('ITEST1', url=upstream.url)
+            second = client.fetch_observations('ITEST1', url=upstream.url)
+            client.forget_validators('ITEST1', url=upstream.url)
+            third = client.fetch_observations('ITEST1', url=upstream.url)
+        
+        self.assertEqual([first.status_code, second.status_code, third.status_code], [200, 304, 200])
+        self.assertNotIn('If-None-Match', upstream.requests[0]['headers'])
+        self.assertEqual(upstream.requests[1]['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(upstream.requests[1]['headers']['If-Modified-Since'], validators['Last-Modified'])
+        self.assertNotIn('If-None-Match', upstream.requests[2]['headers'])
+
+
+class DailySummaryTests(WeatherTestCase):
+    def summaries(self):
+        fields = ['station_id', 'date', 'observation_count', *SUMMARY_AGGREGATES]
+        return list(DailySummary.objects.order_by('station_id', 'date').values(*fields))
+    
+    def test_incremental_updates_match_rebuild(self):
+        # Deux jours locaux (minuit local à BASE_EPOCH - 2 h), plusieurs enregistrements
+        self.save(make_observations(count=6, start=BASE_EPOCH - 3 * 3600, step=1800, tempAvg=50.0))
+        self.save(make_observations(count=4, start=BASE_EPOCH, step=600, tempAvg=80.0, precipTotal=0.2))
+        self.save(make_observations('ITEST2', count=3))
+        with self.captureOnCommitCallbacks(execute=True):
+            WeatherDataService.save_observation(make_observation(epoch=BASE_EPOCH + 3600, tempHigh=99.0))
+        
+        incremental = self.summaries()
+        self.assertEqual(len(incremental), 3)
+        
+        rebuild_daily_summaries()
+        self.assertEqual(self.summaries(), incremental)
+        
+        summary = DailySummary.objects.get(station__station_id='ITEST1', date='2025-11-08')
+        self.assertEqual(summary.observation_count, 9)
+        self.assertEqual(summary.temp_max, 37.2)
+        self.assertEqual(summary.precip_total, 5.1)
+    
+    def test_migration_fills_summaries_of_existing_observations(self):
+        self.save(make_observations(count=4))
+        incremental = self.summaries()
+        DailySummary.objects.all().delete()
+        
+        migration = importlib.import_module('weather.migrations.0012_fill_daily_summaries')
+        migration.fill_daily_summaries(apps, None)
+        self.assertEqual(self.summaries(), incremental)
+
+
+class RollupPrecipTests(WeatherTestCase):
+    # Cumuls journaliers (pouces) relevés à minuit, 1 h, 2 h et 3 h locales de deux jours
+    CUMULATIVE = {
+        0: (0.0, 0.1, 0.1, 0.3),  # 0, 2.5, 2.5, 7.6 mm
+        1: (0.2, 0.5),  # 5.1, 12.7 mm
+    }
+    
+    def setUp(self):
+        super().setUp()
+        # Minuit local (UTC+2) le 2025-11-08
+        midnight = BASE_EPOCH - 7200
+        for day, totals in self.CUMULATIVE.items():
+            self.save([
+                make_observation(epoch=midnight + day * 86400 + hour * 3600, precipTotal=total)
+                for hour, total in enumerate(totals)
+            ])
+        self.station = StationMeteo.objects.get(station_id='ITEST1')
+    
+    def series(self, resolution, start, end):
+        return {
+            row['bucket_start'].replace(tzinfo=None): row['precip_total']
+            for row in aggregate_series(self.station, start, end, resolution)
+        }
+    
+    def check_series(self):
+        month = self.series(MONTH, datetime(2025, 11, 1), datetime(2025, 12, 1))
+        self.assertAlmostEqual(month[datetime(2025, 11, 1)], 20.3)
+        
+        days = self.series(DAY, datetime(2025, 11, 8), datetime(2025, 11, 10))
+        self.assertEqual(days, {datetime(2025, 11, 8): 7.6, datetime(2025, 11, 9): 12.7})
+        
+        # Pluie de chaque heure, y compris pour une série qui commence après minuit
+        hours = self.series(HOUR, datetime(2025, 11, 8, 1), datetime(2025, 11, 9, 2))
+        self.assertEqual(hours, {
+            datetime(2025, 11, 8, 1): 2.5,
+            datetime(2025, 11, 8, 2): 0.0,
+            datetime(2025, 11, 8, 3): 5.1,
+            datetime(2025, 11, 9, 0): 5.1,
+            datetime(2025, 11, 9, 1): 7.6,
+        })
+    
+    def test_series_from_raw_observations(self):
+        self.check_series()
+    
+    def test_series_from_rollups(self):
+        roll_up(lag=timedelta(0))
+        month = ObservationRollup.objects.get(resolution=MONTH)
+        self.assertAlmostEqual(month.precip_total, 20.3)
+        self.check_series()
+    
+    def test_month_total_follows_day_totals(self):
+        roll_up(lag=timedelta(0))
+        # Nouveau cumul du deuxième jour: 15.2 mm
+        self.save([make_observation(epoch=BASE_EPOCH - 7200 + 86400 + 2 * 3600, precipTotal=0.6)])
+        
+        month = self.series(MONTH, datetime(2025, 11, 1), datetime(2025, 12, 1))
+        self.assertAlmostEqual(month[datetime(2025, 11, 1)], 22.8)
+        
+        roll_up(lag=timedelta(0))
+        self.assertAlmostEqual(ObservationRollup.objects.get(resolution=MONTH).precip_total, 22.8)
+        self.assertEqual(ObservationRollup.objects.get(resolution=DAY, bucket_start__day=9).precip_total, 15.2)
+
+
+class StationStatsTests(WeatherTestCase):
+    def stats(self):
+        return list(StationMeteo.objects.order_by('station_id').values_list(
+            'station_id', 'observation_count', 'first_obs_utc', 'last_obs_utc', 'last_obs__epoch'
+        ))
+    
+    def test_incremental_stats_match_refresh(self):
+        self.save(make_observations(count=3, start=BASE_EPOCH + 3600))
+        # Observations plus anciennes, puis plus récentes, et des doublons
+        self.save(make_observations(count=4, start=BASE_EPOCH - 600) + make_observations('ITEST2', count=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            WeatherDataService.save_observation(make_observation(epoch=BASE_EPOCH + 7200))
+            WeatherDataService.save_observation(make_observation(epoch=BASE_EPOCH + 7200))
+        
+        station = StationMeteo.objects.select_related('last_obs').get(station_id='ITEST1')
+        self.assertEqual(station.observation_count, 8)
+        self.assertEqual(station.first_obs_utc.timestamp(), BASE_EPOCH - 600)
+        self.assertEqual(station.last_obs_utc.timestamp(), BASE_EPOCH + 7200)
+        self.assertEqual(station.last_obs.epoch, BASE_EPOCH + 7200)
+        
+        incremental = self.stats()
+        refresh_station_stats()
+        self.assertEqual(self.stats(), incremental)
+    
+    def test_older_observations_keep_last_observation(self):
+        self.save(make_observations(count=2, start=BASE_EPOCH))
+        self.save(make_observations(count=2, start=BASE_EPOCH - 3600))
+        
+        station = StationMeteo.objects.get(station_id='ITEST1')
+        self.assertEqual(station.observation_count, 4)
+        self.assertEqual(station.last_obs.epoch, BASE_EPOCH + 300)
+        self.assertEqual(station.first_obs_utc.timestamp(), BASE_EPOCH - 3600)
+    
+    def test_migration_fills_stats_of_existing_stations(self):
+        self.save(make_observations(count=3) + make_observations('ITEST2', count=2))
+        StationMeteo.objects.create(station_id='IEMPTY', latitude=0, longitude=0, timezone='UTC')
+        incremental = self.stats()
+        # Stations antérieures à 0007: champs ajoutés à leurs valeurs par défaut
+        StationMeteo.objects.update(observation_count=0, first_obs_utc=None, last_obs_utc=None, last_obs=None)
+        
+        migration = importlib.import_module('weather.migrations.0015_fill_station_stats')
+        migration.fill_station_stats(apps, None)
+        self.assertEqual(self.stats(), incremental)
+        self.assertEqual(self.stats()[1][1], 3)
+    
+    @override_settings(WEATHER_RETENTION={'raw': 30, 'hour': None, 'day': None, 'month': None})
+    def test_prune_adjusts_only_the_purged_stations(self):
+        old = BASE_EPOCH - 60 * 86400
+        self.save(make_observations(count=3, start=old) + make_observations(count=2))
+        self.save(make_observations('ITEST2', count=2, start=old))
+        self.save(make_observations('ITEST3', count=2))
+        self.save(make_observations('ITEST4', count=2, start=old))
+        roll_up(lag=timedelta(0))
+        # Observation ancienne pas encore intégrée aux agrégats: conservée, devient la dernière
+        self.save([make_observation('ITEST4', epoch=old - 86400)])
+        # Statistiques faussées d'une station non purgée: pas de recalcul global
+        StationMeteo.objects.filter(station_id='ITEST3').update(observation_count=99)
+        
+        now = datetime.fromtimestamp(BASE_EPOCH, dt_timezone.utc)
+        with self.assertNumQueries(1 + 2 * 4 + 1 + 3 * 3 + 2):
+            deleted = prune_expired(now=now, batch_size=4)
+        self.assertEqual(deleted['raw'], 7)
+        
+        purged = self.stats()
+        self.assertEqual(purged[2][1], 99)
+        self.assertEqual(purged[1][1:], (0, None, None, None))
+        self.assertEqual(purged[3][1], 1)
+        self.assertEqual(purged[3][4], old - 86400)
+        refresh_station_stats()
+        self.assertEqual([row for row in self.stats() if row[0] != 'ITEST3'], [row for row in purged if row[0] != 'ITEST3'])
+
+
+class StationCacheTests(WeatherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stations = {
+            station_id: StationMeteo.objects.create(station_id=station_id, latitude=-3.38, longitude=29.36, timezone='UTC')
+            for station_id in ('IA', 'IB', 'IC')
+        }
+        clock = mock.patch('weather.cache.time')
+        self.clock = clock.start().monotonic
+        self.clock.return_value = 1000.0
+        self.addCleanup(clock.stop)
+    
+    def test_least_recently_used_station_is_evicted(self):
+        stations = StationCache(max_size=2)
+        stations.set(self.stations['IA'])
+        stations.set(self.stations['IB'])
+        # Lecture: IA devient la plus récente, IB est évincée
+        self.assertIs(stations.get('IA'), self.stations['IA'])
+        stations.set(self.stations['IC'])
+        
+        self.assertIsNone(stations.get('IB'))
+        self.assertIs(stations.get('IA'), self.stations['IA'])
+        self.assertIs(stations.get('IC'), self.stations['IC'])
+        
+        # Rafraîchir une entrée présente ne l'évince pas
+        stations.set(self.stations['IA'])
+        stations.set(self.stations['IB'])
+        self.assertEqual(list(stations._entries), ['IA', 'IB'])
+    
+    def test_entries_expire_after_the_ttl(self):
+        stations = StationCache(ttl_seconds=60)
+        stations.set(self.stations['IA'])
+        
+        self.clock.return_value = 1059.0
+        self.assertIs(stations.get('IA'), self.stations['IA'])
+        self.clock.return_value = 1060.0
+        self.assertIsNone(stations.get('IA'))
+        
+        # Relue depuis la base, avec un nouveau délai
+        with self.assertNumQueries(1):
+            self.assertEqual(stations.get_station('IA').pk, self.stations['IA'].pk)
+        with self.assertNumQueries(0):
+            stations.get_station('IA')
+        with self.assertRaises(StationMeteo.DoesNotExist):
+            stations.get_station('IUNKNOWN')
+    
+    def test_signals_invalidate_the_shared_cache(self):
+        station = station_cache.get_station('IA')
+        
+        # QuerySet.update() n'envoie pas de signal: l'entrée reste jusqu'au TTL
+        StationMeteo.objects.filter(pk=station.pk).update(nom='Sans signal')
+        self.assertIs(station_cache.get('IA'), station)
+        
+        # save(): la station est relue
+        station.nom = 'Bujumbura'
+        station.save()
+        self.assertIsNone(station_cache.get('IA'))
+        self.assertEqual(station_cache.get_station('IA').nom, 'Bujumbura')
+        
+        # Changement de station_id: l'ancienne clé disparaît aussi
+        renamed = StationMeteo.objects.get(pk=station.pk)
+        renamed.station_id = 'IA2'
+        renamed.save()
+        self.assertIsNone(station_cache.get('IA'))
+        
+        station_cache.get_station('IB').delete()
+        self.assertIsNone(station_cache.get('IB'))
+        with self.assertRaises(StationMeteo.DoesNotExist):
+            station_cache.get_station('IB')
+    
+    async def test_aget_many_skips_unknown_stations(self):
+        stations = StationCache()
+        cached = await stations.aget_station('IA')
+        
+        found = await stations.aget_many(['IA', 'IUNKNOWN', 'IB', 'IA'])
+        self.assertEqual(sorted(found), ['IA', 'IB'])
+        self.assertIs(found['IA'], cached)
+        self.assertIsNone(stations.get('IUNKNOWN'))
+        
+        # Stations connues servies depuis le cache
+        again = await stations.aget_many(['IB', 'IUNKNOWN'])
+        self.assertEqual(list(again), ['IB'])
+        self.assertIs(again['IB'], found['IB'])
+        self.assertEqual(await stations.aget_many(['IUNKNOWN']), {})
+        self.assertEqual(await stations.aget_many([]), {})
+
+
+class DailyResponseTests(WeatherTestCase):
+    def get(self, day='2025-11-08', **headers):
+        response = self.client.get(
+            reverse('weather:daily_observations', args=['ITEST1']),
+            {'date': day},
+            **headers
+        )
+        response.body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response
+    
+    def test_etag_and_not_modified(self):
+        self.save(make_observations(count=3))
+        
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.body)['statistics']['observation_count'], 3)
+        etag = first['ETag']
+        
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        
+        # Observation reçue pour ce jour: nouvel ETag
+        self.save([make_observation(epoch=BASE_EPOCH + 3600)])
+        changed = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(len(json.loads(changed.body)['observations']), 4)
+    
+    def test_immutable_only_once_summary_is_settled(self):
+        self.save(make_observations(count=3))
+        
+        # Jour passé sans données, ou modifié récemment: revalidé à chaque requête
+        self.assertEqual(self.get('2025-11-07')['Cache-Control'], 'no-cache')
+        self.assertEqual(self.get()['Cache-Control'], 'no-cache')
+        
+        DailySummary.objects.update(updated_at=timezone.now() - timedelta(days=3))
+        cache.clear()
+        self.assertIn('immutable', self.get()['Cache-Control'])
+    
+    def baseline_body(self, day):
+        """Corps de la réponse construit comme avant le flux: instances, dicts imbriqués, json.dumps"""
+        station = StationMeteo.objects.get(station_id='ITEST1')
+        summary = DailySummary.objects.filter(station=station, date=day).first() or DailySummary(station=station, date=day)
+        observations = ObservationMeteo.objects.filter(station=station, obs_time_local__date=day).order_by('obs_time_local')
+        return json.dumps({
+            'station_id': station.station_id,
+            'date': day.isoformat(),
+            'statistics': {
+                'temperature_avg': round(summary.temp_avg, 1) if summary.temp_avg else None,
+                'temperature_max': summary.temp_max,
+                'temperature_min': summary.temp_min,
+                'humidity_avg': round(summary.humidity_avg, 1) if summary.humidity_avg else None,
+                'precipitation_total': summary.precip_total,
+                'wind_speed_max': summary.wind_max,
+                'observation_count': summary.observation_count
+            },
+            'observations': [
+                {
+                    'time_utc': obs.obs_time_utc.isoformat(),
+                    'time_local': obs.obs_time_local.strftime('%Y-%m-%d %H:%M:%S'),
+                    'temperature': {'high': obs.temp_high, 'low': obs.temp_low, 'avg': obs.temp_avg},
+                    'humidity': {'high': obs.humidity_high, 'low': obs.humidity_low, 'avg': obs.humidity_avg},
+                    'wind': {
+                        'direction': obs.winddir_avg,
+                        'speed_high': obs.windspeed_high,
+                        'speed_avg': obs.windspeed_avg,
+                        'gust_high': obs.windgust_high
+                    },
+                    'pressure': {'max': obs.pressure_max, 'min': obs.pressure_min, 'trend': obs.pressure_trend},
+                    'precipitation': {'rate': obs.precip_rate, 'total': obs.precip_total},
+                    'solar_radiation': obs.solar_radiation_high,
+                    'uv_index': obs.uv_high
+                }
+                for obs in observations
+            ]
+        }, cls=DjangoJSONEncoder).encode()
+    
+    def test_streamed_body_matches_baseline_serialization(self):
+        observations = make_observations(count=6, tempAvg=61.37, pressureMax=29.92, windgustHigh=None)
+        observations[1]['imperial'].update(tempAvg=None, tempHigh=None, precipTotal=None)
+        observations[2].update(humidityAvg=None, winddirAvg=275, uvHigh=3, solarRadiationHigh=412.5)
+        observations[3]['humidityAvg'] = 67
+        # Bornes du jour local: minuit et 23:59 locales (UTC+2)
+        observations.append(make_observation(epoch=BASE_EPOCH - 7200))
+        observations.append(make_observation(epoch=BASE_EPOCH + 22 * 3600 - 1, tempAvg=-3.5))
+        self.save(observations)
+        
+        # Morceaux courts: le corps est produit en plusieurs fois
+        with mock.patch('weather.serializers.OUTPUT_CHUNK_SIZE', 256):
+            response = self.client.get(reverse('weather:daily_observations', args=['ITEST1']), {'date': '2025-11-08'})
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)
+        
+        body = b''.join(chunks)
+        self.assertEqual(body, self.baseline_body(date(2025, 11, 8)))
+        data = json.loads(body)
+        self.assertEqual(data['statistics']['observation_count'], 8)
+        self.assertIsNotNone(data['statistics']['temperature_avg'])
+        self.assertIsNone(data['observations'][2]['temperature']['avg'])
+        self.assertIsNone(data['observations'][3]['humidity']['avg'])
+        
+        # Réponse suivante servie depuis le cache: même corps
+        self.assertEqual(self.get().body, body)
+        
+        # Jour sans données: statistiques nulles, tableau vide
+        self.assertEqual(self.get('2025-11-07').body, self.baseline_body(date(2025, 11, 7)))
+        self.assertIsNone(json.loads(self.get('2025-11-07').body)['statistics']['temperature_avg'])
+
+
+class DailyResponseCacheTests(WeatherTestCase):
+    def cache_response(self, day):
+        station = StationMeteo.objects.get(station_id='ITEST1')
+        _, version = get_daily_response(station.pk, day)
+        set_daily_response(station.pk, day, version, {'body': b'{}', 'etag': '"x"', 'last_modified': None})
+        return get_daily_response(station.pk, day)[0]
+    
+    def test_process_local_cache_skips_recent_days(self):
+        self.save(make_observations(count=1))
+        today = timezone.now().date()
+        
+        self.assertIsNone(self.cache_response(today))
+        self.assertIsNotNone(self.cache_response(today - timedelta(days=10)))
+    
+    def test_shared_cache_is_invalidated_by_ingest(self):
+        today = timezone.now().date()
+        with mock.patch('weather.cache.is_shared_cache', return_value=True):
+            self.save(make_observations(count=1))
+            self.assertIsNotNone(self.cache_response(today))
+            
+            epoch = int(timezone.now().timestamp())
+            self.save([make_observation(epoch=epoch, utc_offset=0)])
+            station = StationMeteo.objects.get(station_id='ITEST1')
+            self.assertIsNone(get_daily_response(station.pk, today)[0])
+
+
+class ObservationPaginationTests(WeatherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.save(make_observations(count=7))
+        self.save(make_observations('ITEST2', count=1))
+    
+    def get(self, station_id='ITEST1', **params):
+        return self.client.get(reverse('weather:list_observations', args=[station_id]), params)
+    
+    def test_cursor_walks_the_range(self):
+        params = {'start': BASE_EPOCH + 300, 'end': BASE_EPOCH + 6 * 300, 'limit': 2, 'fields': 'time_utc,temperature'}
+        pages = []
+        response = self.get(**params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            pages.append(page)
+            if page['next'] is None:
+                break
+            response = self.get(cursor=page['next'])
+        
+        self.assertEqual([page['count'] for page in pages], [2, 2, 1])
+        times = [observation['time_utc'] for page in pages for observation in page['observations']]
+        self.assertEqual(times, [
+            datetime.fromtimestamp(BASE_EPOCH + index * 300, dt_timezone.utc).isoformat()
+            for index in range(1, 6)
+        ])
+        # Le curseur conserve la projection demandée
+        self.assertEqual(set(pages[-1]['observations'][0]), {'time_utc', 'temperature'})
+    
+    def test_rejects_tampered_or_foreign_cursors(self):
+        cursor = self.get(limit=2).json()['next']
+        
+        self.assertEqual(self.get(cursor=cursor[:-2] + 'xx').status_code, 400)
+        self.assertEqual(self.get('ITEST2', cursor=cursor).status_code, 400)
+        self.assertEqual(self.get(limit=0).status_code, 400)
+        self.assertEqual(self.get(fields='unknown').status_code, 400)
+
+
+class BackfillTests(WeatherTestCase):
+    START = date(2025, 11, 8)
+    END = date(2025, 11, 10)
+    
+    def day_observations(self, station_id, day):
+        """4 observations par jour local (2025-11-08 -> BASE_EPOCH)"""
+        start = BASE_EPOCH + (day - self.START).days * 86400
+        return make_observations(station_id, count=4, start=start, step=3600)
+    
+    def history(self, broken=None, edits=None):
+        """
+        respond() de l'endpoint d'historique; broken: {AAAAMMJJ: (status, corps)},
+        edits: {AAAAMMJJ: {index: champs modifiés de l'observation}}
+        """
+        broken = broken or {}
+        edits = edits or {}
+        
+        def respond(request):
+            day = request['params']['date']
+            if day in broken:
+                status, body = broken[day]
+                return status, {}, body, 0
+            observations = self.day_observations(
+                request['params']['stationId'],
+                datetime.strptime(day, '%Y%m%d').date()
+            )
+            for index, changes in edits.get(day, {}).items():
+                observations[index].update(changes)
+            return 200, {}, {'observations': observations}, 0
+        
+        return respond
+    
+    def backfill(self, upstream, stations=('ITEST1',)):
+        return run_backfill(list(stations), self.START, self.END, workers=2, rate=1000,
+                            api_url=upstream.url, api_key='test')
+    
+    def statuses(self):
+        return dict(BackfillJob.objects.values_list('date', 'status'))
+    
+    def test_failed_days_are_resumed(self):
+        with StubUpstream(self.history({'20251109': (404, b'')})) as upstream:
+            stats = self.backfill(upstream)
+        
+        self.assertEqual((stats['jobs'], stats['done'], stats['failed'], stats['saved']), (3, 2, 1, 8))
+        self.assertEqual(self.statuses()[date(2025, 11, 9)], BackfillJob.STATUS_FAILED)
+        self.assertIn('404', BackfillJob.objects.get(date=date(2025, 11, 9)).error)
+        
+        # Nouvelle exécution: seul le jour en échec est redemandé
+        with StubUpstream(self.history()) as upstream:
+            stats = self.backfill(upstream)
+        
+        self.assertEqual([request['params']['date'] for request in upstream.requests], ['20251109'])
+        self.assertEqual((stats['jobs'], stats['done'], stats['saved']), (1, 1, 4))
+        self.assertEqual(set(self.statuses().values()), {BackfillJob.STATUS_DONE})
+        job = BackfillJob.objects.get(date=date(2025, 11, 9))
+        self.assertEqual((job.attempts, job.fetched_count, job.saved_count, job.error), (2, 4, 4, ''))
+        self.assertEqual(ObservationMeteo.objects.count(), 12)
+    
+    def test_unexpected_response_fails_only_its_day(self):
+        with StubUpstream(self.history({'20251110': (200, [])})) as upstream:
+            stats = self.backfill(upstream)
+        
+        self.assertEqual((stats['done'], stats['failed']), (2, 1))
+        job = BackfillJob.objects.get(date=date(2025, 11, 10))
+        self.assertEqual(job.status, BackfillJob.STATUS_FAILED)
+        self.assertTrue(job.error.startswith('AttributeError'))
+    
+    def test_saved_counts_exclude_existing_observations(self):
+        self.save(self.day_observations('ITEST1', self.START)[:3])
+        
+        with StubUpstream(self.history()) as upstream:
+            stats = self.backfill(upstream)
+        
+        self.assertEqual((stats['done'], stats['fetched'], stats['saved']), (3, 12, 9))
+        job = BackfillJob.objects.get(date=self.START)
+        self.assertEqual((job.status, job.fetched_count, job.saved_count), (BackfillJob.STATUS_DONE, 4, 1))
+    
+    def test_invalid_rows_do_not_fail_their_neighbours(self):
+        edits = {
+            '20251109': {1: {'obsTimeLocal': None}},
+            # Valide pour le modèle, refusée par la base (hors limites d'un entier 64 bits)
+            '20251110': {2: {'uvHigh': 10 ** 20}},
+        }
+        with StubUpstream(self.history(edits=edits)) as upstream:
+            stats = self.backfill(upstream)
+        
+        self.assertEqual((stats['done'], stats['failed'], stats['fetched'], stats['saved']), (3, 0, 12, 10))
+        jobs = {job.date: job for job in BackfillJob.objects.all()}
+        self.assertEqual([jobs[day].saved_count for day in sorted(jobs)], [4, 3, 3])
+        self.assertEqual(jobs[self.START].error, '')
+        self.assertTrue(jobs[date(2025, 11, 9)].error.startswith('1 observation(s) ignorée(s)'))
+        self.assertIn('obsTimeLocal', jobs[date(2025, 11, 9)].error)
+        self.assertIn(f'epoch {BASE_EPOCH + 2 * 86400 + 2 * 3600} refusé', jobs[date(2025, 11, 10)].error)
+        
+        # Jours terminés: rien à refaire
+        with StubUpstream(self.history()) as upstream:
+            self.assertEqual(self.backfill(upstream)['jobs'], 0)
+        self.assertEqual(upstream.requests, [])
+    
+    def test_failed_write_leaves_days_to_redo(self):
+        with StubUpstream(self.history()) as upstream:
+            with mock.patch.object(WeatherDataService, 'save_observations_bulk', return_value=0):
+                stats = self.backfill(upstream)
+        
+        self.assertEqual((stats['done'], stats['failed'], stats['saved']), (0, 3, 0))
+        self.assertEqual(set(self.statuses().values()), {BackfillJob.STATUS_FAILED})
+        
+        with StubUpstream(self.history()) as upstream:
+            stats = self.backfill(upstream)
+        self.assertEqual((stats['jobs'], stats['done'], stats['saved']), (3, 3, 12))
+
+
+class TaskShardingTests(WeatherTestCase):
+    def route(self, name, *args, **kwargs):
+        return celery_app.amqp.router.route({}, name, args=args, kwargs=kwargs)['queue'].name
+    
+    def test_station_is_always_routed_to_the_same_ingest_queue(self):
+        station_ids = [f'ISTA{index}' for index in range(20)]
+        queues = {station_id: self.route(INGEST_TASK, station_id, []) for station_id in station_ids}
+        
+        for station_id, queue in queues.items():
+            # crc32: même file quel que soit le processus (hash() varie avec PYTHONHASHSEED)
+            self.assertEqual(queue, f'weather.ingest.{zlib.crc32(station_id.encode()) % 4}')
+            self.assertEqual(queue, ingest_queue(station_id))
+            self.assertEqual(self.route(INGEST_TASK, station_id=station_id, observations=[]), queue)
+        self.assertGreater(len(set(queues.values())), 1)
+        self.assertEqual(self.route(FETCH_TASK, 'ISTA0'), 'weather.fetch')
+    
+    def test_fetch_forwards_only_new_observations(self):
+        observations = make_observations(count=5)
+        self.save(observations[:3])
+        client = PWSClient(api_key='test', max_retries=0)
+        self.addCleanup(client.close)
+        
+        with StubUpstream(scripted((200, {}, {'observations': observations}, 0))) as upstream, \
+                override_settings(WEATHER_API_URL=upstream.url), \
+                mock.patch('weather.services.get_client', return_value=client), \
+                mock.patch.object(ingest_observations_task, 'delay') as delay:
+            self.assertEqual(fetch_station_task('ITEST1'), 2)
+        
+        delay.assert_called_once_with('ITEST1', observations[3:])
+    
+    def test_ingest_retries_only_while_observations_are_missing(self):
+        observations = make_observations(count=3)
+        self.save(observations)
+        
+        # Doublons d'une tâche concurrente: rien à refaire
+        result = ingest_observations_task.apply(args=['ITEST1', observations])
+        self.assertTrue(result.successful())
+        self.assertEqual(result.result, 0)
+        
+        # Échec d'enregistrement (dernière observation absente): nouvelles tentatives
+        newer = make_observations(count=2, start=BASE_EPOCH + 3 * 300)
+        with mock.patch.object(WeatherDataService, 'save_observations_bulk', return_value=0) as save:
+            result = ingest_observations_task.apply(args=['ITEST1', newer])
+        
+        self.assertTrue(result.failed())
+        self.assertEqual(save.call_count, 4)
+
+
+class LeaseTests(WeatherTestCase):
+    def test_expired_lease_is_taken_over(self):
+        self.assertTrue(try_acquire('test', 'A', 60))
+        acquired_at = IngestionLease.objects.get(name='test').acquired_at
+        self.assertFalse(try_acquire('test', 'B', 60))
+        self.assertTrue(try_acquire('test', 'A', 60))
+        self.assertEqual(IngestionLease.objects.get(name='test').acquired_at, acquired_at)
+        
+        # A ne renouvelle plus: B reprend le bail à l'expiration
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch('weather.leader.timezone.now', return_value=later):
+            self.assertTrue(try_acquire('test', 'B', 60))
+            self.assertFalse(try_acquire('test', 'A', 60))
+            self.assertEqual(active_holder('test'), 'B')
+        self.assertEqual(IngestionLease.objects.get(name='test').acquired_at, later)
+    
+    def test_released_lease_is_taken_over_immediately(self):
+        try_acquire('test', 'A', 60)
+        release('test', 'B')
+        self.assertEqual(active_holder('test'), 'A')
+        release('test', 'A')
+        self.assertIsNone(active_holder('test'))
+        self.assertTrue(try_acquire('test', 'B', 60))
+    
+    @override_settings(WEATHER_STATION_IDS=['ITEST1', 'ITEST2'])
+    def test_dispatch_skips_while_the_monitor_holds_the_lease(self):
+        with mock.patch.object(fetch_station_task, 'apply_async') as apply_async:
+            try_acquire(MONITOR_LEASE, 'web:1', 60)
+            self.assertEqual(dispatch_fetch_task(), 0)
+            apply_async.assert_not_called()
+            
+            release(MONITOR_LEASE, 'web:1')
+            self.assertEqual(dispatch_fetch_task(), 2)
+        self.assertEqual(apply_async.call_count, 2)
+    
+    def test_start_monitoring_joins_the_election(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        with mock.patch('weather.views.start_monitor_election') as start, \
+                mock.patch('weather.views.stop_monitor_election') as stop:
+            response = self.client.post(
+                reverse('weather:start_monitoring'),
+                json.dumps({'api_url': 'http://example.invalid', 'api_key': 'stolen', 'interval_seconds': 120}),
+                content_type='application/json'
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        stop.assert_called_once_with()
+        # URL et clé de la configuration, jamais celles du corps
+        self.assertEqual(start.call_args.kwargs, {
+            'api_url': settings.WEATHER_API_URL,
+            'api_key': settings.WEATHER_API_KEY,
+            'interval_seconds': 120,
+            'station_id': None,
+        })
+    
+    def test_monitoring_control_requires_staff_and_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        with mock.patch('weather.views.start_monitor_election') as start, \
+                mock.patch('weather.views.stop_monitor_election') as stop:
+            for name in ('weather:start_monitoring', 'weather:stop_monitoring'):
+                self.assertEqual(self.client.post(reverse(name)).status_code, 403)
+                
+                self.client.force_login(User.objects.create_user(f'user-{name}'))
+                self.assertEqual(self.client.post(reverse(name)).status_code, 403)
+                self.client.logout()
+                
+                # Staff authentifié, sans jeton CSRF
+                client.force_login(User.objects.create_user(f'staff-{name}', is_staff=True))
+                self.assertEqual(client.post(reverse(name)).status_code, 403)
+        
+        start.assert_not_called()
+        stop.assert_not_called()
+    
+    def test_only_known_servers_start_the_monitor(self):
+        cases = [
+            (['/usr/bin/gunicorn', 'weatherapi.wsgi'], '', True),
+            (['/venv/lib/python3.11/site-packages/uvicorn/__main__.py', 'weatherapi.asgi:application'], '', True),
+            (['manage.py', 'runserver'], 'true', True),
+            (['manage.py', 'runserver'], '', False),
+            (['manage.py', 'migrate'], 'true', False),
+            (['/usr/bin/celery', '-A', 'weatherapi', 'worker'], '', False),
+            (['/venv/bin/pytest'], '', False),
+            (['script.py'], '', False),
+            ([''], '', False),
+        ]
+        for argv, run_main, expected in cases:
+            with self.subTest(argv=argv), mock.patch.object(sys, 'argv', argv), \
+                    mock.patch.dict(os.environ, {'RUN_MAIN': run_main}):
+                self.assertEqual(is_server_process(), expected)
+
+
+class LeaderElectorTests(TransactionTestCase):
+    def wait_for(self, condition, timeout=3):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Délai dépassé")
+            time.sleep(0.02)
+    
+    def elector(self, holder, events):
+        elector = LeaderElector(
+            'test',
+            on_elected=lambda: events.append((holder, 'elected')),
+            on_revoked=lambda: events.append((holder, 'revoked')),
+            ttl=0.3,
+            holder=holder
+        )
+        self.addCleanup(elector.join, 2)
+        self.addCleanup(elector.stop)
+        elector.start()
+        return elector
+    
+    def test_standby_takes_over_when_the_leader_stops(self):
+        events = []
+        first = self.elector('A', events)
+        self.wait_for(lambda: first.is_leader)
+        second = self.elector('B', events)
+        time.sleep(0.3)
+        self.assertFalse(second.is_leader)
+        
+        # Arrêt propre: bail libéré, reprise au tour suivant de B
+        first.stop()
+        first.join(2)
+        self.wait_for(lambda: second.is_leader)
+        self.assertEqual(events, [('A', 'elected'), ('A', 'revoked'), ('B', 'elected')])
+    
+    def test_standby_takes_over_when_the_leader_disappears(self):
+        events = []
+        first = self.elector('A', events)
+        self.wait_for(lambda: first.is_leader)
+        second = self.elector('B', events)
+        
+        # Instance perdue: bail non libéré, repris à son expiration
+        with mock.patch('weather.leader.release'):
+            first.stop()
+            first.join(2)
+        stopped = time.monotonic()
+        self.assertEqual(IngestionLease.objects.get(name='test').holder, 'A')
+        self.wait_for(lambda: second.is_leader)
+        self.assertEqual(IngestionLease.objects.get(name='test').holder, 'B')
+        self.assertIn(('B', 'elected'), events)
+        self.assertLess(time.monotonic() - stopped, 1)
+
+
+@override_settings(WEATHER_HTTP_MAX_RETRIES=0, WEATHER_ADAPTIVE_POLLING=False)
+class MonitorPollingTests(TransactionTestCase):
+    def setUp(self):
+        station_cache.invalidate()
+        self.filter = PayloadFilter()
+        patcher = mock.patch('weather.services._payload_filter', self.filter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Réponse de chaque station: (status, corps)
+        self.responses = {}
+    
+    def respond(self, request):
+        status, body = self.responses[request['params']['stationId']]
+        return status, {}, body, 0
+    
+    def poll(self, upstream, station_ids, **kwargs):
+        """Un passage de collecte sur les stations indiquées"""
+        monitor = WeatherMonitorThread(upstream.url, 'test', **kwargs)
+        self.addCleanup(monitor.stop)
+        with override_settings(WEATHER_STATION_IDS=station_ids):
+            monitor.fetch_and_save_data()
+        self.assertEqual(monitor._in_flight, set())
+        return monitor
+    
+    def serialize_sqlite_writes(self):
+        """
+        SQLite en mémoire (tests): une écriture verrouille la table pour les autres
+        connexions, les stations sont alors traitées une à une dans le pool
+        """
+        if connection.vendor != 'sqlite':
+            return
+        lock = threading.Lock()
+        fetch = WeatherService.fetch_and_save_if_changed
+        
+        def serialized(*args, **kwargs):
+            with lock:
+                return fetch(*args, **kwargs)
+        
+        patcher = mock.patch.object(WeatherService, 'fetch_and_save_if_changed', serialized)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def stored(self, station_id):
+        return sorted(ObservationMeteo.objects.filter(station__station_id=station_id).values_list('epoch', flat=True))
+    
+    def test_concurrency_is_bounded_by_the_pool(self):
+        station_ids = [f'IPOOL{index}' for index in range(6)]
+        lock = threading.Lock()
+        active = []
+        peak = []
+        
+        def respond(request):
+            with lock:
+                active.append(request)
+                peak.append(len(active))
+            time.sleep(0.15)
+            with lock:
+                active.remove(request)
+            return 200, {}, {'observations': []}, 0
+        
+        with StubUpstream(respond) as upstream:
+            self.poll(upstream, station_ids, max_workers=2)
+        
+        self.assertEqual(sorted(request['params']['stationId'] for request in upstream.requests), station_ids)
+        self.assertEqual(max(peak), 2)
+    
+    def test_failing_station_does_not_affect_the_others(self):
+        self.responses = {
+            'IOK1': (200, {'observations': make_observations('IOK1', count=3)}),
+            'IMISSING': (404, b''),
+            'IBROKEN': (200, b'{"observations": [tronque'),
+            'IOK2': (200, {'observations': make_observations('IOK2', count=2)}),
+        }
+        self.serialize_sqlite_writes()
+        with StubUpstream(self.respond) as upstream:
+            with mock.patch('weather.services.logger') as logger:
+                self.poll(upstream, list(self.responses), max_workers=4)
+            
+            self.assertEqual(self.stored('IOK1'), [BASE_EPOCH, BASE_EPOCH + 300, BASE_EPOCH + 600])
+            self.assertEqual(self.stored('IOK2'), [BASE_EPOCH, BASE_EPOCH + 300])
+            self.assertFalse(StationMeteo.objects.filter(station_id__in=['IMISSING', 'IBROKEN']).exists())
+            errors = ' '.join(str(call.args[0]) for call in logger.error.call_args_list)
+            self.assertIn('IMISSING', errors)
+            self.assertIn('IBROKEN', errors)
+            
+            # Station rétablie: enregistrée au passage suivant, les autres inchangées
+            self.responses['IMISSING'] = (200, {'observations': make_observations('IMISSING', count=1)})
+            self.poll(upstream, list(self.responses), max_workers=4)
+        
+        self.assertEqual(self.stored('IMISSING'), [BASE_EPOCH])
+        self.assertEqual(ObservationMeteo.objects.count(), 6)
+    
+    def test_high_water_marks_are_kept_per_station(self):
+        self.serialize_sqlite_writes()
+        # IHW2 a déjà des observations plus récentes en base
+        WeatherDataService.save_observations_bulk({'observations': make_observations('IHW2', count=5)})
+        self.responses = {
+            'IHW1': (200, {'observations': make_observations('IHW1', count=3)}),
+            'IHW2': (200, {'observations': make_observations('IHW2', count=2)}),
+        }
+        with StubUpstream(self.respond) as upstream:
+            self.poll(upstream, ['IHW1', 'IHW2'], max_workers=2)
+            self.assertEqual(self.filter.high_water_mark('IHW1'), BASE_EPOCH + 600)
+            self.assertEqual(self.filter.high_water_mark('IHW2'), BASE_EPOCH + 1200)
+            
+            # Nouvelle observation pour IHW1 seulement; le payload de IHW2 change sans rien de nouveau
+            self.responses['IHW1'] = (200, {'observations': make_observations('IHW1', count=4)})
+            self.responses['IHW2'] = (200, {'observations': make_observations('IHW2', count=4)})
+            with mock.patch.object(WeatherDataService, 'save_observations_bulk', wraps=WeatherDataService.save_observations_bulk) as save:
+                self.poll(upstream, ['IHW1', 'IHW2'], max_workers=2)
+        
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual([obs['epoch'] for obs in save.call_args.args[0]['observations']], [BASE_EPOCH + 900])
+        self.assertEqual(self.filter.high_water_mark('IHW1'), BASE_EPOCH + 900)
+        self.assertEqual(self.filter.high_water_mark('IHW2'), BASE_EPOCH + 1200)
+        self.assertEqual(len(self.stored('IHW1')), 4)
+        self.assertEqual(len(self.stored('IHW2')), 5)
+
+
+class PollSchedulerTests(TestCase):
+    def schedule(self, **kwargs):
+        """Délais successifs d'une station qui publie toutes les 5 minutes, interrogée à l'échéance"""
+        now = BASE_EPOCH
+        epochs = [BASE_EPOCH - 300 * index for index in range(12)]
+        scheduler = PollScheduler(default_interval=900, grace=30, jitter=0, clock=lambda: now,
+                                  load_epochs=lambda station_id: epochs, **kwargs)
+        scheduler.sync(['ITEST1'])
+        
+        delays = []
+        for _ in range(10):
+            delay = scheduler.update('ITEST1', 1)
+            delays.append(delay)
+            now += delay
+            # Observations publiées jusqu'à l'interrogation
+            last = int(now) - int(now) % 300
+            epochs = [last - 300 * index for index in range(12)]
+        return delays
+    
+    def test_never_polls_more_often_than_the_fixed_interval(self):
+        self.assertGreaterEqual(min(self.schedule()), 900)
+    
+    def test_shorter_floor_must_be_explicit(self):
+        self.assertLess(min(self.schedule(min_interval=60)), 900)
+
+
+class BatchWriterTests(WeatherTestCase):
+    def setUp(self):
+        super().setUp()
+        sleep = mock.patch('weather.ingest.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+    
+    def write(self, *sends):
+        items = [(IngestBatch.objects.create(observation_count=len(send)), send) for send in sends]
+        with self.captureOnCommitCallbacks(execute=True):
+            BatchWriter().write(items)
+        return [
+            IngestBatch.objects.values('status', 'saved_count', 'skipped_count', 'rejected').get(pk=batch.pk)
+            for batch, _ in items
+        ]
+    
+    def outcome(self, status, saved, skipped, rejected=()):
+        return {'status': status, 'saved_count': saved, 'skipped_count': skipped, 'rejected': list(rejected)}
+    
+    def test_outcomes_of_coalesced_batches(self):
+        observations = make_observations(count=6)
+        self.save(observations[:1])
+        
+        outcomes = self.write(observations[:3], observations[2:6] + observations[5:6])
+        
+        self.assertEqual(outcomes, [
+            self.outcome(IngestBatch.STATUS_DONE, 2, 1),
+            # observations[2] revient au premier lot, observations[5] est répétée
+            self.outcome(IngestBatch.STATUS_DONE, 3, 2),
+        ])
+        self.assertEqual(ObservationMeteo.objects.count(), 6)
+        self.sleep.assert_not_called()
+    
+    def test_rows_refused_at_write_time_are_reported_per_row(self):
+        observations = make_observations(count=6)
+        # Valide pour le modèle, refusée par la base (hors limites d'un entier 64 bits)
+        refused = dict(observations[4], uvHigh=10 ** 20)
+        validate_observations([refused])
+        
+        outcomes = self.write(observations[:3], [observations[3], refused, observations[5]], [refused])
+        
+        # Les observations valides des lots sont enregistrées dès le premier essai;
+        # seule la ligne refusée est signalée, sans faire échouer son lot
+        rejected = {'index': 1, 'station_id': 'ITEST1', 'epoch': refused['epoch']}
+        self.assertEqual(outcomes, [
+            self.outcome(IngestBatch.STATUS_DONE, 3, 0),
+            self.outcome(IngestBatch.STATUS_DONE, 2, 0, [rejected]),
+            # Observation déjà attribuée au lot précédent: rien de nouveau
+            self.outcome(IngestBatch.STATUS_DONE, 0, 1),
+        ])
+        self.assertEqual(ObservationMeteo.objects.count(), 5)
+        
+        # Lot dont toutes les observations nouvelles sont refusées: échec
+        self.assertEqual(self.write([dict(refused, epoch=BASE_EPOCH + 6 * 300)])[0]['status'], IngestBatch.STATUS_FAILED)
+    
+    def test_validation_rejects_observations_that_cannot_be_saved(self):
+        valid = make_observation()
+        validate_observations([valid])
+        
+        invalid = [
+            {key: value for key, value in valid.items() if key != 'lat'},
+            dict(valid, lon='29.36'),
+            dict(valid, tz=''),
+            dict(valid, obsTimeLocal='garbage'),
+            dict(valid, obsTimeLocal=20251108),
+            dict(valid, epoch=10 ** 20),
+            dict(valid, imperial={'tempAvg': '65'}),
+            dict(valid, imperial=[65]),
+            dict(valid, imperial=None),
+            dict(valid, humidityAvg='abc'),
+            dict(valid, winddirAvg=[]),
+            dict(valid, uvHigh='high'),
+            dict(valid, solarRadiationHigh={}),
+            dict(valid, qcStatus='ok'),
+        ]
+        for obs_data in invalid:
+            with self.subTest(obs_data=obs_data), self.assertRaises(ValueError):
+                validate_observations([valid, obs_data])
+        
+        # Valeurs converties comme par le modèle à l'enregistrement
+        validate_observations([dict(valid, humidityAvg='70', qcStatus=1.0)])
+
+
+class ExportTests(WeatherTestCase):
+    def setUp(self):
+        super().setUp()
+        observations = make_observations(count=5, tempAvg=50.0) + make_observations('ITEST2', count=3, windgustHigh=12.5)
+        observations[1]['imperial']['tempAvg'] = None
+        observations[2]['humidityAvg'] = None
+        self.save(observations)
+        self.stations = list(StationMeteo.objects.order_by('station_id'))
+    
+    def expected_rows(self, start=None, end=None):
+        """Lignes attendues, lues par l'ORM: (station_id, epoch, heure locale, *VALUE_COLUMNS)"""
+        rows = []
+        for station in self.stations:
+            observations = ObservationMeteo.objects.filter(station=station).order_by('epoch')
+            if start is not None:
+                observations = observations.filter(epoch__gte=start, epoch__lt=end)
+            for epoch, *values in observations.values_list('epoch', *export.VALUE_COLUMNS):
+                local = datetime.utcfromtimestamp(epoch + 7200)
+                rows.append((station.station_id, epoch, local, *values))
+        return rows
+    
+    def chunks(self, start=None, end=None):
+        # Lots de 2: plusieurs lots par station
+        return export.iter_chunks(self.stations, start, end, chunk_size=2)
+    
+    @skipIf(export.np is None, "NumPy n'est pas installé")
+    def test_npz_columns(self):
+        import numpy as np
+        
+        output = io.BytesIO()
+        self.assertEqual(export.write_npz(self.chunks(), output), 8)
+        output.seek(0)
+        
+        with np.load(output) as archive:
+            self.assertEqual(list(archive['station_ids']), ['ITEST1', 'ITEST2'])
+            for name, dtype in zip(['station_index', *export.COLUMNS[1:]], export.npz_dtypes()):
+                self.assertEqual(archive[name].dtype, dtype, name)
+                self.assertEqual(archive[name].shape, (8,), name)
+            
+            expected = self.expected_rows()
+            self.assertEqual(list(archive['station_index']), [0] * 5 + [1] * 3)
+            self.assertEqual(list(archive['epoch']), [row[1] for row in expected])
+            self.assertEqual(archive['obs_time_utc'].astype('int64').tolist(), [row[1] for row in expected])
+            self.assertEqual(archive['obs_time_local'].tolist(), [row[2] for row in expected])
+            for index, column in enumerate(export.VALUE_COLUMNS, start=3):
+                values = [np.nan if row[index] is None else row[index] for row in expected]
+                np.testing.assert_array_equal(archive[column], values, err_msg=column)
+            
+            # Valeurs manquantes: NaN
+            self.assertTrue(np.isnan(archive['temp_avg'][1]))
+            self.assertTrue(np.isnan(archive['humidity_avg'][2]))
+            self.assertEqual(archive['windgust_high'][5], conversions.mph_to_kmh(12.5))
+    
+    @skipIf(export.np is None, "NumPy n'est pas installé")
+    def test_npz_of_an_empty_range(self):
+        import numpy as np
+        
+        output = io.BytesIO()
+        self.assertEqual(export.write_npz(self.chunks(start=0, end=BASE_EPOCH), output), 0)
+        output.seek(0)
+        with np.load(output) as archive:
+            self.assertEqual(archive['station_ids'].shape, (0,))
+            for name, dtype in zip(['station_index', *export.COLUMNS[1:]], export.npz_dtypes()):
+                self.assertEqual((archive[name].dtype, archive[name].shape), (dtype, (0,)), name)
+    
+    def test_csv_round_trip(self):
+        start, end = BASE_EPOCH + 300, BASE_EPOCH + 1200
+        reader = csv.reader(io.StringIO(''.join(export.iter_csv(self.chunks(start, end)))))
+        self.assertEqual(next(reader), list(export.COLUMNS))
+        
+        rows = []
+        for station_id, epoch, utc, local, *values in reader:
+            self.assertEqual(datetime.fromisoformat(utc), datetime.fromtimestamp(int(epoch), dt_timezone.utc))
+            rows.append((
+                station_id, int(epoch), datetime.fromisoformat(local),
+                *(None if value == '' else float(value) for value in values)
+            ))
+        self.assertEqual(rows, self.expected_rows(start, end))
+        self.assertEqual(len(rows), 5)
+    
+    @skipIf(export.pa is None, "pyarrow n'est pas installé")
+    def test_arrow_round_trip(self):
+        import pyarrow as pa
+        
+        table = pa.ipc.open_stream(b''.join(export.iter_arrow(self.chunks()))).read_all()
+        self.assertEqual(table.schema, export.arrow_schema())
+        self.assertEqual(table.to_batches()[0].num_rows, 2)
+        
+        rows = [
+            (row['station_id'], row['epoch'], row['obs_time_local'], *(row[column] for column in export.VALUE_COLUMNS))
+            for row in table.to_pylist()
+        ]
+        self.assertEqual(rows, self.expected_rows())
+        self.assertEqual(
+            [row['obs_time_utc'] for row in table.to_pylist()],
+            [datetime.fromtimestamp(row[1], dt_timezone.utc) for row in rows]
+        )
+        
+        # Plage vide: flux valide, schéma seul
+        empty = pa.ipc.open_stream(b''.join(export.iter_arrow(self.chunks(start=0, end=BASE_EPOCH)))).read_all()
+        self.assertEqual((empty.schema, empty.num_rows), (export.arrow_schema(), 0))
+
+
+class ResampleTests(WeatherTestCase):
+    ZONE = ZoneInfo('Europe/Paris')
+    
+    def setUp(self):
+        super().setUp()
+        # Toutes les 30 min du 25 au 26 octobre 2025 (heure locale), passage à
+        # l'heure d'hiver le 26 à 3 h: 02:00-03:00 locales sont vécues deux fois
+        start, end = self.day_bounds(date(2025, 10, 25), days=2)
+        observations = []
+        for index, epoch in enumerate(range(start, end, 1800)):
+            imperial = {'tempAvg': None if index % 3 == 0 else 40.0 + index, 'windgustHigh': None}
+            imperial['precipRate'] = 0.01 * index if index % 2 == 0 else None
+            offset = int(datetime.fromtimestamp(epoch, self.ZONE).utcoffset().total_seconds())
+            observations.append(dict(make_observation('IPARIS1', epoch, utc_offset=offset, **imperial), tz='Europe/Paris'))
+        self.save(observations)
+        self.station = StationMeteo.objects.get(station_id='IPARIS1')
+    
+    def day_bounds(self, day, days=1):
+        start = datetime.combine(day, datetime.min.time(), tzinfo=self.ZONE)
+        return int(start.timestamp()), int((start + timedelta(days=days)).timestamp())
+    
+    def test_hourly_buckets_on_the_dst_day(self):
+        roll_up(lag=timedelta(0))
+        start, end = self.day_bounds(date(2025, 10, 26))
+        self.assertEqual(end - start, 25 * 3600)
+        
+        # temp_avg/min n'est pas maintenu dans les agrégats: observations brutes
+        data = resample(self.station, start, end, '1h', ['temp_avg'], ['avg', 'min'])
+        self.assertEqual(data['source'], 'raw')
+        self.assertEqual(data['time'], [datetime.fromtimestamp(start + hour * 3600, self.ZONE).isoformat() for hour in range(25)])
+        self.assertEqual(data['time'][2:4], ['2025-10-26T02:00:00+02:00', '2025-10-26T02:00:00+01:00'])
+        self.assertEqual(data['count'], [2] * 25)
+        
+        # Les agrégats horaires fusionnent les deux 02:00 locales: observations brutes
+        averages = resample(self.station, start, end, '1h', ['temp_avg'], ['avg'])
+        self.assertEqual(averages['source'], 'raw')
+        self.assertEqual(averages['time'], data['time'])
+        self.assertEqual(averages['series']['temp_avg']['avg'], data['series']['temp_avg']['avg'])
+        
+        # Jour sans changement d'heure: agrégats horaires, mêmes valeurs
+        start, end = self.day_bounds(date(2025, 10, 25))
+        raw = resample(self.station, start, end, '1h', ['temp_avg'], ['avg', 'min'])
+        rolled = resample(self.station, start, end, '1h', ['temp_avg'], ['avg'])
+        self.assertEqual(rolled['source'], 'rollup:hour')
+        self.assertEqual((rolled['time'], rolled['count']), (raw['time'], raw['count']))
+        self.assertEqual(rolled['series']['temp_avg']['avg'], raw['series']['temp_avg']['avg'])
+        self.assertEqual(len(rolled['time']), 24)
+    
+    def test_sub_hour_and_daily_buckets_on_the_dst_day(self):
+        start, end = self.day_bounds(date(2025, 10, 26))
+        data = resample(self.station, start, end, '30min', ['temp_avg'], ['count'])
+        self.assertEqual(data['time'], [datetime.fromtimestamp(epoch, self.ZONE).isoformat() for epoch in range(start, end, 1800)])
+        self.assertEqual(data['count'], [1] * 50)
+        
+        start, end = self.day_bounds(date(2025, 10, 25), days=2)
+        expected_time = ['2025-10-25T00:00:00+02:00', '2025-10-26T00:00:00+02:00']
+        raw = resample(self.station, start, end, '1d', ['temp_avg'], ['avg', 'min'])
+        self.assertEqual((raw['source'], raw['time'], raw['count']), ('raw', expected_time, [48, 50]))
+        
+        for rolled_up in (False, True):
+            if rolled_up:
+                roll_up(lag=timedelta(0))
+            rolled = resample(self.station, start, end, '1d', ['temp_avg'], ['avg'])
+            with self.subTest(rolled_up=rolled_up):
+                self.assertEqual((rolled['source'], rolled['time'], rolled['count']), ('rollup:day', expected_time, [48, 50]))
+                self.assertEqual(rolled['series']['temp_avg']['avg'], raw['series']['temp_avg']['avg'])
+    
+    def test_every_aggregate_on_null_heavy_columns(self):
+        start, end = self.day_bounds(date(2025, 10, 25))
+        fields = ['temp_avg', 'windgust_high', 'precip_rate']
+        aggregates = ['avg', 'min', 'max', 'sum', 'count']
+        data = resample(self.station, start, end, '1h', fields, aggregates)
+        
+        hours = {}
+        for epoch, *values in ObservationMeteo.objects.filter(
+            station=self.station, epoch__gte=start, epoch__lt=end
+        ).order_by('epoch').values_list('epoch', *fields):
+            hours.setdefault(epoch - epoch % 3600, []).append(values)
+        self.assertEqual(data['count'], [len(rows) for rows in hours.values()])
+        
+        for index, field in enumerate(fields):
+            columns = [[row[index] for row in rows if row[index] is not None] for rows in hours.values()]
+            expected = {
+                'avg': [round(sum(values) / len(values), 2) if values else None for values in columns],
+                'min': [min(values, default=None) for values in columns],
+                'max': [max(values, default=None) for values in columns],
+                'sum': [sum(values) if values else None for values in columns],
+                'count': [len(values) for values in columns],
+            }
+            with self.subTest(field=field):
+                self.assertEqual(data['series'][field], expected)
+        self.assertEqual(data['series']['windgust_high']['count'], [0] * 24)
+        
+        # Mêmes valeurs depuis les agrégats journaliers
+        roll_up(lag=timedelta(0))
+        start, end = self.day_bounds(date(2025, 10, 25), days=2)
+        pairs = [('temp_avg', 'avg'), ('temp_avg', 'sum'), ('temp_avg', 'count'), ('windgust_high', 'max'), ('precip_rate', 'max')]
+        raw, _ = raw_buckets(self.station, self.ZONE, start, end, '1d', pairs)
+        rolled, _ = rollup_buckets(self.station, self.ZONE, start, end, '1d', pairs)
+        self.assertEqual(len(rolled), 2)
+        for (raw_start, raw_count, raw_values), (rolled_start, rolled_count, rolled_values) in zip(raw, rolled):
+            self.assertEqual((rolled_start, rolled_count), (raw_start, raw_count))
+            # Sommes calculées dans un autre ordre: à l'arrondi près
+            for raw_value, rolled_value in zip(raw_values, rolled_values):
+                if raw_value is None:
+                    self.assertIsNone(rolled_value)
+                else:
+                    self.assertAlmostEqual(rolled_value, raw_value)
+    
+    def query(self, **params):
+        return parse_resample_query(RequestFactory().get('/', params), self.station)
+    
+    def test_query_bounds_are_aligned_on_local_buckets(self):
+        query = self.query(start='2025-10-26T02:40:00+01:00', end='2025-10-26T04:10:00+01:00', bucket='1h')
+        self.assertEqual(
+            [datetime.fromtimestamp(query[bound], self.ZONE).isoformat() for bound in ('start', 'end')],
+            ['2025-10-26T02:00:00+01:00', '2025-10-26T05:00:00+01:00']
+        )
+        
+        query = self.query(start='2025-10-26T13:00:00+01:00', end='2025-10-26T13:00:00+01:00', bucket='1d', fields='temp_avg,temp_avg', agg='max,avg')
+        self.assertEqual((query['start'], query['end']), self.day_bounds(date(2025, 10, 26)))
+        self.assertEqual((query['fields'], query['aggregates']), (['temp_avg'], ['max', 'avg']))
+    
+    @override_settings(WEATHER_RESAMPLE_MAX_BUCKETS=100)
+    def test_invalid_queries_are_rejected(self):
+        bounds = {'start': '2025-10-26', 'end': '2025-10-27'}
+        invalid = [
+            {'bucket': '2h'},
+            {'bucket': ''},
+            {'fields': 'nope'},
+            {'fields': 'temp_avg,station_id'},
+            {'fields': ' , '},
+            {'agg': 'median'},
+            {'agg': 'AVG'},
+            {'agg': ','},
+            {'start': '2025-10-27', 'end': '2025-10-26'},
+            {'start': 'garbage'},
+            # 300 intervalles de 5 minutes
+            {'bucket': '5min'},
+        ]
+        for params in invalid:
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                self.query(**{**bounds, **params})
+        self.query(**bounds, bucket='15min')
+        
+        response = self.client.get(reverse('weather:resample_observations', args=['IPARIS1']), {**bounds, 'agg': 'median'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('weather:resample_observations', args=['IUNKNOWN']), bounds)
+        self.assertEqual(response.status_code, 404)
+
+
+class PayloadFilterTests(WeatherTestCase):
+    def setUp(self):
+        super().setUp()
+        self.filter = PayloadFilter()
+        patcher = mock.patch('weather.services._payload_filter', self.filter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.pws = PWSClient(api_key='test', max_retries=0, sleep=lambda delay: None)
+        self.addCleanup(self.pws.close)
+        self.payload = {'observations': make_observations(count=3)}
+    
+    def fetch(self, upstream):
+        with self.captureOnCommitCallbacks(execute=True):
+            return WeatherService.fetch_and_save_if_changed('ITEST1', api_url=upstream.url, client=self.pws)
+    
+    def respond(self, request):
+        return 200, {}, self.payload, 0
+    
+    def test_unchanged_payload_does_not_touch_the_database(self):
+        with StubUpstream(self.respond) as upstream:
+            self.assertEqual(self.fetch(upstream)['count'], 3)
+            with self.assertNumQueries(0):
+                result = self.fetch(upstream)
+        
+        self.assertEqual((result['status'], result['saved']), ('success', False))
+        self.assertEqual(result['message'], 'Payload inchangé depuis la dernière récupération')
+        self.assertEqual(len(upstream.requests), 2)
+    
+    def test_changed_payload_saves_only_new_epochs(self):
+        with StubUpstream(self.respond) as upstream:
+            self.fetch(upstream)
+            
+            # Contenu modifié, aucune observation plus récente: rien à enregistrer
+            self.payload['observations'][0]['qcStatus'] = 0
+            with mock.patch.object(WeatherDataService, 'save_observations_bulk') as save:
+                result = self.fetch(upstream)
+            save.assert_not_called()
+            self.assertEqual((result['saved'], result['count']), (False, 0))
+            
+            self.payload['observations'].append(make_observation(epoch=BASE_EPOCH + 3 * 300))
+            result = self.fetch(upstream)
+        
+        self.assertEqual((result['saved'], result['count']), (True, 1))
+        self.assertEqual(ObservationMeteo.objects.count(), 4)
+        self.assertEqual(self.filter.high_water_mark('ITEST1'), BASE_EPOCH + 3 * 300)
+        self.assertTrue(self.filter.is_unchanged((upstream.url, 'ITEST1'), PayloadFilter.digest(json.dumps(self.payload).encode())))
+    
+    def test_high_water_mark_starts_from_the_database(self):
+        self.save(make_observations(count=2))
+        with StubUpstream(self.respond) as upstream:
+            with mock.patch.object(WeatherDataService, 'save_observations_bulk', wraps=WeatherDataService.save_observations_bulk) as save:
+                result = self.fetch(upstream)
+        
+        self.assertEqual(result['count'], 1)
+        self.assertEqual([obs['epoch'] for obs in save.call_args.args[0]['observations']], [BASE_EPOCH + 600])
+    
+    def test_state_after_a_failed_save(self):
+        digest = PayloadFilter.digest(json.dumps(self.payload).encode())
+        with StubUpstream(self.respond) as upstream:
+            source = (upstream.url, 'ITEST1')
+            with mock.patch.object(WeatherDataService, 'save_observations_bulk', side_effect=DatabaseError('panne')), \
+                    mock.patch.object(self.pws, 'forget_validators', wraps=self.pws.forget_validators) as forget:
+                result = self.fetch(upstream)
+            
+            # Ni empreinte ni high-water mark: le même payload sera traité au prochain passage
+            self.assertEqual(result['status'], 'error')
+            forget.assert_called_once_with('ITEST1', url=upstream.url)
+            self.assertFalse(self.filter.is_unchanged(source, digest))
+            self.assertIsNone(self.filter.high_water_mark('ITEST1'))
+            
+            # Enregistrement partiel: état oublié, relu depuis la base au passage suivant
+            with mock.patch.object(WeatherDataService, 'save_observations_bulk', return_value=2):
+                result = self.fetch(upstream)
+            self.assertEqual(result['count'], 2)
+            self.assertFalse(self.filter.is_unchanged(source, digest))
+            self.assertNotIn('ITEST1', self.filter._high_water)
+            
+            result = self.fetch(upstream)
+        
+        self.assertEqual(result['count'], 3)
+        self.assertTrue(self.filter.is_unchanged(source, digest))
+        self.assertEqual(self.filter.high_water_mark('ITEST1'), BASE_EPOCH + 600)
+
+
+class ObservationAdminTests(WeatherTestCase):
+    # Fuseaux extrêmes: UTC+14 (Kiritimati) et UTC-12
+    OFFSETS = {'IKIRI1': ('Pacific/Kiritimati', 14 * 3600), 'IBAKER1': ('Etc/GMT+12', -12 * 3600)}
+    
+    def setUp(self):
+        super().setUp()
+        observations = []
+        for station_id, (tz, offset) in self.OFFSETS.items():
+            # Minuit local le 2025-11-08: première et dernière seconde du jour, et leurs voisines
+            midnight = BASE_EPOCH - offset
+            for epoch in (midnight - 1, midnight, midnight + 86400 - 1, midnight + 86400):
+                observations.append(dict(make_observation(station_id, epoch, utc_offset=offset), tz=tz))
+        self.save(observations)
+        self.changelist_url = reverse('admin:weather_observationmeteo_changelist')
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+    
+    def changelist(self, **params):
+        return self.client.get(self.changelist_url, params)
+    
+    def day_filter(self, value):
+        request = RequestFactory().get('/', {'jour': value})
+        return ObservationDayFilter(request, {'jour': value}, ObservationMeteo, admin.site._registry[ObservationMeteo])
+    
+    def test_day_filter_brackets_extreme_utc_offsets(self):
+        response = self.changelist(jour='2025-11-08')
+        self.assertEqual(response.status_code, 200)
+        
+        selected = response.context['cl'].queryset
+        self.assertEqual(
+            set(selected.values_list('pk', flat=True)),
+            set(ObservationMeteo.objects.filter(obs_time_local__date=date(2025, 11, 8)).values_list('pk', flat=True))
+        )
+        self.assertEqual(sorted(selected.values_list('obs_time_local', flat=True)), [
+            datetime(2025, 11, 8, 0, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 11, 8, 0, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 11, 8, 23, 59, 59, tzinfo=dt_timezone.utc),
+            datetime(2025, 11, 8, 23, 59, 59, tzinfo=dt_timezone.utc),
+        ])
+        
+        for value, count in (('2025-11-07', 2), ('2025-11-09', 2), ('2025-11', 8), ('2025-10', 0), ('2025', 8)):
+            with self.subTest(value=value):
+                self.assertEqual(self.changelist(jour=value).context['cl'].result_count, count)
+    
+    def test_day_filter_parses_year_month_and_day(self):
+        self.assertEqual(self.day_filter('2024').parse(), (date(2024, 1, 1), date(2025, 1, 1), 'year'))
+        self.assertEqual(self.day_filter('2024-02').parse(), (date(2024, 2, 1), date(2024, 3, 1), 'month'))
+        self.assertEqual(self.day_filter('2024-12').parse(), (date(2024, 12, 1), date(2025, 1, 1), 'month'))
+        self.assertEqual(self.day_filter('2024-02-29').parse(), (date(2024, 2, 29), date(2024, 3, 1), 'day'))
+        self.assertIsNone(self.day_filter('').parse())
+        
+        for value in ('abcd', '0000', '9999', '2025-13', '2025-1', '2025-02-30', '20251108', '9999-12', '9999-12-31'):
+            with self.subTest(value=value), self.assertRaises(IncorrectLookupParameters):
+                self.day_filter(value).parse()
+        
+        # L'administration signale le paramètre invalide (?e=1)
+        response = self.changelist(jour='2025-02-30')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('e=1', response['Location'])
+    
+    def test_day_filter_choices_come_from_daily_summaries(self):
+        request = RequestFactory().get('/')
+        model_admin = admin.site._registry[ObservationMeteo]
+        choices = lambda value: [key for key, _ in self.day_filter(value).lookups(request, model_admin)]
+        
+        self.assertEqual(choices(''), ['2025'])
+        self.assertEqual(choices('2025'), ['2025', '2025-11'])
+        self.assertEqual(choices('2025-11'), ['2025', '2025-11', '2025-11-07', '2025-11-08', '2025-11-09'])
+        self.assertEqual(choices('2025-11-08'), ['2025', '2025-11', '2025-11-08'])
+    
+    def test_paginator_bounds_the_count_of_a_filtered_queryset(self):
+        queryset = ObservationMeteo.objects.filter(station__station_id='IKIRI1').order_by('pk')
+        paginator = EstimatedCountPaginator(queryset, 2)
+        paginator.filtered_count_limit = 3
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 3)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 3', queries[0]['sql'])
+        
+        paginator = EstimatedCountPaginator(queryset, 2)
+        self.assertEqual(paginator.count, 4)
+    
+    def test_paginator_falls_back_to_an_exact_count(self):
+        queryset = ObservationMeteo.objects.order_by('pk')
+        # SQLite: pas d'estimation
+        with self.assertNumQueries(1):
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 8)
+        
+        # Estimation sous le seuil: comptage exact
+        with mock.patch('weather.admin.estimated_table_rows', return_value=50), self.assertNumQueries(1):
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 8)
+        
+        # Grande table: estimation, sans COUNT(*)
+        with mock.patch('weather.admin.estimated_table_rows', return_value=250000) as estimate, self.assertNumQueries(0):
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 250000)
+        estimate.assert_called_once_with(ObservationMeteo, 'default')
+
+
+class CompareStationsTests(WeatherTestCase):
+    # Fenêtre de 7 jours: à partir du 2025-11-03
+    NOW = datetime(2025, 11, 10, 12, 0, tzinfo=dt_timezone.utc)
+    
+    def setUp(self):
+        super().setUp()
+        # ITEST1: 10, 15 et 20 °C le 8 novembre, 0 et 5 °C le 6, aucun résumé le 7
+        self.save([
+            make_observation(epoch=BASE_EPOCH + index * 600, tempAvg=temp, tempHigh=68.0, precipTotal=0.1)
+            for index, temp in enumerate((50.0, 59.0, 68.0))
+        ] + [
+            make_observation(epoch=BASE_EPOCH - 2 * 86400 + index * 600, tempAvg=temp, tempHigh=86.0, tempLow=14.0, precipTotal=0.2)
+            for index, temp in enumerate((32.0, 41.0))
+        ])
+        # ITEST2: uniquement avant la fenêtre
+        self.save(make_observations('ITEST2', count=2, start=BASE_EPOCH - 7 * 86400))
+        self.stations = {station.station_id: station for station in StationMeteo.objects.all()}
+        
+        now = mock.patch('django.utils.timezone.now', return_value=self.NOW)
+        now.start()
+        self.addCleanup(now.stop)
+    
+    def test_service_aggregates_daily_summaries(self):
+        stations = [self.stations['ITEST1'], self.stations['ITEST2']]
+        columns, results = WeatherDataService.compare_stations(stations, days=7, metrics=['temp', 'precip'])
+        
+        self.assertEqual(columns, ['observation_count', 'temp_avg', 'temp_max', 'temp_min', 'precip_total', 'precip_rate_max'])
+        # Moyenne pondérée par le nombre d'observations, pluie: somme des cumuls journaliers
+        self.assertEqual(results, {self.stations['ITEST1'].pk: [5, 10.0, 30.0, -10.0, 7.6, 0.0]})
+        
+        # Fenêtre réduite au 8 novembre
+        columns, results = WeatherDataService.compare_stations(stations, days=2, metrics=['humidity', 'temp'])
+        self.assertEqual(columns[:4], ['observation_count', 'humidity_avg', 'humidity_max', 'humidity_min'])
+        self.assertEqual(results[self.stations['ITEST1'].pk], [3, 70.0, 80.0, 60.0, 15.0, 20.0, 15.6])
+        
+        columns, results = WeatherDataService.compare_stations(stations)
+        self.assertEqual(len(columns), 1 + sum(len(metric) for metric in COMPARE_METRICS.values()))
+        self.assertEqual(WeatherDataService.compare_stations([], metrics=['wind']), (['observation_count', 'wind_avg', 'wind_max', 'gust_max'], {}))
+    
+    def test_view_reports_unknown_stations_and_days_without_summary(self):
+        url = reverse('weather:compare_stations')
+        response = self.client.get(url, {'stations': 'ITEST2, IUNKNOWN,ITEST1,ITEST2', 'metrics': 'precip,temp'})
+        self.assertEqual(response.status_code, 200)
+        
+        data = response.json()
+        self.assertEqual(data['start_date'], '2025-11-03')
+        self.assertEqual(data['stations'], ['ITEST2', 'ITEST1'])
+        self.assertEqual(data['unknown_stations'], ['IUNKNOWN'])
+        self.assertEqual(data['columns'], ['observation_count', 'precip_total', 'precip_rate_max', 'temp_avg', 'temp_max', 'temp_min'])
+        self.assertEqual(data['rows'], [[0, None, None, None, None, None], [5, 7.6, 0.0, 10.0, 30.0, -10.0]])
+        
+        # Sans stations: stations actives, par station_id
+        StationMeteo.objects.filter(station_id='ITEST2').update(actif=False)
+        data = self.client.get(url, {'metrics': 'temp'}).json()
+        self.assertEqual((data['stations'], data['unknown_stations']), (['ITEST1'], []))
+    
+    @override_settings(WEATHER_COMPARE_MAX_STATIONS=2)
+    def test_view_rejects_invalid_parameters(self):
+        url = reverse('weather:compare_stations')
+        for params in ({'days': '0'}, {'days': '3661'}, {'days': 'week'}, {'metrics': 'temp,snow'}, {'stations': 'A,B,C'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        self.assertEqual(self.client.get(url, {'stations': 'A,B,A'}).status_code, 200)
+
+
+class AsyncURLConf:
+    """URLconf de test: vues de lecture asynchrones sous /async/ (namespace async), vues synchrones ailleurs"""
+    urlpatterns = [
+        path('async/', include(([
+            path(str(pattern.pattern), getattr(async_views, pattern.callback.__name__, pattern.callback), name=pattern.name)
+            for pattern in weather_urls.urlpatterns
+        ], 'async'))),
+        path('', include('weather.urls')),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncURLConf)
+class AsyncViewsTests(WeatherTestCase):
+    def setUp(self):
+        super().setUp()
+        observations = make_observations(count=4, tempAvg=61.3)
+        observations[1]['imperial']['tempAvg'] = None
+        self.save(observations + make_observations('ITEST2', count=2, start=BASE_EPOCH - 86400))
+    
+    def get_twins(self, name, args=(), params=None):
+        """(corps synchrone, corps asynchrone) d'un endpoint, caches vidés avant chaque appel"""
+        cache.clear()
+        station_cache.invalidate()
+        response = self.client.get(reverse(f'weather:{name}', args=args), params or {})
+        sync_body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, sync_body
+    
+    async def get_async(self, name, args=(), params=None):
+        await sync_to_async(cache.clear)()
+        station_cache.invalidate()
+        response = await self.async_client.get(reverse(f'async:{name}', args=args), params or {})
+        if response.streaming:
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+        return response, response.content
+    
+    async def test_bodies_match_the_sync_views(self):
+        endpoints = [
+            ('daily_observations', ['ITEST1'], {'date': '2025-11-08'}),
+            ('daily_observations', ['IUNKNOWN'], {}),
+            ('list_observations', ['ITEST1'], {'start': str(BASE_EPOCH), 'limit': '2', 'fields': 'time_utc,temperature'}),
+            ('list_observations', ['ITEST1'], {'limit': 'abc'}),
+            ('resample_observations', ['ITEST1'], {'start': str(BASE_EPOCH), 'end': str(BASE_EPOCH + 3600), 'bucket': '5min', 'agg': 'avg,count'}),
+            ('resample_observations', ['ITEST1'], {'bucket': '2h'}),
+            ('compare_stations', [], {'stations': 'ITEST1,IUNKNOWN,ITEST2', 'days': '3660'}),
+            ('compare_stations', [], {}),
+            ('export_observations', [], {'format': 'csv'}),
+            ('export_observations', [], {'format': 'arrow', 'stations': 'ITEST2'}),
+            ('export_observations', [], {'format': 'xml'}),
+            ('list_stations', [], {}),
+            ('monitoring_status', [], {}),
+        ]
+        for name, args, params in endpoints:
+            sync_response, sync_body = await sync_to_async(self.get_twins)(name, args, params)
+            async_response, async_body = await self.get_async(name, args, params)
+            with self.subTest(name=name, params=params):
+                self.assertEqual(async_response.status_code, sync_response.status_code)
+                self.assertEqual(async_response['Content-Type'], sync_response['Content-Type'])
+                self.assertEqual(async_body, sync_body)
+    
+    async def test_daily_body_is_streamed(self):
+        sync_response, sync_body = await sync_to_async(self.get_twins)('daily_observations', ['ITEST1'], {'date': '2025-11-08'})
+        
+        await sync_to_async(cache.clear)()
+        with mock.patch('weather.serializers.OUTPUT_CHUNK_SIZE', 256):
+            response = await self.async_client.get(reverse('async:daily_observations', args=['ITEST1']), {'date': '2025-11-08'})
+            self.assertTrue(response.streaming)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), sync_body)
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        self.assertEqual(len(json.loads(sync_body)['observations']), 4)
+        
+        # Corps mis en cache une fois envoyé: 304 sur l'ETag, même corps sinon
+        response = await self.async_client.get(
+            reverse('async:daily_observations', args=['ITEST1']), {'date': '2025-11-08'}, headers={'if-none-match': sync_response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get(reverse('async:daily_observations', args=['ITEST1']), {'date': '2025-11-08'})
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, sync_body)
+    
+    async def test_only_get_is_allowed(self):
+        for name, args in (('daily_observations', ['ITEST1']), ('compare_stations', []), ('monitoring_status', [])):
+            response = await self.async_client.post(reverse(f'async:{name}', args=args))
+            with self.subTest(name=name):
+                self.assertEqual(response.status_code, 405)
+                self.assertEqual(response['Allow'], 'GET')
+    
+    @skipIf(export.np is None, "NumPy n'est pas installé")
+    async def test_npz_export_closes_its_temporary_file(self):
+        import numpy as np
+        
+        files = []
+        make_file = tempfile.TemporaryFile
+        
+        def temporary_file():
+            files.append(make_file())
+            return files[-1]
+        
+        with mock.patch('weather.async_views.tempfile.TemporaryFile', temporary_file):
+            response, body = await self.get_async('export_observations', params={'format': 'npz'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="observations.npz"')
+        self.assertTrue(files[0].closed)
+        with np.load(io.BytesIO(body)) as archive:
+            self.assertEqual(list(archive['station_ids']), ['ITEST1', 'ITEST2'])
+            self.assertEqual(archive['epoch'].shape, (6,))
+        
+        # Lecture interrompue (client déconnecté): le fichier est fermé avec le flux
+        output = tempfile.TemporaryFile()
+        output.write(b'x' * (3 * async_views.NPZ_BLOCK_SIZE))
+        output.seek(0)
+        stream = async_views.aiter_in_thread(async_views.iter_file(output))
+        self.assertEqual(len(await stream.__anext__()), async_views.NPZ_BLOCK_SIZE)
+        self.assertFalse(output.closed)
+        await stream.aclose()
+        self.assertTrue(output.closed)
+
+
+class LocalDayBoundsTests(WeatherTestCase):
+    DAYS = [date(2025, 10, 24) + timedelta(days=offset) for offset in range(5)]
+    
+    def setUp(self):
+        super().setUp()
+        # Heures locales autour des minuits, en UTC (fuseau courant par défaut) et à
+        # Paris (passage à l'heure d'hiver le 26): à minuit pile et une seconde avant
+        moments = set()
+        for zone in (dt_timezone.utc, ZoneInfo('Europe/Paris')):
+            for day in self.DAYS:
+                midnight = datetime.combine(day, datetime.min.time(), tzinfo=zone).astimezone(dt_timezone.utc)
+                moments.update((midnight - timedelta(seconds=1), midnight, midnight + timedelta(hours=12)))
+        # obsTimeLocal = epoch en heure UTC: une observation par instant
+        self.save([make_observation(epoch=int(moment.timestamp()), utc_offset=0) for moment in sorted(moments)])
+    
+    def assert_same_rows(self):
+        observations = ObservationMeteo.objects.all()
+        for day in self.DAYS:
+            start, end = WeatherDataService.local_day_bounds(day)
+            by_range = set(observations.filter(obs_time_local__gte=start, obs_time_local__lt=end).values_list('pk', flat=True))
+            by_date = set(observations.filter(obs_time_local__date=day).values_list('pk', flat=True))
+            with self.subTest(day=day, zone=timezone.get_current_timezone_name()):
+                self.assertEqual(by_range, by_date)
+                self.assertTrue(by_date)
+    
+    def test_range_matches_date_lookup_at_both_day_edges(self):
+        self.assert_same_rows()
+        
+        start, end = WeatherDataService.local_day_bounds(date(2025, 10, 26))
+        edges = ObservationMeteo.objects.filter(obs_time_local__gte=start, obs_time_local__lt=end).order_by('obs_time_local')
+        self.assertEqual(edges.first().obs_time_local, datetime(2025, 10, 26, tzinfo=dt_timezone.utc))
+        self.assertEqual(edges.last().obs_time_local, datetime(2025, 10, 26, 23, 59, 59, tzinfo=dt_timezone.utc))
+    
+    def test_range_matches_date_lookup_in_another_current_timezone(self):
+        # Jour de 25 heures dans le fuseau courant
+        with timezone.override(ZoneInfo('Europe/Paris')):
+            start, end = WeatherDataService.local_day_bounds(date(2025, 10, 26))
+            self.assertEqual(end.timestamp() - start.timestamp(), 25 * 3600)
+            self.assert_same_rows()
+    
+    def test_daily_response_lists_the_whole_local_day(self):
+        response = self.client.get(reverse('weather:daily_observations', args=['ITEST1']), {'date': '2025-10-26'})
+        times = [obs['time_local'] for obs in json.loads(b''.join(response.streaming_content))['observations']]
+        self.assertEqual(times, [
+            obs_time_local.strftime('%Y-%m-%d %H:%M:%S')
+            for obs_time_local in ObservationMeteo.objects.filter(
+                obs_time_local__date=date(2025, 10, 26)
+            ).order_by('obs_time_local').values_list('obs_time_local', flat=True)
+        ])
+        self.assertEqual((times[0], times[-1]), ('2025-10-26 00:00:00', '2025-10-26 23:59:59'))
 
-# Create your tests here.
@@ -1,19 +1,29 @@
 # urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'weather'
 
+# Endpoints de lecture: vues asynchrones sous ASGI (WEATHER_ASYNC_VIEWS)
+read_views = async_views if settings.WEATHER_ASYNC_VIEWS else views
+
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
     
     # API endpoints
     path('api/receive/', views.receive_weather_data, name='receive_data'),
-    path('api/daily/<str:station_id>/', views.get_daily_observations, name='daily_observations'),
-    path('api/stations/', views.list_stations, name='list_stations'),
+    path('api/receive/batches/<uuid:batch_id>/', views.ingest_batch_status, name='ingest_batch_status'),
+    path('api/daily/<str:station_id>/', read_views.get_daily_observations, name='daily_observations'),
+    path('api/observations/<str:station_id>/', read_views.list_observations, name='list_observations'),
+    path('api/resample/<str:station_id>/', read_views.resample_observations, name='resample_observations'),
+    path('api/stations/', read_views.list_stations, name='list_stations'),
+    path('api/compare/', read_views.compare_stations, name='compare_stations'),
+    path('api/export/', read_views.export_observations, name='export_observations'),
     
     # Monitoring
     path('api/monitoring/start/', views.start_monitoring, name='start_monitoring'),
     path('api/monitoring/stop/', views.stop_monitoring, name='stop_monitoring'),
+    path('api/monitoring/status/', read_views.monitoring_status, name='monitoring_status'),
 ]
\ No newline at end of file
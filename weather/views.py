@@ -1,19 +1,42 @@
 # views.py
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.urls import reverse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core import signing
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db.models import Avg, Max, Min, Count
+from functools import wraps
+from itertools import islice
+import hashlib
 import json
 import logging
+import tempfile
 
-from .models import StationMeteo, ObservationMeteo
-from .services import WeatherDataService, start_weather_monitoring, stop_weather_monitoring
+from .cache import dashboard_cache_ttl, get_daily_response, set_daily_response, station_cache
+from .export import FORMATS, available_formats, iter_arrow, iter_chunks, iter_csv, write_npz
+from .ingest import enqueue_observations, validate_observations
+from .leader import INSTANCE_ID, monitor_status, start_monitor_election, stop_monitor_election
+from .models import StationMeteo, ObservationMeteo, DailySummary, IngestBatch
+from .resample import BUCKETS, RESAMPLE_AGGREGATES, RESAMPLE_FIELDS, align, resample, station_zone
+from .serializers import OBSERVATION_SCHEMA, encode_rows, iter_json_array, iter_observation_rows, project_schema
+from .services import COMPARE_METRICS, WeatherDataService
+from .streaming import NDJSON_CONTENT_TYPES, iter_json_observations, iter_ndjson
 
 logger = logging.getLogger(__name__)
 
+# Version du format de GET /api/daily/: à changer si le schéma de la réponse change
+DAILY_RESPONSE_FORMAT = 1
+
+# Signature des curseurs de GET /api/observations/
+OBSERVATIONS_CURSOR_SALT = 'weather.observations.cursor'
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -21,21 +44,57 @@ def receive_weather_data(request):
     """
     Endpoint pour recevoir les données météo de la station
     POST /api/weather/receive/
+    
+    Accepte un document JSON {"observations": [...]} ou du NDJSON
+    (Content-Type: application/x-ndjson, une observation par ligne).
+    Le corps est lu en flux et enregistré par lots de WEATHER_INGEST_BATCH_SIZE.
+    
+    Mode asynchrone (WEATHER_INGEST_ASYNC, ou en-tête Prefer: respond-async):
+    réponse 202 dès la mise en file, voir enqueue_weather_data.
     """
+    if request.content_type in NDJSON_CONTENT_TYPES:
+        observations = iter_ndjson(request)
+    else:
+        observations = iter_json_observations(request)
+    
+    if settings.WEATHER_INGEST_ASYNC or 'respond-async' in request.headers.get('Prefer', ''):
+        return enqueue_weather_data(observations)
+    
+    batch_size = settings.WEATHER_INGEST_BATCH_SIZE
+    saved = 0
+    skipped = 0
+    batch = []
+    
+    def flush():
+        nonlocal saved, skipped
+        count = WeatherDataService.save_observations_bulk({'observations': batch})
+        saved += count
+        skipped += len(batch) - count
+        batch.clear()
+    
     try:
-        data = json.loads(request.body)
-        count = WeatherDataService.save_observations_bulk(data)
+        for observation in observations:
+            batch.append(observation)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
         
         return JsonResponse({
             'status': 'success',
-            'message': f'{count} observations enregistrées',
-            'count': count
+            'message': f'{saved} observations enregistrées',
+            'count': saved,
+            'saved': saved,
+            'skipped': skipped
         }, status=201)
-        
-    except json.JSONDecodeError:
+    
+    except ValueError:
+        # json.JSONDecodeError hérite de ValueError; les lots précédents sont conservés
         return JsonResponse({
             'status': 'error',
-            'message': 'Format JSON invalide'
+            'message': 'Format JSON invalide',
+            'saved': saved,
+            'skipped': skipped
         }, status=400)
     except Exception as e:
         logger.error(f"Erreur: {str(e)}")
@@ -45,97 +104,120 @@ def receive_weather_data(request):
         }, status=500)
 
 
+def enqueue_weather_data(observations):
+    """
+    Mode asynchrone de POST /api/receive/ (weather/ingest.py)
+    
+    L'envoi est validé et mis en file; la réponse 202 contient l'identifiant du
+    lot et l'URL de son état. File pleine: 503 avec Retry-After.
+    """
+    max_rows = settings.WEATHER_INGEST_ASYNC_MAX_ROWS
+    try:
+        observations = list(islice(observations, max_rows + 1))
+        if len(observations) > max_rows:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Plus de {max_rows} observations: découper l\'envoi'
+            }, status=413)
+        validate_observations(observations)
+    except ValueError as e:
+        # json.JSONDecodeError hérite de ValueError
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Format invalide: {str(e)}'
+        }, status=400)
+    
+    batch = enqueue_observations(observations)
+    if batch is None:
+        response = JsonResponse({
+            'status': 'error',
+            'message': 'File de réception pleine, réessayer plus tard'
+        }, status=503)
+        response['Retry-After'] = '5'
+        return response
+    
+    status_url = reverse('weather:ingest_batch_status', args=[batch.batch_id])
+    response = JsonResponse({
+        'status': 'accepted',
+        'batch_id': str(batch.batch_id),
+        'count': batch.observation_count,
+        'status_url': status_url
+    }, status=202)
+    response['Location'] = status_url
+    return response
+
+
+@require_http_methods(["GET"])
+def ingest_batch_status(request, batch_id):
+    """
+    État d'un envoi accepté en mode asynchrone
+    GET /api/receive/batches/<batch_id>/
+    
+    status: queued (en file), done ou failed; saved / skipped une fois traité,
+    rejected: observations refusées à l'écriture (index dans l'envoi).
+    """
+    try:
+        batch = IngestBatch.objects.get(batch_id=batch_id)
+    except IngestBatch.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Lot {batch_id} non trouvé'
+        }, status=404)
+    
+    return JsonResponse({
+        'batch_id': str(batch.batch_id),
+        'status': batch.status,
+        'count': batch.observation_count,
+        'saved': batch.saved_count,
+        'skipped': batch.skipped_count,
+        'rejected': batch.rejected,
+        'error': batch.error or None,
+        'created_at': batch.created_at.isoformat(),
+        'completed_at': batch.completed_at.isoformat() if batch.completed_at else None
+    })
+
+
 @require_http_methods(["GET"])
 def get_daily_observations(request, station_id):
     """
     Récupère les observations journalières d'une station
     GET /api/weather/daily/<station_id>/?date=YYYY-MM-DD
+    
+    Réponse en cache par station et par jour, invalidée à la réception de données
+    pour ce jour. ETag fort et Last-Modified: If-None-Match / If-Modified-Since
+    renvoient 304 sans lire les observations. Les jours passés dont le résumé n'a
+    plus changé depuis WEATHER_DAILY_IMMUTABLE_AFTER jours sont servis comme
+    immuables. Hors cache, le corps est produit en flux (voir serializers.py).
     """
     try:
-        # Récupérer la date (par défaut aujourd'hui)
-        date_str = request.GET.get('date')
-        if date_str:
-            target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        else:
-            target_date = timezone.now().date()
+        target_date = parse_daily_date(request)
         
         # Récupérer la station
         try:
-            station = StationMeteo.objects.get(station_id=station_id)
+            station = station_cache.get_station(station_id)
         except StationMeteo.DoesNotExist:
             return JsonResponse({
                 'status': 'error',
                 'message': f'Station {station_id} non trouvée'
             }, status=404)
         
-        # Récupérer les observations du jour
-        observations = ObservationMeteo.objects.filter(
-            station=station,
-            obs_time_local__date=target_date
-        ).order_by('obs_time_local')
-        
-        # Calculer les statistiques
-        stats = observations.aggregate(
-            temp_avg=Avg('temp_avg'),
-            temp_max=Max('temp_high'),
-            temp_min=Min('temp_low'),
-            humidity_avg=Avg('humidity_avg'),
-            precip_total=Max('precip_total'),
-            wind_max=Max('windspeed_high'),
-            count=Count('id')
-        )
-        
-        # Formater les données
-        data = {
-            'station_id': station_id,
-            'date': target_date.isoformat(),
-            'statistics': {
-                'temperature_avg': round(stats['temp_avg'], 1) if stats['temp_avg'] else None,
-                'temperature_max': stats['temp_max'],
-                'temperature_min': stats['temp_min'],
-                'humidity_avg': round(stats['humidity_avg'], 1) if stats['humidity_avg'] else None,
-                'precipitation_total': stats['precip_total'],
-                'wind_speed_max': stats['wind_max'],
-                'observation_count': stats['count']
-            },
-            'observations': [
-                {
-                    'time_utc': obs.obs_time_utc.isoformat(),
-                    'time_local': obs.obs_time_local.strftime('%Y-%m-%d %H:%M:%S'),
-                    'temperature': {
-                        'high': obs.temp_high,
-                        'low': obs.temp_low,
-                        'avg': obs.temp_avg
-                    },
-                    'humidity': {
-                        'high': obs.humidity_high,
-                        'low': obs.humidity_low,
-                        'avg': obs.humidity_avg
-                    },
-                    'wind': {
-                        'direction': obs.winddir_avg,
-                        'speed_high': obs.windspeed_high,
-                        'speed_avg': obs.windspeed_avg,
-                        'gust_high': obs.windgust_high
-                    },
-                    'pressure': {
-                        'max': obs.pressure_max,
-                        'min': obs.pressure_min,
-                        'trend': obs.pressure_trend
-                    },
-                    'precipitation': {
-                        'rate': obs.precip_rate,
-                        'total': obs.precip_total
-                    },
-                    'solar_radiation': obs.solar_radiation_high,
-                    'uv_index': obs.uv_high
-                }
-                for obs in observations
-            ]
-        }
-        
-        return JsonResponse(data, safe=False)
+        entry, version = get_daily_response(station.pk, target_date)
+        if entry is not None:
+            response = HttpResponse(entry['body'], content_type='application/json')
+            etag, last_modified = entry['etag'], entry['last_modified']
+        else:
+            # Validateurs issus du résumé journalier: un 304 ne lit pas les observations
+            summary = DailySummary.objects.filter(station=station, date=target_date).first()
+            if summary is None:
+                summary = DailySummary(station=station, date=target_date)
+            etag, last_modified = daily_validators(station, summary)
+            response = StreamingHttpResponse(
+                stream_daily_response(station, summary, version, etag, last_modified),
+                content_type='application/json'
+            )
         
+        return finish_daily_response(request, response, target_date, etag, last_modified)
+    
     except Exception as e:
         logger.error(f"Erreur: {str(e)}")
         return JsonResponse({
@@ -144,59 +226,545 @@ def get_daily_observations(request, station_id):
         }, status=500)
 
 
+def parse_daily_date(request):
+    """Jour demandé (?date=YYYY-MM-DD, par défaut aujourd'hui)"""
+    date_str = request.GET.get('date')
+    if date_str:
+        return datetime.strptime(date_str, '%Y-%m-%d').date()
+    return timezone.now().date()
+
+
+def finish_daily_response(request, response, target_date, etag, last_modified):
+    """
+    Validateurs, Cache-Control et réponse conditionnelle (304) de la réponse journalière.
+    
+    Un jour n'est immuable que si son résumé existe et n'a pas changé depuis
+    WEATHER_DAILY_IMMUTABLE_AFTER jours: un jour sans données ou modifié
+    récemment (envoi en retard, rattrapage) peut encore recevoir des observations.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    
+    grace = timedelta(days=settings.WEATHER_DAILY_IMMUTABLE_AFTER)
+    now = timezone.now()
+    if (
+        target_date <= now.date() - grace
+        and last_modified is not None
+        and last_modified <= (now - grace).timestamp()
+    ):
+        patch_cache_control(response, public=True, max_age=365 * 86400, immutable=True)
+    else:
+        # Revalidation à chaque requête (304 tant que rien n'a été reçu)
+        patch_cache_control(response, no_cache=True)
+    
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+        response=response
+    )
+
+
+def daily_validators(station, summary):
+    """
+    ETag et date de modification de la réponse journalière d'une station.
+    
+    Dérivés du résumé journalier, mis à jour à chaque observation enregistrée
+    pour ce jour: ils changent exactement quand le contenu de la réponse change.
+    """
+    updated_at = summary.updated_at.isoformat() if summary.updated_at else ''
+    state = f"{DAILY_RESPONSE_FORMAT}:{station.pk}:{station.station_id}:{summary.date}:{summary.observation_count}:{updated_at}"
+    etag = f'"{hashlib.sha256(state.encode()).hexdigest()[:32]}"'
+    last_modified = int(summary.updated_at.timestamp()) if summary.updated_at else None
+    return etag, last_modified
+
+
+def stream_daily_response(station, summary, version, etag, last_modified):
+    """
+    Produit par morceaux le corps JSON de la réponse journalière d'une station,
+    puis le met en cache une fois entièrement envoyé.
+    """
+    day_start, day_end = WeatherDataService.local_day_bounds(summary.date)
+    observations = ObservationMeteo.objects.filter(
+        station=station,
+        obs_time_local__gte=day_start,
+        obs_time_local__lt=day_end
+    ).order_by('obs_time_local')
+    
+    header = json.dumps({
+        'station_id': station.station_id,
+        'date': summary.date.isoformat(),
+        'statistics': {
+            'temperature_avg': round(summary.temp_avg, 1) if summary.temp_avg else None,
+            'temperature_max': summary.temp_max,
+            'temperature_min': summary.temp_min,
+            'humidity_avg': round(summary.humidity_avg, 1) if summary.humidity_avg else None,
+            'precipitation_total': summary.precip_total,
+            'wind_speed_max': summary.wind_max,
+            'observation_count': summary.observation_count
+        }
+    }, cls=DjangoJSONEncoder)
+    
+    chunks = []
+    for chunk in iter_json_array(
+        iter_observation_rows(observations),
+        prefix=header[:-1] + ', "observations": [',
+        suffix=']}'
+    ):
+        chunks.append(chunk)
+        yield chunk
+    
+    set_daily_response(station.pk, summary.date, version, {
+        'body': b''.join(chunks),
+        'etag': etag,
+        'last_modified': last_modified
+    })
+
+
 @require_http_methods(["GET"])
-def list_stations(request):
+def list_observations(request, station_id):
     """
-    Liste toutes les stations météo
-    GET /api/weather/stations/
+    Observations d'une station sur une plage de temps, paginées par curseur
+    GET /api/observations/<station_id>/?start=&end=&limit=&fields=
+    
+    start / end: date, date-heure ISO 8601 ou epoch; plage [start, end).
+    fields: clés de premier niveau à retourner (ex. time_utc,temperature).
+    La réponse contient un curseur opaque `next` (null sur la dernière page), à
+    passer seul: GET ...?cursor=<next>. Pagination par clé sur (station, epoch):
+    chaque page coûte une recherche d'index, quelle que soit sa profondeur.
     """
-    stations = StationMeteo.objects.all()
+    try:
+        station = station_cache.get_station(station_id)
+    except StationMeteo.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Station {station_id} non trouvée'
+        }, status=404)
     
-    data = [
-        {
-            'station_id': station.station_id,
-            'nom': station.nom,
-            'latitude': station.latitude,
-            'longitude': station.longitude,
-            'timezone': station.timezone,
-            'observation_count': station.observations.count(),
-            'last_observation': station.observations.first().obs_time_local.isoformat() 
-                               if station.observations.exists() else None
+    try:
+        query = parse_observations_query(request, station)
+        schema = project_schema(query['fields'])
+    except (KeyError, signing.BadSignature, ValueError) as e:
+        return invalid_observations_query(e)
+    
+    rows = list(observations_page_queryset(station, query, schema[1]))
+    return observations_page_response(station, query, schema, rows)
+
+
+def parse_observations_query(request, station):
+    """
+    Paramètres de GET /api/observations/, depuis le curseur signé ou start/end/fields/limit
+    
+    Raises:
+        signing.BadSignature, ValueError
+    """
+    if request.GET.get('cursor'):
+        cursor = signing.loads(request.GET['cursor'], salt=OBSERVATIONS_CURSOR_SALT)
+        if cursor['station'] != station.pk:
+            raise ValueError("Curseur d'une autre station")
+        return {
+            'after': cursor['after'],
+            'start': cursor['start'],
+            'end': cursor['end'],
+            'fields': tuple(cursor['fields']),
+            'limit': cursor['limit']
         }
-        for station in stations
-    ]
     
+    limit = int(request.GET.get('limit', settings.WEATHER_OBSERVATIONS_PAGE_SIZE))
+    if not 1 <= limit <= settings.WEATHER_OBSERVATIONS_MAX_PAGE_SIZE:
+        raise ValueError(f"limit doit être entre 1 et {settings.WEATHER_OBSERVATIONS_MAX_PAGE_SIZE}")
+    return {
+        'after': None,
+        'start': WeatherDataService.parse_time_bound(request.GET.get('start')),
+        'end': WeatherDataService.parse_time_bound(request.GET.get('end')),
+        'fields': tuple(dict.fromkeys(
+            field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()
+        )) or tuple(key for key, _ in OBSERVATION_SCHEMA),
+        'limit': limit
+    }
+
+
+def invalid_observations_query(error):
+    """Réponse 400 de GET /api/observations/ (KeyError: champ inconnu de project_schema)"""
+    if isinstance(error, KeyError):
+        available = ', '.join(key for key, _ in OBSERVATION_SCHEMA)
+        message = f'Champ inconnu: {error.args[0]} (disponibles: {available})'
+    else:
+        message = f'Paramètres invalides: {str(error)}'
+    return JsonResponse({
+        'status': 'error',
+        'message': message
+    }, status=400)
+
+
+def observations_page_queryset(station, query, columns):
+    """Lignes (epoch, colonnes...) d'une page, plus une pour savoir s'il reste une page"""
+    observations = ObservationMeteo.objects.filter(station=station)
+    if query['after'] is not None:
+        observations = observations.filter(epoch__gt=query['after'])
+    elif query['start'] is not None:
+        observations = observations.filter(epoch__gte=query['start'])
+    if query['end'] is not None:
+        observations = observations.filter(epoch__lt=query['end'])
+    return observations.order_by('epoch').values_list('epoch', *columns)[:query['limit'] + 1]
+
+
+def observations_page_response(station, query, schema, rows):
+    """Corps JSON d'une page d'observations, avec le curseur de la page suivante"""
+    template, _, encoders = schema
+    limit = query['limit']
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = signing.dumps({
+            'station': station.pk,
+            'after': rows[-1][0],
+            'start': query['start'],
+            'end': query['end'],
+            'fields': query['fields'],
+            'limit': limit
+        }, salt=OBSERVATIONS_CURSOR_SALT, compress=True)
+    
+    header = json.dumps({
+        'station_id': station.station_id,
+        'count': len(rows)
+    })
+    footer = json.dumps({'next': next_cursor})
+    body = b''.join(iter_json_array(
+        encode_rows((row[1:] for row in rows), template, encoders),
+        prefix=header[:-1] + ', "observations": [',
+        suffix='], ' + footer[1:]
+    ))
+    return HttpResponse(body, content_type='application/json')
+
+
+@require_http_methods(["GET"])
+def resample_observations(request, station_id):
+    """
+    Série rééchantillonnée d'une station, en colonnes
+    GET /api/resample/<station_id>/?start=&end=&bucket=1h&fields=temp_avg,humidity_avg&agg=avg,max
+    
+    bucket: 5min, 10min, 15min, 30min, 1h ou 1d, aligné sur l'heure locale de la station.
+    Chaque agrégat est appliqué à chaque colonne. Par défaut: dernières 24 heures,
+    bucket=1h, fields=temp_avg, agg=avg.
+    """
+    try:
+        station = station_cache.get_station(station_id)
+    except StationMeteo.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Station {station_id} non trouvée'
+        }, status=404)
+    
+    try:
+        query = parse_resample_query(request, station)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Paramètres invalides: {str(e)}'
+        }, status=400)
+    
+    data = resample(station, query['start'], query['end'], query['bucket'], query['fields'], query['aggregates'])
+    return resample_response(station, query, data)
+
+
+def parse_resample_query(request, station):
+    """
+    Paramètres de GET /api/resample/, bornes alignées sur les intervalles
+    
+    Raises:
+        ValueError
+    """
+    bucket = request.GET.get('bucket', '1h')
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket doit être parmi: {', '.join(BUCKETS)}")
+    
+    fields = list(dict.fromkeys(
+        field.strip() for field in request.GET.get('fields', 'temp_avg').split(',') if field.strip()
+    ))
+    unknown = [field for field in fields if field not in RESAMPLE_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)} (disponibles: {', '.join(RESAMPLE_FIELDS)})")
+    
+    aggregates = list(dict.fromkeys(
+        aggregate.strip() for aggregate in request.GET.get('agg', 'avg').split(',') if aggregate.strip()
+    ))
+    if not aggregates or any(aggregate not in RESAMPLE_AGGREGATES for aggregate in aggregates):
+        raise ValueError(f"agg doit être parmi: {', '.join(RESAMPLE_AGGREGATES)}")
+    
+    end = WeatherDataService.parse_time_bound(request.GET.get('end'))
+    if end is None:
+        end = int(timezone.now().timestamp())
+    start = WeatherDataService.parse_time_bound(request.GET.get('start'))
+    if start is None:
+        start = end - 86400
+    
+    zone = station_zone(station)
+    start = align(start, bucket, zone)
+    end = align(end, bucket, zone, ceil=True)
+    if start >= end:
+        raise ValueError("start doit précéder end")
+    if (end - start) // BUCKETS[bucket] > settings.WEATHER_RESAMPLE_MAX_BUCKETS:
+        raise ValueError(
+            f"Plus de {settings.WEATHER_RESAMPLE_MAX_BUCKETS} intervalles: "
+            f"réduire la période ou augmenter bucket"
+        )
+    
+    return {
+        'bucket': bucket,
+        'fields': fields,
+        'aggregates': aggregates,
+        'start': start,
+        'end': end,
+        'zone': zone
+    }
+
+
+def resample_response(station, query, data):
+    """Réponse de GET /api/resample/ à partir des colonnes calculées par resample()"""
+    return JsonResponse({
+        'station_id': station.station_id,
+        'timezone': station.timezone,
+        'bucket': query['bucket'],
+        'start': datetime.fromtimestamp(query['start'], query['zone']).isoformat(),
+        'end': datetime.fromtimestamp(query['end'], query['zone']).isoformat(),
+        **data
+    })
+
+
+@require_http_methods(["GET"])
+def compare_stations(request):
+    """
+    Comparaison de stations sur les derniers jours, en matrice
+    GET /api/compare/?stations=A,B,C&days=7&metrics=temp,humidity,precip,wind
+    
+    Une seule requête groupée par station sur les résumés journaliers, quel que
+    soit le nombre de stations. Sans `stations`: toutes les stations surveillées.
+    """
+    try:
+        days, metrics, station_ids = parse_compare_query(request)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Paramètres invalides: {str(e)}'
+        }, status=400)
+    
+    if station_ids:
+        stations = station_cache.get_many(station_ids)
+        missing = [station_id for station_id in station_ids if station_id not in stations]
+        stations = [stations[station_id] for station_id in station_ids if station_id in stations]
+    else:
+        stations = list(StationMeteo.objects.filter(actif=True).order_by('station_id'))
+        missing = []
+    
+    columns, results = WeatherDataService.compare_stations(stations, days, metrics)
+    return compare_response(days, stations, columns, results, missing)
+
+
+def parse_compare_query(request):
+    """
+    Paramètres de GET /api/compare/: (days, metrics, station_ids)
+    
+    Raises:
+        ValueError
+    """
+    days = int(request.GET.get('days', 7))
+    if not 1 <= days <= 3660:
+        raise ValueError("days doit être entre 1 et 3660")
+    
+    metrics = list(dict.fromkeys(
+        metric.strip() for metric in request.GET.get('metrics', '').split(',') if metric.strip()
+    )) or list(COMPARE_METRICS)
+    unknown = [metric for metric in metrics if metric not in COMPARE_METRICS]
+    if unknown:
+        raise ValueError(f"Métriques inconnues: {', '.join(unknown)} (disponibles: {', '.join(COMPARE_METRICS)})")
+    
+    station_ids = list(dict.fromkeys(
+        station_id.strip() for station_id in request.GET.get('stations', '').split(',') if station_id.strip()
+    ))
+    if len(station_ids) > settings.WEATHER_COMPARE_MAX_STATIONS:
+        raise ValueError(f"Au plus {settings.WEATHER_COMPARE_MAX_STATIONS} stations")
+    return days, metrics, station_ids
+
+
+def compare_response(days, stations, columns, results, missing):
+    """Réponse de GET /api/compare/: une ligne par station, dans l'ordre demandé"""
+    empty = [0] + [None] * (len(columns) - 1)
+    return JsonResponse({
+        'days': days,
+        'start_date': (timezone.now() - timedelta(days=days)).date().isoformat(),
+        'columns': columns,
+        'stations': [station.station_id for station in stations],
+        'rows': [results.get(station.pk, empty) for station in stations],
+        'unknown_stations': missing
+    })
+
+
+@require_http_methods(["GET"])
+def export_observations(request):
+    """
+    Export en masse des observations
+    GET /api/export/?stations=A,B&start=&end=&format=csv|arrow|npz
+    
+    Lecture par lots (voir export.py): csv et arrow sont envoyés au fil de la
+    lecture; npz est assemblé dans un fichier temporaire puis envoyé.
+    Sans `stations`: toutes les stations.
+    """
+    try:
+        export_format, start, end, station_ids = parse_export_query(request)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Paramètres invalides: {str(e)}'
+        }, status=400)
+    
+    chunks = iter_chunks(list(export_stations(station_ids)), start, end)
+    
+    content_type, extension = FORMATS[export_format]
+    filename = f"observations.{extension}"
+    if export_format == 'npz':
+        output = tempfile.TemporaryFile()
+        write_npz(chunks, output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
+    
+    return export_stream_response(export_format, iter_export(export_format, chunks))
+
+
+def parse_export_query(request):
+    """
+    Paramètres de GET /api/export/: (format, start, end, station_ids)
+    
+    Raises:
+        ValueError
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in FORMATS:
+        raise ValueError(f"format doit être parmi: {', '.join(FORMATS)}")
+    if export_format not in available_formats():
+        raise ValueError(f"format {export_format} indisponible sur ce serveur")
+    start = WeatherDataService.parse_time_bound(request.GET.get('start'))
+    end = WeatherDataService.parse_time_bound(request.GET.get('end'))
+    station_ids = [station_id.strip() for station_id in request.GET.get('stations', '').split(',') if station_id.strip()]
+    return export_format, start, end, station_ids
+
+
+def export_stations(station_ids):
+    """Stations exportées (toutes si station_ids est vide)"""
+    stations = StationMeteo.objects.order_by('station_id')
+    if station_ids:
+        stations = stations.filter(station_id__in=station_ids)
+    return stations
+
+
+def iter_export(export_format, chunks):
+    """Corps d'un export envoyé en flux (csv ou arrow)"""
+    return iter_csv(chunks) if export_format == 'csv' else iter_arrow(chunks)
+
+
+def export_stream_response(export_format, stream):
+    """Réponse en flux d'un export, en pièce jointe"""
+    content_type, extension = FORMATS[export_format]
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="observations.{extension}"'
+    return response
+
+
+@require_http_methods(["GET"])
+def list_stations(request):
+    """
+    Liste toutes les stations météo
+    GET /api/weather/stations/
+    
+    Une seule requête: statistiques dénormalisées de la station et jointure
+    sur sa dernière observation.
+    """
+    data = [station_payload(station) for station in stations_queryset()]
     return JsonResponse(data, safe=False)
 
 
-@csrf_exempt
+def stations_queryset():
+    """Stations avec leur dernière observation (jointure), colonnes de la liste seulement"""
+    return StationMeteo.objects.select_related('last_obs').only(
+        'station_id', 'nom', 'latitude', 'longitude', 'timezone',
+        'observation_count', 'last_obs__obs_time_local'
+    )
+
+
+def station_payload(station):
+    """Élément de GET /api/stations/"""
+    return {
+        'station_id': station.station_id,
+        'nom': station.nom,
+        'latitude': station.latitude,
+        'longitude': station.longitude,
+        'timezone': station.timezone,
+        'observation_count': station.observation_count,
+        'last_observation': station.last_obs.obs_time_local.isoformat()
+                           if station.last_obs else None
+    }
+
+
+def staff_required(view):
+    """Réservé aux comptes staff authentifiés (403 JSON sinon); la protection CSRF reste active"""
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if not (request.user.is_authenticated and request.user.is_staff):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Authentification staff requise'
+            }, status=403)
+        return view(request, *args, **kwargs)
+    return inner
+
+
 @require_http_methods(["POST"])
+@staff_required
 def start_monitoring(request):
     """
-    Démarre le thread de surveillance automatique
+    Démarre la surveillance automatique
     POST /api/weather/monitoring/start/
-    Body: {"api_url": "...", "interval_seconds": 300, "station_id": "..."}
+    Body (optionnel): {"interval_seconds": 300, "station_id": "..."}
+    Sans station_id, toutes les stations surveillées sont interrogées.
+    
+    L'API interrogée et sa clé sont toujours celles de la configuration
+    (WEATHER_API_URL, WEATHER_API_KEY), jamais celles de la requête.
+    
+    L'instance entre dans l'élection (leader.py): la surveillance ne tourne que
+    si elle obtient le bail de collecte, jamais en parallèle d'une autre instance.
+    Une élection en cours est redémarrée avec les nouveaux paramètres.
     """
     try:
-        data = json.loads(request.body)
-        api_url = data.get('api_url')
-        interval = data.get('interval_seconds', 300)
+        data = json.loads(request.body) if request.body else {}
+        if not isinstance(data, dict):
+            raise ValueError("objet JSON attendu")
+        interval = data.get('interval_seconds', settings.WEATHER_FETCH_INTERVAL)
+        if not isinstance(interval, int) or isinstance(interval, bool) or interval <= 0:
+            raise ValueError("interval_seconds doit être un entier positif")
         station_id = data.get('station_id')
-        
-        if not api_url:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'api_url requis'
-            }, status=400)
-        
-        thread = start_weather_monitoring(api_url, interval, station_id)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Format invalide: {str(e)}'
+        }, status=400)
+    
+    try:
+        stop_monitor_election()
+        start_monitor_election(
+            api_url=settings.WEATHER_API_URL,
+            api_key=settings.WEATHER_API_KEY,
+            interval_seconds=interval,
+            station_id=station_id
+        )
         
         return JsonResponse({
             'status': 'success',
-            'message': 'Surveillance démarrée',
+            'message': 'Élection de la surveillance démarrée',
+            'instance': INSTANCE_ID,
             'interval_seconds': interval
         })
-        
+    
     except Exception as e:
         return JsonResponse({
             'status': 'error',
@@ -204,45 +772,62 @@ def start_monitoring(request):
         }, status=500)
 
 
-@csrf_exempt
 @require_http_methods(["POST"])
+@staff_required
 def stop_monitoring(request):
     """
-    Arrête le thread de surveillance automatique
+    Arrête la surveillance automatique de l'instance et libère le bail de collecte
     POST /api/weather/monitoring/stop/
     """
-    stop_weather_monitoring()
+    stop_monitor_election()
     return JsonResponse({
         'status': 'success',
         'message': 'Surveillance arrêtée'
     })
 
 
+@require_http_methods(["GET"])
+def monitoring_status(request):
+    """
+    État de la surveillance
+    GET /api/monitoring/status/
+    
+    Instance qui répond, et instance qui détient le bail de collecte (la seule
+    qui interroge l'API, voir leader.py).
+    """
+    return JsonResponse(monitor_status())
+
+
 def dashboard(request):
-    """Vue du tableau de bord"""
-    stations = StationMeteo.objects.all()
-    
-    # Récupérer les statistiques pour chaque station
-    station_data = []
-    for station in stations:
-        today = timezone.now().date()
-        observations_today = ObservationMeteo.objects.filter(
-            station=station,
-            obs_time_local__date=today
-        )
-        
-        latest_obs = station.observations.first()
-        
-        station_data.append({
+    """
+    Vue du tableau de bord
+    
+    Nombre de requêtes constant: stations avec leur dernière observation (jointure)
+    et observations du jour depuis les résumés journaliers. Les cartes de station
+    sont en cache (fragment station_card), invalidées à la réception de données.
+    """
+    stations = StationMeteo.objects.select_related('last_obs')
+    
+    today = timezone.now().date()
+    observations_today = dict(
+        DailySummary.objects.filter(date=today).values_list('station_id', 'observation_count')
+    )
+    
+    station_data = [
+        {
             'station': station,
-            'observations_today': observations_today.count(),
-            'latest_observation': latest_obs,
-            'total_observations': station.observations.count()
-        })
+            'observations_today': observations_today.get(station.pk, 0),
+            'latest_observation': station.last_obs,
+            'total_observations': station.observation_count
+        }
+        for station in stations
+    ]
     
     context = {
         'stations': station_data,
-        'total_stations': stations.count()
+        'total_stations': len(station_data),
+        'today': today,
+        'cache_ttl': dashboard_cache_ttl()
     }
     
     return render(request, 'weather/dashboard.html', context)
\ No newline at end of file
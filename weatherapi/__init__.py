@@ -1,3 +1,6 @@
+# Application Celery chargée avec Django, pour que @shared_task l'utilise
+from .celery import app as celery_app
 
+__all__ = ('celery_app',)
 
 default_app_config = 'weather.apps.WeatherConfig'
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weatherapi.settings')
+# Endpoints de lecture asynchrones (weather/async_views.py), par exemple:
+#   uvicorn weatherapi.asgi:application --workers 4
+os.environ.setdefault('WEATHER_ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
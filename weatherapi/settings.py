@@ -98,6 +98,127 @@ DATABASES = {
     }
 }
 
+# Weather.com PWS API
+WEATHER_API_URL = os.getenv('WEATHER_API_URL', 'https://api.weather.com/v2/pws/observations/all/1day')
+WEATHER_API_KEY = os.getenv('WEATHER_API_KEY', 'df904ffa7aad495d904ffa7aadb95d3b')
+WEATHER_STATION_ID = os.getenv('WEATHER_STATION_ID', 'IBUJUM3')
+WEATHER_FETCH_INTERVAL = int(os.getenv('WEATHER_FETCH_INTERVAL', 900))  # 15 minutes
+# Historique d'un jour local (paramètre date=AAAAMMJJ), utilisé par backfill_weather
+WEATHER_HISTORY_API_URL = os.getenv('WEATHER_HISTORY_API_URL', 'https://api.weather.com/v2/pws/history/all')
+
+# Stations surveillées: stations actives en base + celles-ci (créées à la première réception)
+WEATHER_STATION_IDS = [
+    station_id.strip()
+    for station_id in os.getenv('WEATHER_STATION_IDS', WEATHER_STATION_ID).split(',')
+    if station_id.strip()
+]
+# Collecte: Celery beat (dispatch_fetch_task, CELERY_BEAT_SCHEDULE) par défaut.
+# WEATHER_MONITOR_AUTOSTART=true, pour les déploiements sans Celery: surveillance
+# dans le processus web, démarrée par WeatherConfig.ready (serveurs uniquement) et
+# exécutée par la seule instance qui détient le bail (weather/leader.py); tant
+# qu'elle le détient, dispatch_fetch_task ne planifie rien
+WEATHER_MONITOR_AUTOSTART = os.getenv('WEATHER_MONITOR_AUTOSTART', 'false').lower() in ('1', 'true', 'yes')
+WEATHER_LEADER_LEASE_TTL = 60  # secondes sans renouvellement avant reprise par une autre instance
+# Planification adaptative par station (weather/scheduler.py): sinon toutes les
+# stations sont interrogées à intervalle fixe
+WEATHER_ADAPTIVE_POLLING = False
+WEATHER_POLL_GRACE = 60  # secondes entre l'observation et sa publication par l'API
+# Délai minimal entre deux interrogations d'une station (secondes). None: intervalle
+# fixe de la surveillance, jamais plus d'appels qu'en mode fixe. Plus court (ex. 60),
+# les stations rapides sont suivies de plus près au prix de plus d'appels à l'API
+WEATHER_POLL_MIN_INTERVAL = None
+WEATHER_POLL_MAX_INTERVAL = 3600  # secondes, stations muettes ou en retard
+WEATHER_POLL_STALE_AFTER = 86400  # secondes sans observation: station muette
+WEATHER_POLL_JITTER = 0.1  # jusqu'à +10 % sur chaque délai
+WEATHER_POLL_WORKERS = 8  # requêtes simultanées vers l'API
+WEATHER_POLL_TIMEOUT = 30  # secondes, par station
+
+# Client HTTP de l'API PWS (weather/client.py)
+WEATHER_HTTP_CONNECT_TIMEOUT = 5  # secondes
+WEATHER_HTTP_READ_TIMEOUT = 20  # secondes
+WEATHER_HTTP_MAX_RETRIES = 3
+WEATHER_HTTP_BACKOFF_BASE = 1.0  # secondes, doublé à chaque tentative (avec jitter)
+WEATHER_HTTP_BACKOFF_MAX = 30  # secondes
+WEATHER_HTTP_MAX_RETRY_AFTER = 120  # secondes: au-delà, abandon jusqu'au prochain intervalle
+
+# Rattrapage de l'historique (commande backfill_weather)
+WEATHER_BACKFILL_WORKERS = 8  # requêtes simultanées
+# Débit: tous threads confondus, nouvelles tentatives comprises (quota PWS: 30/minute).
+# Une requête par station et par jour: 1 an × 20 stations = 7 300 requêtes, environ 4 h
+# à 0,5/s. Ne l'augmenter qu'avec un quota plus large (sinon réponses 429).
+WEATHER_BACKFILL_RATE = 0.5  # requêtes par seconde
+WEATHER_BACKFILL_BATCH_ROWS = 5000  # observations par transaction d'enregistrement
+
+# Taille des lots d'insertion lors de la réception en flux (POST /api/receive/)
+WEATHER_INGEST_BATCH_SIZE = 500
+
+# Réception asynchrone (weather/ingest.py): réponse 202 et enregistrement différé,
+# pour tous les envois ou à la demande (en-tête Prefer: respond-async)
+WEATHER_INGEST_ASYNC = os.getenv('WEATHER_INGEST_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+WEATHER_INGEST_ASYNC_MAX_ROWS = 50000  # observations par envoi
+WEATHER_INGEST_QUEUE_SIZE = 1000  # envois en attente par processus, au-delà: 503
+WEATHER_INGEST_COALESCE_ROWS = 5000  # observations par écriture regroupée
+WEATHER_INGEST_COALESCE_WAIT = 0.2  # secondes d'attente d'autres envois avant l'écriture
+
+# Cache local des stations (station_id -> StationMeteo)
+WEATHER_STATION_CACHE_SIZE = 1024
+WEATHER_STATION_CACHE_TTL = 300  # secondes
+
+# Rétention en jours par niveau (None: conservé indéfiniment). Les observations
+# brutes ne sont supprimées qu'une fois intégrées aux agrégats (weather/rollups.py)
+WEATHER_RETENTION = {
+    'raw': None,
+    'hour': None,
+    'day': None,
+    'month': None,
+}
+
+# Fragments en cache du tableau de bord, invalidés à chaque réception de données
+WEATHER_DASHBOARD_CACHE_TTL = 3600  # secondes
+
+# Réponses en cache de GET /api/daily/<station_id>/, invalidées à la réception de
+# données. Les jours antérieurs à WEATHER_DAILY_IMMUTABLE_AFTER jours, dont le
+# résumé existe et n'a pas changé depuis autant de jours, sont servis comme
+# immuables (Cache-Control: immutable), au-delà des décalages horaires et des
+# envois en retard des stations
+WEATHER_DAILY_CACHE_TTL = 86400  # secondes
+WEATHER_DAILY_IMMUTABLE_AFTER = 2  # jours
+
+# Pagination de GET /api/observations/<station_id>/
+WEATHER_OBSERVATIONS_PAGE_SIZE = 500
+WEATHER_OBSERVATIONS_MAX_PAGE_SIZE = 5000
+
+# Nombre maximal d'intervalles par requête de GET /api/resample/<station_id>/
+WEATHER_RESAMPLE_MAX_BUCKETS = 10000
+
+# Nombre maximal de stations par requête de GET /api/compare/
+WEATHER_COMPARE_MAX_STATIONS = 200
+
+# Endpoints de lecture asynchrones (weather/async_views.py): activés par défaut
+# sous ASGI (weatherapi/asgi.py), les vues synchrones restent servies sous WSGI
+WEATHER_ASYNC_VIEWS = os.getenv('WEATHER_ASYNC_VIEWS', 'false').lower() in ('1', 'true', 'yes')
+
+# Cache Django: Redis si WEATHER_CACHE_URL est défini (partagé entre processus,
+# nécessaire pour que l'invalidation depuis les workers Celery soit vue par le web),
+# sinon cache mémoire local au processus: les jours récents de GET /api/daily/ ne
+# sont alors pas mis en cache, les autres entrées et les fragments du tableau de
+# bord expirent après WEATHER_LOCAL_CACHE_TTL (avertissement weather.W001 de check --deploy)
+WEATHER_CACHE_URL = os.getenv('WEATHER_CACHE_URL')
+WEATHER_LOCAL_CACHE_TTL = 60  # secondes
+if WEATHER_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': WEATHER_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -106,12 +227,24 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Pipeline de collecte (weather/tasks.py): récupération sur WEATHER_FETCH_QUEUE,
+# enregistrement sur weather.ingest.0 .. weather.ingest.<WEATHER_INGEST_SHARDS - 1>
+CELERY_TASK_ROUTES = ('weather.tasks.route_task',)
+WEATHER_FETCH_QUEUE = 'weather.fetch'
+WEATHER_INGEST_SHARDS = 4
+# Limite Celery par worker: diviser le quota de l'API par le nombre de workers de récupération
+WEATHER_FETCH_RATE_LIMIT = '30/m'
+
 # Celery Beat Schedule - Run every 5 minutes
 CELERY_BEAT_SCHEDULE = {
-    'fetch-weather-every-5-minutes': {
-        'task': 'weather.tasks.fetch_weather_task',
+    'dispatch-weather-fetch-every-5-minutes': {
+        'task': 'weather.tasks.dispatch_fetch_task',
         'schedule': 300.0,  # 300 seconds = 5 minutes
     },
+    'rollup-observations-every-15-minutes': {
+        'task': 'weather.tasks.rollup_observations_task',
+        'schedule': 900.0,
+    },
 }
 
 